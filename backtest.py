@@ -0,0 +1,207 @@
+# Engine replay/backtest offline untuk strategi spread Bybit vs BingX.
+# Quote yang direkam diputar ulang memakai aturan yang sama dengan bot live (strategy.py):
+# trigger spread, entry di harga BingX, TP/SL dipantau dari harga Bybit, satu trade aktif per simbol.
+# Mode trigger adaptif (zscore/persistence, lihat spread_stats.py) dihitung ulang dari spread harga terakhir yang
+# direkam, sama seperti bot live; karena data hanya berisi harga terakhir, konfirmasi order book (EXECUTABLE_SPREAD)
+# tidak ikut disimulasikan.
+#
+# Format data (kolom): timestamp, symbol, bybit_price, bingx_price
+#   - CSV dengan header,
+#   - .npz kolumnar (np.savez) dengan array bernama sama, atau
+#   - direktori segmen tick_recorder (pilih hari dengan --day)
+#
+# Contoh:
+#   python backtest.py ticks.csv --trigger 0.15 --tp 0.15 --sl 0.15
+#   python backtest.py ticks/ --day 2026-10-16
+#   python backtest.py ticks/ --day 2026-10-16 --trigger-mode zscore --zscore 3
+#   python backtest.py ticks.npz --trigger-grid 0.1,0.15,0.2 --tp-grid 0.1,0.2 --sl-grid 0.1,0.2 --workers 4
+import argparse
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import strategy
+import tick_recorder
+from spread_stats import TRIGGER_MODES, replay_bands
+
+DEFAULT_PARAMS = {'trigger_pct': 0.15, 'tp_percent': 0.15, 'sl_percent': 0.15, 'amount_usdt': 2, 'leverage': 10, 'fee_pct': 0.0,
+                  # Trigger adaptif, default sama dengan TRIGGER_* / SPREAD_STATS_* di main.py
+                  'trigger_mode': 'fixed', 'zscore': 3.0, 'persist_zscore': 2.0, 'persist_seconds': 2.0, 'min_pct': 0.1,
+                  'halflife': 300.0, 'warmup': 60.0}
+QUOTE_COLUMNS = ('timestamp', 'symbol', 'bybit_price', 'bingx_price')
+
+# --- MEMUAT DATA ---
+
+def load_quotes(path, day=None):
+    # Kembalikan dict simbol -> (timestamps, bybit, bingx), masing-masing array terurut menurut waktu
+    if os.path.isdir(path):
+        columns = tick_recorder.ticks_to_quotes(tick_recorder.load_day(path, day))
+    elif os.path.splitext(path)[1].lower() == '.npz':
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in QUOTE_COLUMNS}
+    else:
+        rows = {name: [] for name in QUOTE_COLUMNS}
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                for name in QUOTE_COLUMNS: rows[name].append(row[name])
+        columns = {
+            'timestamp': np.asarray(rows['timestamp'], dtype=np.float64),
+            'symbol': np.asarray(rows['symbol']),
+            'bybit_price': np.asarray([float(p) if p else np.nan for p in rows['bybit_price']], dtype=np.float64),
+            'bingx_price': np.asarray([float(p) if p else np.nan for p in rows['bingx_price']], dtype=np.float64),
+        }
+    return group_by_symbol(columns)
+
+def group_by_symbol(columns):
+    symbols = columns['symbol'].astype(str)
+    order = np.lexsort((columns['timestamp'], symbols))
+    symbols = symbols[order]
+    boundaries = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+    dataset = {}
+    for idx in np.split(order, boundaries):
+        if len(idx) == 0: continue
+        dataset[str(columns['symbol'][idx[0]])] = (
+            np.ascontiguousarray(columns['timestamp'][idx], dtype=np.float64),
+            np.ascontiguousarray(columns['bybit_price'][idx], dtype=np.float64),
+            np.ascontiguousarray(columns['bingx_price'][idx], dtype=np.float64),
+        )
+    return dataset
+
+# --- REPLAY ---
+
+def find_exit(side, prices, start, tp_price, sl_price, chunk=256):
+    # Cari tick pertama setelah entry yang menyentuh TP/SL; jendela pencarian membesar agar
+    # trade yang cepat selesai tidak perlu memindai seluruh sisa deret harga
+    n = len(prices)
+    while start < n:
+        end = min(start + chunk, n)
+        tp_mask, sl_mask = strategy.exit_masks(side, prices[start:end], tp_price, sl_price)
+        hit = tp_mask | sl_mask
+        if hit.any():
+            k = int(hit.argmax())
+            return start + k, 'TP' if tp_mask[k] else 'SL'
+        start, chunk = end, chunk * 2
+    return None, None
+
+def replay_symbol(symbol, timestamps, bybit, bingx, params):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spread = strategy.spread_pct(bybit, bingx)
+    upper, lower = replay_bands(timestamps, spread, params['trigger_mode'], params['trigger_pct'], params['zscore'], params['persist_seconds'],
+                                params['min_pct'], params['warmup'], params['halflife'], params['persist_zscore'])
+    signals = strategy.signal_vector(spread, upper, lower)
+    signal_idx = np.flatnonzero(signals)
+    trades = []
+    earliest_entry = 0
+    while True:
+        pos = np.searchsorted(signal_idx, earliest_entry)
+        if pos >= len(signal_idx): break
+        entry = int(signal_idx[pos])
+        side = 'buy' if signals[entry] > 0 else 'sell'
+        entry_price = float(bingx[entry])
+        tp_price, sl_price = strategy.tp_sl_prices(side, entry_price, params['tp_percent'], params['sl_percent'])
+        # Live: TP/SL baru dicek pada tick setelah entry
+        exit_idx, outcome = find_exit(side, bybit, entry + 1, tp_price, sl_price)
+        trade = {'symbol': symbol, 'side': side, 'entry_ts': float(timestamps[entry]), 'entry_price': entry_price,
+                 'tp_price': tp_price, 'sl_price': sl_price, 'spread_pct': float(spread[entry])}
+        if exit_idx is None:
+            trade.update({'outcome': 'OPEN', 'exit_ts': None, 'exit_price': None, 'pnl_usdt': 0.0})
+            trades.append(trade)
+            break
+        exit_price = float(bybit[exit_idx])
+        trade.update({'outcome': outcome, 'exit_ts': float(timestamps[exit_idx]), 'exit_price': exit_price,
+                      'pnl_usdt': strategy.trade_pnl_usdt(side, entry_price, exit_price, params['amount_usdt'], params['leverage'], params['fee_pct'])})
+        trades.append(trade)
+        # Live: setelah trade ditutup, trigger baru boleh muncul di tick yang sama
+        earliest_entry = exit_idx
+    return trades
+
+def run_backtest(dataset, params=None):
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    trades = []
+    for symbol, (timestamps, bybit, bingx) in dataset.items():
+        trades.extend(replay_symbol(symbol, timestamps, bybit, bingx, params))
+    return trades
+
+def summarize(trades):
+    closed = sorted((t for t in trades if t['outcome'] != 'OPEN'), key=lambda t: t['exit_ts'])
+    pnl = np.fromiter((t['pnl_usdt'] for t in closed), dtype=np.float64, count=len(closed))
+    equity = np.concatenate(([0.0], np.cumsum(pnl)))
+    drawdown = np.maximum.accumulate(equity) - equity
+    tp_count = sum(1 for t in closed if t['outcome'] == 'TP')
+    return {
+        'trades': len(closed), 'open': len(trades) - len(closed), 'tp': tp_count, 'sl': len(closed) - tp_count,
+        'hit_rate': tp_count / len(closed) if closed else 0.0,
+        'total_pnl_usdt': float(pnl.sum()), 'avg_pnl_usdt': float(pnl.mean()) if closed else 0.0,
+        'max_drawdown_usdt': float(drawdown.max()),
+    }
+
+# --- PARAMETER SWEEP ---
+
+_worker_dataset = None
+
+def _init_worker(path, day):
+    # Setiap proses worker memuat data sekali, bukan per titik grid
+    global _worker_dataset
+    _worker_dataset = load_quotes(path, day)
+
+def _run_grid_point(params):
+    return params, summarize(run_backtest(_worker_dataset, params))
+
+def sweep(path, grid, base_params=None, workers=None, day=None):
+    names = list(grid)
+    points = [{**DEFAULT_PARAMS, **(base_params or {}), **dict(zip(names, values))} for values in itertools.product(*(grid[n] for n in names))]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path, day)) as pool:
+        return list(pool.map(_run_grid_point, points))
+
+def _parse_grid(text):
+    return [float(v) for v in text.split(',') if v.strip()]
+
+def print_summary(params, summary):
+    trigger = {'fixed': f"{params['trigger_pct']:.3f}%", 'zscore': f"zscore z={params['zscore']:g}",
+               'persistence': f"persistence z={params['persist_zscore']:g}/{params['persist_seconds']:g}s"}[params['trigger_mode']]
+    print(f"trigger={trigger} tp={params['tp_percent']:.3f}% sl={params['sl_percent']:.3f}% | "
+          f"trades={summary['trades']} open={summary['open']} hit={summary['hit_rate'] * 100:.1f}% "
+          f"pnl={summary['total_pnl_usdt']:.4f} avg={summary['avg_pnl_usdt']:.4f} maxDD={summary['max_drawdown_usdt']:.4f} USDT")
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest strategi spread Bybit vs BingX")
+    parser.add_argument('data', help="File quote (.csv/.npz) atau direktori segmen tick_recorder")
+    parser.add_argument('--day', help="Hari (YYYY-MM-DD) yang dimuat dari direktori segmen")
+    parser.add_argument('--trigger', type=float, default=DEFAULT_PARAMS['trigger_pct'])
+    parser.add_argument('--trigger-mode', choices=TRIGGER_MODES, default=DEFAULT_PARAMS['trigger_mode'])
+    parser.add_argument('--zscore', type=float, default=DEFAULT_PARAMS['zscore'], help="Mode zscore: jarak batas dari rata-rata (deviasi standar)")
+    parser.add_argument('--persist-zscore', type=float, default=DEFAULT_PARAMS['persist_zscore'])
+    parser.add_argument('--persist-seconds', type=float, default=DEFAULT_PARAMS['persist_seconds'])
+    parser.add_argument('--min-spread', type=float, default=DEFAULT_PARAMS['min_pct'], help="Batas minimum mode adaptif (%%)")
+    parser.add_argument('--halflife', type=float, default=DEFAULT_PARAMS['halflife'], help="Half-life statistik spread (detik)")
+    parser.add_argument('--warmup', type=float, default=DEFAULT_PARAMS['warmup'], help="Detik awal per simbol sebelum trigger adaptif aktif")
+    parser.add_argument('--tp', type=float, default=DEFAULT_PARAMS['tp_percent'])
+    parser.add_argument('--sl', type=float, default=DEFAULT_PARAMS['sl_percent'])
+    parser.add_argument('--amount', type=float, default=DEFAULT_PARAMS['amount_usdt'])
+    parser.add_argument('--leverage', type=float, default=DEFAULT_PARAMS['leverage'])
+    parser.add_argument('--fee', type=float, default=DEFAULT_PARAMS['fee_pct'], help="Fee per sisi (%%)")
+    parser.add_argument('--trigger-grid', type=_parse_grid)
+    parser.add_argument('--tp-grid', type=_parse_grid)
+    parser.add_argument('--sl-grid', type=_parse_grid)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10, help="Jumlah hasil sweep terbaik yang ditampilkan")
+    args = parser.parse_args()
+
+    params = {'trigger_pct': args.trigger, 'tp_percent': args.tp, 'sl_percent': args.sl,
+              'amount_usdt': args.amount, 'leverage': args.leverage, 'fee_pct': args.fee, 'trigger_mode': args.trigger_mode,
+              'zscore': args.zscore, 'persist_zscore': args.persist_zscore, 'persist_seconds': args.persist_seconds,
+              'min_pct': args.min_spread, 'halflife': args.halflife, 'warmup': args.warmup}
+    grid = {name: values for name, values in (('trigger_pct', args.trigger_grid), ('tp_percent', args.tp_grid), ('sl_percent', args.sl_grid)) if values}
+    if grid:
+        results = sweep(args.data, grid, params, args.workers, args.day)
+        results.sort(key=lambda r: r[1]['total_pnl_usdt'], reverse=True)
+        print(f"{len(results)} kombinasi parameter diuji, {min(args.top, len(results))} terbaik:")
+        for point, summary in results[:args.top]: print_summary(point, summary)
+    else:
+        print_summary(params, summarize(run_backtest(load_quotes(args.data, args.day), params)))
+
+if __name__ == '__main__':
+    main()
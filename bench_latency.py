@@ -0,0 +1,154 @@
+# Benchmark latensi end-to-end terhadap exchange tiruan lokal (mock_exchange.py).
+# Loop trading asli (background_trading_loop -> OrderExecutor -> process_trade_trigger -> create_bingx_order)
+# dijalankan terhadap server REST tiruan dengan latensi/jitter/error yang bisa diatur, lalu dilaporkan:
+# tick/detik, distribusi latensi per tahap (termasuk tick_to_order: quote diterima -> order selesai),
+# serta CPU & memori proses bot. Server tiruan berjalan di proses terpisah agar CPU-nya tidak ikut terhitung.
+#   python bench_latency.py --duration 30 --latency-ms 20 --jitter-ms 10 --error-rate 0.01
+#   python bench_latency.py --scanner --symbols 300 --json bench.json
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import mock_exchange
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return None
+
+def start_mock_process(args):
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Queue()
+    config = {
+        'symbols': mock_exchange.mock_symbols(args.symbols), 'volatility': args.volatility, 'mean_reversion': args.mean_reversion,
+        'venue_latency_ms': {'bybit': args.latency_ms, 'bingx': args.latency_ms}, 'jitter_ms': args.jitter_ms,
+        'error_rate': args.error_rate, 'order_latency_ms': args.order_latency_ms, 'rate_limit': args.venue_rate_limit,
+    }
+    process = ctx.Process(target=mock_exchange.run_mock_exchange, args=(ready,), kwargs=config, name='mock-exchange', daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+def configure_bot(main, args):
+    # Polling REST: default tanpa jeda (mengukur throughput). Stream: tick dipicu update, interval hanya batas tunggu.
+    if args.interval is not None: main.FETCH_INTERVAL = args.interval
+    elif not args.stream or args.scanner: main.FETCH_INTERVAL = 0.0
+    main.SCANNER_MODE = args.scanner
+    # Default 'fixed': mode adaptif belum memicu order selama warmup statistik spread
+    main.TRIGGER_MODE = args.trigger_mode
+    # Default tanpa penjadwal rate-limit (server tiruan tidak membatasi); --rate-limit mengukur bot dengan penjadwal aktif
+    main.RATE_LIMIT_ENABLED = args.rate_limit
+    main.SYMBOL_UNIVERSE.refresh()
+    settings = main.app.config['TRADING_SETTINGS']
+    settings.update({'api_key': 'bench-api-key', 'secret_key': 'bench-secret-key', 'real_trading_enabled': False, 'demo_mode_enabled': args.demo})
+    if not args.demo:
+        # Jalur REAL lengkap: verifikasi API, leverage, lalu order ditandatangani & dikirim ke server tiruan
+        settings['api_connection_status'] = main.verify_bingx_api(settings['api_key'], settings['secret_key'])
+        if "Berhasil" not in settings['api_connection_status']: raise SystemExit(f"Verifikasi API tiruan gagal: {settings['api_connection_status']}")
+        # Leverage disiapkan rekonsiliasi di background (selesai selama warmup), seperti saat startup bot
+        main.request_watched_leverage()
+        settings['real_trading_enabled'] = True
+        # Default: trade REAL ditutup lokal dari harga (seperti DEMO) agar throughput order tetap terukur;
+        # --reconcile menunggu fill TP/SL dari akun tiruan lewat PositionReconciler
+        main.POSITION_RECONCILE = args.reconcile
+        if args.reconcile: threading.Thread(target=main.POSITION_RECONCILER.run, name='bench-reconciler', daemon=True).start()
+    main.load_initial_state()
+    if args.stream and not args.scanner: main.start_market_streams([main.app.config['LIVE_DATA']['symbol']])
+
+def run(args):
+    mock_process, urls = start_mock_process(args)
+    # Bot membaca URL exchange dari environment saat di-import; state (journal, settings) di direktori sementara
+    os.environ.update({'BYBIT_API_URL': urls['bybit_rest'], 'BINGX_API_URL': urls['bingx_rest'], 'BYBIT_WS_URL': urls['bybit_ws'], 'BINGX_WS_URL': urls['bingx_ws']})
+    workdir = tempfile.mkdtemp(prefix='bench-latency-')
+    os.chdir(workdir)
+    import main
+
+    configure_bot(main, args)
+    threading.Thread(target=main.background_trading_loop, name='bench-trading-loop', daemon=True).start()
+    time.sleep(args.warmup)
+
+    main.METRICS.reset()
+    executor_before = main.ORDER_EXECUTOR.stats()
+    usage_before, wall_before = resource.getrusage(resource.RUSAGE_SELF), time.perf_counter()
+    time.sleep(args.duration)
+    usage_after, wall_after = resource.getrusage(resource.RUSAGE_SELF), time.perf_counter()
+    stages = main.METRICS.summary()
+    executor_after = main.ORDER_EXECUTOR.stats()
+    for feed in main.MARKET_FEEDS.values(): feed.stop()
+    mock_process.terminate()
+
+    elapsed = wall_after - wall_before
+    cpu_seconds = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    tick_stage = 'tick.scanner' if args.scanner else 'tick'
+    ticks = stages.get(tick_stage, {}).get('count', 0)
+    return {
+        'config': vars(args), 'workdir': workdir, 'elapsed_s': round(elapsed, 3),
+        'ticks': ticks, 'ticks_per_sec': round(ticks / elapsed, 2),
+        'orders': executor_after['completed'] - executor_before['completed'],
+        'order_failures': executor_after['failed'] - executor_before['failed'],
+        'rejected_in_flight': executor_after['rejected_in_flight'] - executor_before['rejected_in_flight'],
+        'cpu_percent': round(cpu_seconds / elapsed * 100, 1),
+        'peak_rss_mb': round(usage_after.ru_maxrss / 1024, 1),  # ru_maxrss dalam KB di Linux
+        'rss_mb': round(current_rss_mb(), 1) if current_rss_mb() is not None else None,
+        'stages': stages,
+        'rate_limits': {'bybit': main.BYBIT_CLIENT.rate_limit_stats(), 'bingx': main.BINGX_CLIENT.rate_limit_stats()} if args.rate_limit else None,
+    }
+
+def print_report(report):
+    cfg = report['config']
+    print(f"\n=== Benchmark {('scanner ' + str(cfg['symbols']) + ' simbol') if cfg['scanner'] else 'single-symbol'}, "
+          f"{'DEMO' if cfg['demo'] else 'REAL (mock)'}, latensi {cfg['latency_ms']}±{cfg['jitter_ms']}ms, error {cfg['error_rate'] * 100:.1f}% ===")
+    print(f"durasi      : {report['elapsed_s']:.1f}s")
+    print(f"tick        : {report['ticks']} ({report['ticks_per_sec']:.1f}/s)")
+    print(f"order       : {report['orders']} selesai, {report['order_failures']} gagal, {report['rejected_in_flight']} ditolak (in-flight)")
+    print(f"CPU         : {report['cpu_percent']:.1f}% | RSS {report['rss_mb']} MB (puncak {report['peak_rss_mb']} MB)")
+    print(f"{'tahap':<26}{'n':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, s in report['stages'].items():
+        print(f"{stage:<26}{s['count']:>8}{s['p50_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+    for venue, limits in (report['rate_limits'] or {}).items():
+        lanes = ', '.join(f"{lane} {l['throttled']}/{l['requests']} tunggu, {l['timeouts']} batal" for lane, l in limits['lanes'].items() if l['requests'])
+        print(f"rate-limit {venue:<6}: {lanes} | 429: {limits['rate_limited']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latensi bot terhadap exchange tiruan lokal")
+    parser.add_argument('--duration', type=float, default=20, help="Detik pengukuran (setelah warmup)")
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help="Latensi dasar setiap request REST")
+    parser.add_argument('--jitter-ms', type=float, default=2.0, help="Tambahan latensi acak 0..jitter")
+    parser.add_argument('--order-latency-ms', type=float, default=None, help="Latensi dasar khusus endpoint order BingX")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Peluang respons HTTP 500 per request (0..1)")
+    parser.add_argument('--symbols', type=int, default=50, help="Jumlah simbol di universe tiruan")
+    parser.add_argument('--volatility', type=float, default=0.001)
+    parser.add_argument('--mean-reversion', type=float, default=0.05)
+    parser.add_argument('--interval', type=float, default=None, help="FETCH_INTERVAL bot selama benchmark (default 0 untuk polling REST)")
+    parser.add_argument('--scanner', action='store_true', help="Jalankan mode scanner (endpoint massal)")
+    parser.add_argument('--stream', action='store_true', help="Pakai feed WebSocket tiruan (mode single-symbol)")
+    parser.add_argument('--demo', action='store_true', help="Mode DEMO: tanpa request order/leverage")
+    parser.add_argument('--trigger-mode', choices=['fixed', 'zscore', 'persistence'], default='fixed', help="Mode trigger bot selama benchmark")
+    parser.add_argument('--rate-limit', action='store_true', help="Aktifkan penjadwal rate-limit bot (RATE_LIMITS)")
+    parser.add_argument('--venue-rate-limit', type=int, default=None, help="Server tiruan membalas 429 di atas N request/detik per venue")
+    parser.add_argument('--reconcile', action='store_true', help="Trade REAL ditutup dari fill di akun tiruan (rekonsiliasi posisi)")
+    parser.add_argument('--verbose', action='store_true', help="Tampilkan output print bot selama benchmark")
+    parser.add_argument('--json', help="Tulis laporan lengkap ke file JSON (untuk membandingkan antar versi)")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # Output print bot tetap dieksekusi (bagian dari biaya hot path) tetapi dibuang kecuali --verbose
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else open(os.devnull, 'w')):
+        report = run(args)
+    print_report(report)
+    if json_path:
+        with open(json_path, 'w') as f: json.dump(report, f, indent=2)
+        print(f"Laporan ditulis ke {json_path}")
+    os._exit(0)  # Thread loop/feed bot bersifat daemon tanpa mekanisme stop
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Microbenchmark biaya penandatanganan payload order BingX per order:
+# jalur lama (dict + sorted + json.dumps + hmac.new per request) vs BingxSigner.
+#   python bench_signing.py --iterations 100000
+import argparse
+import json
+import time
+import timeit
+
+from main import BingxSigner, generate_bingx_signature
+
+# Salinan jalur pembuatan payload create_bingx_order sebelum BingxSigner, sebagai pembanding
+def legacy_order_payload(secret_key, symbol, side, order_type, quantity, tp_price=None, sl_price=None, timestamp=None):
+    params = {
+        'symbol': symbol.replace("/", "-"),
+        'side': 'BUY' if side.lower() == 'buy' else 'SELL',
+        'positionSide': 'LONG' if side.lower() == 'buy' else 'SHORT',
+        'type': order_type.upper(), 'quantity': str(quantity),
+        'timestamp': timestamp if timestamp is not None else int(time.time() * 1000),
+    }
+    if tp_price and tp_price > 0:
+        params['takeProfit'] = json.dumps({"type": "TAKE_PROFIT_MARKET", "stopPrice": round(tp_price, 5), "workingType": "MARK_PRICE"})
+    if sl_price and sl_price > 0:
+        params['stopLoss'] = json.dumps({"type": "STOP_MARKET", "stopPrice": round(sl_price, 5), "workingType": "MARK_PRICE"})
+    query_string_to_sign = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
+    signature = generate_bingx_signature(secret_key, query_string_to_sign)
+    return f"{query_string_to_sign}&signature={signature}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark signing order BingX")
+    parser.add_argument('--iterations', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    api_key, secret_key = 'bench-api-key', 'bench-secret-key-0123456789abcdef0123456789abcdef'
+    order = ('BRETT/USDT', 'buy', 'market', 245.73129, 0.081234567, 0.079876543)
+    signer = BingxSigner(api_key, secret_key)
+
+    # Pastikan kedua jalur menghasilkan payload yang identik sebelum diukur
+    for side in ('buy', 'sell'):
+        args_ = (order[0], side) + order[2:]
+        expected = legacy_order_payload(secret_key, *args_, timestamp=1700000000000)
+        actual = signer.order_payload(*args_, timestamp=1700000000000)
+        assert expected == actual, f"Payload berbeda:\n{expected}\n{actual}"
+
+    results = {}
+    for name, fn in (('legacy', lambda: legacy_order_payload(secret_key, *order)), ('signer', lambda: signer.order_payload(*order))):
+        best = min(timeit.repeat(fn, number=args.iterations, repeat=args.repeat))
+        results[name] = best / args.iterations * 1e6
+        print(f"{name:>7}: {results[name]:.2f} us/order")
+    print(f"speedup: {results['legacy'] / results['signer']:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# Log event terstruktur (seq, waktu, level, jenis, pesan) dalam ring buffer berkapasitas tetap.
+# Event ke-seq menempati slot seq % kapasitas, sehingga append tidak mengalokasikan ulang list dan pembaca
+# hanya menyalin event yang belum dilihatnya. Riwayat lebih panjang ditulis thread writer ke file JSONL
+# yang dirotasi (events.jsonl, events.jsonl.1, ...), dan tetap bisa dibaca lewat read().
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+LogEvent = namedtuple('LogEvent', ['seq', 'ts', 'level', 'kind', 'message'])
+
+def infer_kind(message):
+    # Untuk pemanggil lama yang hanya memberi teks
+    if message.startswith('[NEW]'): return 'NEW'
+    if message.startswith('[TP HIT]'): return 'TP'
+    if message.startswith('[SL HIT]'): return 'SL'
+    if message.startswith('[CLOSED]'): return 'CLOSED'
+    if 'ERROR' in message or 'Gagal' in message: return 'ERROR'
+    return 'INFO'
+
+def event_to_dict(event):
+    return {**event._asdict(), 'text': f"[{datetime.fromtimestamp(event.ts).strftime('%H:%M:%S')}] {event.message}"}
+
+def event_from_dict(data):
+    return LogEvent(*(data[field] for field in LogEvent._fields))
+
+class EventLog:
+    def __init__(self, capacity=1000, spill_path=None, max_bytes=5 * 2**20, backups=5, flush_interval=1.0):
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._ring = [None] * capacity
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Writer thread & read() bisa flush bersamaan
+        self._pending = []  # Event yang belum ditulis ke file spill
+        self._spilling = False
+        self._file = None
+        self._thread = None
+
+    @property
+    def latest_seq(self): return self._seq
+
+    def append(self, message, kind=None, level=None, ts=None):
+        kind = kind or infer_kind(message)
+        level = level or ('ERROR' if kind == 'ERROR' else 'INFO')
+        with self._lock:
+            self._seq += 1
+            event = LogEvent(self._seq, time.time() if ts is None else ts, level, kind, message)
+            self._ring[self._seq % self.capacity] = event
+            if self._spilling: self._pending.append(event)
+        return event
+
+    def restore(self, events):
+        # Memuat event dari snapshot; nomor urut dipertahankan dan tidak pernah mundur
+        if not events: return
+        with self._lock:
+            self._seq = max(self._seq, max(e.seq for e in events))
+            for event in events:
+                if event.seq > self._seq - self.capacity: self._ring[event.seq % self.capacity] = event
+
+    def since(self, seq, limit=None):
+        # (seq terbaru, event setelah seq [terbaru dulu], reset). reset=True bila klien tertinggal lebih jauh
+        # dari yang bisa dikirim (atau seq berasal dari masa depan): kirim ulang `limit` event terakhir.
+        with self._lock:
+            latest = self._seq
+            available = min(latest, self.capacity)
+            missed = latest - seq
+            reset = missed < 0 or missed > available or (limit is not None and missed > limit)
+            count = (available if limit is None else min(available, limit)) if reset else missed
+            events = [self._ring[(latest - i) % self.capacity] for i in range(count)]
+        return latest, [e for e in events if e is not None], reset
+
+    def recent(self, limit=None):
+        return self.since(0, limit)[1] if self._seq else []
+
+    def read(self, since, limit=100):
+        # Event dengan seq > since, terlama dulu, maksimal limit; yang sudah keluar dari ring dibaca dari file spill
+        with self._lock: oldest_in_ring = max(self._seq - self.capacity + 1, 1)
+        if since + 1 >= oldest_in_ring or not self.spill_path:
+            latest, events, _ = self.since(since, None)
+            return list(reversed(events))[:limit] if since < latest else []
+        self.flush()
+        # Di bawah _write_lock hanya membuka file & mencatat ukurannya: rotasi tidak bisa mengganti nama file di antara
+        # daftar file dan open(), dan descriptor yang sudah terbuka tetap menunjuk file yang sama setelah di-rename.
+        # Pemindaian berjalan tanpa lock, sehingga writer tidak menunggu pembacaan disk dari /events.
+        with self._write_lock:
+            files = [open(path, 'rb') for path in self._spill_files()]
+            files = [(f, os.fstat(f.fileno()).st_size) for f in files]
+        try: return self._scan(files, since, limit)
+        finally:
+            for f, _ in files: f.close()
+
+    def _scan(self, files, since, limit):
+        result = []
+        for f, size in files:
+            # File yang seluruh isinya sudah dimiliki klien dilewati tanpa dipindai
+            last = self._last_seq(f, size)
+            if last is None or last <= since: continue
+            f.seek(0)
+            offset = 0
+            for line in f:
+                # Baris yang ditulis setelah snapshot ukuran diabaikan (bisa belum lengkap)
+                offset += len(line)
+                if offset > size: break
+                try: event = event_from_dict(json.loads(line))
+                except (ValueError, KeyError): continue
+                if event.seq <= since: continue
+                result.append(event)
+                if len(result) >= limit: return result
+        return result
+
+    # --- SPILL KE FILE ---
+
+    def _spill_files(self):
+        # Terlama dulu: events.jsonl.N ... events.jsonl.1, events.jsonl
+        paths = [f"{self.spill_path}.{i}" for i in range(self.backups, 0, -1)] + [self.spill_path]
+        return [p for p in paths if os.path.exists(p)]
+
+    def _last_seq(self, f, size):
+        # seq event terakhir sebelum byte ke-size sebuah file spill (dari ekor file), None bila file kosong
+        start = max(size - 4096, 0)
+        f.seek(start)
+        for line in reversed(f.read(size - start).splitlines()):
+            try: return json.loads(line)['seq']
+            except (ValueError, KeyError): continue
+        return None
+
+    def _last_spilled_seq(self):
+        # File aktif bisa kosong tepat setelah rotasi, jadi mundur ke cadangan terbaru
+        for path in reversed(self._spill_files()):
+            with open(path, 'rb') as f: seq = self._last_seq(f, os.fstat(f.fileno()).st_size)
+            if seq is not None: return seq
+        return 0
+
+    def start(self):
+        if not self.spill_path or self._thread is not None: return self
+        with self._lock:
+            # Lanjutkan penomoran dari file spill agar seq unik lintas restart
+            self._seq = max(self._seq, self._last_spilled_seq())
+            self._spilling = True
+        self._file = open(self.spill_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._writer_loop, name='event-log-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def _writer_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try: self.flush()
+            except Exception as e: print(f"ERROR: Gagal menulis log event: {e}")
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock: pending, self._pending = self._pending, []
+            if not pending or self._file is None: return
+            self._file.write(''.join(json.dumps(e._asdict()) + '\n' for e in pending))
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes: self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.spill_path}.{i}"): os.replace(f"{self.spill_path}.{i}", f"{self.spill_path}.{i + 1}")
+        os.replace(self.spill_path, f"{self.spill_path}.1")
+        self._file = open(self.spill_path, 'a', encoding='utf-8')
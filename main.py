@@ -1,62 +1,323 @@
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import hmac
 import hashlib
 import urllib.parse
-from flask import Flask, jsonify, render_template_string, request
+from flask import Flask, Response, jsonify, render_template_string, request
 import random
 import os
 import json
 import threading
+import gzip
+import glob
+import argparse
+import multiprocessing
+import secrets
+from multiprocessing.connection import Client, Listener, AuthenticationError
+import queue
+import bisect
+import math
+import zlib
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
+import strategy
+from tick_recorder import TickRecorder
+from metrics import MetricsRegistry, merge_prometheus
+from orderbook import OrderBook, book_from_levels, best_price, vwap
+from state_snapshot import SnapshotStore, atomic_write
+from event_log import EventLog, event_to_dict, event_from_dict
+from spread_stats import SpreadStats, TRIGGER_MODES, trigger_bands
+from risk_view import RiskView
+from rate_limiter import TokenBucket, VenueScheduler, request_lane, current_lane, bybit_limit_headers, bingx_limit_headers
+
+try:
+    import websocket  # websocket-client, opsional untuk feed streaming
+except ImportError:
+    websocket = None
+
 # --- KONFIGURASI AWAL ---
 DEFAULT_SYMBOL = 'BRETT/USDT'
 FETCH_INTERVAL = 0.5  # Interval pengambilan data (detik)
 # Diubah menjadi selisih harga pemicu
 TRIGGER_PERCENTAGE_SPREAD = 0.15
-TRADE_LOG_FILE = 'trades.json'
+# Mode trigger: 'fixed' (TRIGGER_PERCENTAGE_SPREAD), 'zscore' atau 'persistence' (statistik spread bergulir per simbol)
+TRIGGER_MODE = 'fixed'
+TRIGGER_ZSCORE = 3.0  # Mode zscore: spread minimal sejauh ini (deviasi standar) dari rata-ratanya
+TRIGGER_PERSIST_ZSCORE = 2.0  # Mode persistence: ambang penyimpangan ...
+TRIGGER_PERSIST_SECONDS = 2.0  # ... yang harus bertahan di sisi yang sama selama ini
+TRIGGER_MIN_SPREAD_PCT = 0.1  # Batas bawah mode adaptif, agar spread kecil yang stabil tidak memicu order
+SPREAD_STATS_HALFLIFE = 300  # Half-life rata-rata/varians EWMA spread (detik)
+SPREAD_STATS_WARMUP = 60  # Detik pengamatan per simbol sebelum trigger adaptif aktif
+# Selisih waktu terima maksimum antara quote Bybit & BingX agar spread dianggap valid (ms)
+MAX_QUOTE_SKEW_MS = 250
+# Trigger dihitung dari harga yang bisa dieksekusi (bid/ask + kedalaman untuk nilai order), bukan harga transaksi terakhir.
+# 'auto': hanya bila order book datang dari feed stream; tanpa stream, depth REST menambah 2 request per tick di lajur
+# 'market' (menggandakan laju request polling), jadi trigger memakai harga terakhir. True: selalu, REST sebagai fallback.
+# Mode scanner tetap mengonfirmasi kandidat dengan depth REST (dibatasi SCANNER_CONFIRM_TOP_K) kecuali bernilai False.
+EXECUTABLE_SPREAD = 'auto'
+DEPTH_LEVELS = 50  # Level order book per sisi (Bybit: 1/50/200/500, BingX: 5/10/20/50/100)
+BINGX_DEPTH_INTERVAL = '500ms'  # Interval push depth BingX
+# Mode scanner: pantau seluruh AVAILABLE_SYMBOLS via endpoint ticker massal (2 request per siklus)
+SCANNER_MODE = False
+SCANNER_TOP_N = 10  # Jumlah spread terbesar yang ditampilkan di /data
+SCANNER_CONFIRM_TOP_K = 3  # Kandidat (|spread| terbesar) per siklus yang dikonfirmasi dengan order book (2 request depth per kandidat)
+ORDER_WORKERS = 4  # Worker eksekusi order
+ORDER_QUEUE_SIZE = 32  # Kapasitas antrean sinyal order (backpressure)
+LEVERAGE_WORKERS = 4  # Panggilan set leverage BingX yang berjalan bersamaan saat rekonsiliasi
+# Batas risiko global atas seluruh trade aktif (DEMO & REAL, semua shard); None = tanpa batas
+MAX_CONCURRENT_POSITIONS = None
+MAX_TOTAL_NOTIONAL_USDT = None  # Jumlah order_amount_usdt * leverage
+RECORD_TICKS = False  # Rekam setiap quote yang dilihat bot ke segmen biner (lihat tick_recorder.py)
+TICK_RECORD_DIR = 'ticks'
+TRADE_LOG_FILE = 'trades.json'  # Format lama, hanya dibaca sekali untuk migrasi ke journal
+TRADE_JOURNAL_FILE = 'trades.jsonl'  # Journal append-only: satu event JSON per baris
+JOURNAL_COMPACT_INTERVAL = 3600  # Detik antar pengecekan compaction journal
+JOURNAL_COMPACT_MIN_REDUNDANT = 1000  # Compaction hanya jika baris usang sebanyak ini
 SETTINGS_FILE = 'settings.json'
-MAX_LOG_HISTORY = 20
+STATE_SNAPSHOT_FILE = 'state.snapshot'  # Snapshot state engine (trade aktif, pengaturan, log) untuk recovery cepat
+STATE_SNAPSHOT_INTERVAL = 30  # Detik antar snapshot; recovery hanya me-replay journal setelah snapshot terakhir
+SYMBOL_CACHE_FILE = 'symbols.json'  # Metadata simbol (tick size, lot size, min qty, max leverage)
+SYMBOL_CACHE_TTL = 6 * 3600  # Detik sebelum cache simbol di-refresh di background
+SYMBOL_REFRESH_RETRY = 60  # Jeda sebelum mencoba lagi bila refresh gagal
+MAX_LOG_HISTORY = 20  # Baris log yang ditampilkan di dashboard
+EVENT_LOG_CAPACITY = 1000  # Event terakhir yang disimpan di memori (ring buffer)
+EVENT_LOG_FILE = 'events.jsonl'  # Riwayat event lengkap, dirotasi per EVENT_LOG_MAX_BYTES
+EVENT_LOG_MAX_BYTES = 5 * 2**20
+EVENT_LOG_BACKUPS = 5
+SSE_HEARTBEAT_SECONDS = 15  # Komentar keep-alive untuk koneksi /stream yang sedang diam
+WEB_HOST, WEB_PORT = '0.0.0.0', 5000
+WEB_THREADS = 16  # Thread server WSGI (setiap koneksi /stream memakai satu thread)
+ENGINE_ADDRESS = ('127.0.0.1', 6001)  # Kanal lokal engine <-> web
+ENGINE_AUTHKEY_FILE = 'engine.key'
+# Mode shard (--shards N): universe dibagi ke N proses engine; shard ke-i melayani kanal di port ENGINE_ADDRESS + 1 + i
+SHARD_COUNT = 1
+SHARD_INDEX = 0  # Diisi di dalam proses shard
+SHARD_POLL_INTERVAL = 0.25  # Detik antar pengambilan quote & log dari setiap shard oleh supervisor
+SHARD_RESTART_BACKOFF = (1, 30)  # Jeda restart shard yang mati (detik): awal, maksimum (berlipat dua per crash beruntun)
+SHARD_STABLE_SECONDS = 60  # Shard yang hidup selama ini dianggap pulih, backoff kembali ke awal
+SHARD_LAYOUT_FILE = 'shards.json'  # Jumlah shard terakhir; bila berubah, trade aktif dipindahkan ke journal shard barunya
 
 # --- KONSTANTA API ---
-BYBIT_API_URL = "https://api.bybit.com"
-BINGX_API_URL = "https://open-api.bingx.com"
+# URL exchange bisa diarahkan ke server tiruan lokal (mock_exchange.py) lewat environment variable
+BYBIT_API_URL = os.environ.get('BYBIT_API_URL', "https://api.bybit.com")
+BINGX_API_URL = os.environ.get('BINGX_API_URL', "https://open-api.bingx.com")
+HTTP_POOL_SIZE = 10  # Koneksi keep-alive maksimum per exchange
+HTTP_MAX_RETRIES = 2  # Retry (dengan backoff) hanya untuk request GET
+HTTP_RETRY_BACKOFF = 0.2
+# Timeout (connect, read) per kelas endpoint, detik
+ENDPOINT_TIMEOUTS = {'market': (2, 3), 'reference': (3, 5), 'account': (3, 5), 'order': (3, 10)}
+# Penjadwal rate-limit (lihat rate_limiter.py): semua request ke exchange mengambil token lebih dulu
+RATE_LIMIT_ENABLED = True
+# (token per detik, burst) untuk batas bersama per venue ('venue') dan per kelas endpoint. Perkiraan konservatif dari
+# batas publik exchange; header rate-limit respons menurunkan bucket saat kuota sebenarnya lebih kecil.
+RATE_LIMITS = {
+    'bybit': {'venue': (100, 100), 'reference': (2, 5)},
+    'bingx': {'venue': (50, 100), 'market': (40, 80), 'reference': (2, 5), 'account': (10, 20), 'order': (5, 10)},
+}
+ENDPOINT_LANES = {'order': 'order', 'market': 'market', 'reference': 'housekeeping', 'account': 'housekeeping'}
+RATE_LIMIT_RESERVES = {'order': 0.0, 'market': 0.1, 'housekeeping': 0.3}  # Fraksi bucket yang disisakan untuk lajur di atasnya
+RATE_LIMIT_MAX_WAIT = {'order': 2.0, 'market': 0.5, 'housekeeping': 30.0}  # Lebih lama dari ini: request dibatalkan
+BYBIT_WS_URL = os.environ.get('BYBIT_WS_URL', "wss://stream.bybit.com/v5/public/linear")
+BINGX_WS_URL = os.environ.get('BINGX_WS_URL', "wss://open-api-swap.bingx.com/swap-market")
+STREAM_ENABLED = True  # Pakai feed WebSocket bila tersedia, REST tetap sebagai fallback
+STREAM_STALE_SECONDS = 2.0  # Feed tanpa pesan (termasuk heartbeat) selama ini dianggap basi beserta seluruh quote-nya
+BINGX_USER_WS_URL = os.environ.get('BINGX_USER_WS_URL', BINGX_WS_URL)  # Stream user-data (…?listenKey=)
+POSITION_RECONCILE = True  # Trade REAL ditutup berdasarkan posisi/fill di BingX, bukan perkiraan dari harga Bybit
+POSITION_POLL_INTERVAL = 5  # Detik antar polling posisi selama ada trade REAL aktif
+POSITION_REQUEST_BUDGET = 30  # Maksimum request rekonsiliasi (posisi + riwayat order) per menit
+POSITION_GRACE_SECONDS = 10  # Trade yang baru dibuka belum dicek (posisi bisa belum terlihat)
+POSITION_MISSING_CLOSE_SECONDS = 120  # Posisi hilang tanpa fill penutup yang ditemukan: ditutup sebagai CLOSED_EXTERNAL
+BINGX_USER_STREAM = True  # Fill TP/SL dari stream user-data (listenKey); polling tetap berjalan sebagai cadangan
+LISTEN_KEY_KEEPALIVE = 30 * 60  # listenKey BingX kedaluwarsa setelah 60 menit tanpa perpanjangan
+METRICS_ENABLED = True  # Span latensi per tahap (lihat metrics.py); False = hampir tanpa biaya
+METRICS_SUMMARY_INTERVAL = 60  # Detik antar ringkasan p50/p99/max di log
+
+METRICS = MetricsRegistry(enabled=METRICS_ENABLED)
+
+# --- KLIEN HTTP PER EXCHANGE ---
+# Satu session keep-alive per exchange agar handshake TCP/TLS tidak terulang di setiap tick.
+# Setiap request melewati penjadwal rate-limit venue-nya; lajur diambil dari argumen `lane`, request_lane() aktif
+# di thread pemanggil, atau ENDPOINT_LANES. Request yang tidak mendapat token tepat waktu gagal dengan RequestThrottled.
+
+class RequestThrottled(requests.exceptions.RequestException):
+    pass
+
+class ExchangeClient:
+    def __init__(self, venue, base_url, pool_size=HTTP_POOL_SIZE, max_retries=HTTP_MAX_RETRIES, backoff=HTTP_RETRY_BACKOFF, scheduler=None):
+        self.venue = venue
+        self.base_url = base_url
+        self.scheduler = scheduler
+        # POST (order, leverage) tidak pernah di-retry otomatis agar order tidak tereksekusi dua kali.
+        # 429 tidak di-retry di sini: penjadwal menahan venue sampai Retry-After
+        retry = Retry(total=max_retries, connect=max_retries, read=max_retries, backoff_factor=backoff,
+                      status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset(['GET']), raise_on_status=False)
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+        self._stats_lock = threading.Lock()
+        self._stats = {}  # kelas endpoint -> {'requests', 'errors', 'total_ms', 'max_ms'}
+
+    def request(self, method, path, endpoint='market', lane=None, **kwargs):
+        kwargs.setdefault('timeout', ENDPOINT_TIMEOUTS[endpoint])
+        scheduler = self.scheduler if RATE_LIMIT_ENABLED else None
+        if scheduler is not None:
+            lane = lane or current_lane() or ENDPOINT_LANES[endpoint]
+            if scheduler.acquire(endpoint, lane) is None:
+                raise RequestThrottled(f"Kuota rate-limit {self.venue} ({endpoint}, lajur {lane}) habis, request dibatalkan")
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            failed = response.status_code >= 400
+            if scheduler is not None: scheduler.record_response(endpoint, response.status_code, response.headers)
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record(endpoint, elapsed * 1000, failed)
+            METRICS.observe(f"http.{self.venue}.{endpoint}", elapsed)
+
+    def get(self, path, endpoint='market', **kwargs): return self.request('GET', path, endpoint, **kwargs)
+    def post(self, path, endpoint='market', **kwargs): return self.request('POST', path, endpoint, **kwargs)
+    def put(self, path, endpoint='market', **kwargs): return self.request('PUT', path, endpoint, **kwargs)
+
+    def rate_limit_stats(self):
+        return self.scheduler.stats() if self.scheduler else None
+
+    def _record(self, endpoint, elapsed_ms, failed):
+        with self._stats_lock:
+            s = self._stats.setdefault(endpoint, {'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            s['requests'] += 1
+            s['errors'] += failed
+            s['total_ms'] += elapsed_ms
+            s['max_ms'] = max(s['max_ms'], elapsed_ms)
+
+    def connection_stats(self):
+        # Dari pool urllib3: koneksi baru (= handshake) vs total request yang dikirim lewat pool
+        pools = self._adapter.poolmanager.pools
+        new_connections = sent = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None: continue
+            new_connections += pool.num_connections
+            sent += pool.num_requests
+        return {'new_connections': new_connections, 'pool_requests': sent, 'reused_requests': max(sent - new_connections, 0)}
+
+    def stats(self):
+        with self._stats_lock:
+            endpoints = {name: {'requests': s['requests'], 'errors': s['errors'], 'avg_ms': round(s['total_ms'] / s['requests'], 2) if s['requests'] else 0, 'max_ms': round(s['max_ms'], 2)}
+                         for name, s in self._stats.items()}
+        return {'venue': self.venue, 'endpoints': endpoints, **self.connection_stats()}
+
+def record_throttle_wait(venue, lane, seconds):
+    METRICS.observe(f"throttle.{venue}.{lane}", seconds)
+
+def venue_scheduler(venue, header_parser, share=1):
+    # share = jumlah proses yang berbagi batas yang sama (mode shard): laju & burst dibagi rata
+    limits = {name: (rate / share, max(burst / share, 1)) for name, (rate, burst) in RATE_LIMITS[venue].items()}
+    return VenueScheduler(venue, limits, RATE_LIMIT_RESERVES, RATE_LIMIT_MAX_WAIT, header_parser, record_throttle_wait)
+
+BYBIT_CLIENT = ExchangeClient('bybit', BYBIT_API_URL, scheduler=venue_scheduler('bybit', bybit_limit_headers))
+BINGX_CLIENT = ExchangeClient('bingx', BINGX_API_URL, scheduler=venue_scheduler('bingx', bingx_limit_headers))
 
 # --- FUNGSI HELPER UNTUK API ---
 
 def generate_bingx_signature(secret_key, params_str):
     return hmac.new(secret_key.encode('utf-8'), params_str.encode('utf-8'), hashlib.sha256).hexdigest()
 
-def get_bybit_symbols():
+# Penanda tangan request BingX: state HMAC sudah di-key sekali lalu di-copy per request,
+# dan bagian statis payload order (symbol, side, positionSide) disiapkan sekali per simbol/sisi.
+class BingxSigner:
+    TP_TEMPLATE = '{"type": "TAKE_PROFIT_MARKET", "stopPrice": %r, "workingType": "MARK_PRICE"}'
+    SL_TEMPLATE = '{"type": "STOP_MARKET", "stopPrice": %r, "workingType": "MARK_PRICE"}'
+
+    def __init__(self, api_key, secret_key):
+        self.api_key = api_key
+        self._mac = hmac.new(secret_key.encode('utf-8'), digestmod=hashlib.sha256)
+        self.headers = {'X-BX-APIKEY': api_key}
+        self.form_headers = {'X-BX-APIKEY': api_key, 'Content-Type': 'application/x-www-form-urlencoded'}
+        self._order_parts = {}  # (symbol, side) -> (prefix, side_part, symbol_part)
+
+    def sign(self, payload):
+        mac = self._mac.copy()
+        mac.update(payload.encode('utf-8'))
+        return mac.hexdigest()
+
+    def signed_params(self, params):
+        query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
+        return {**params, 'signature': self.sign(query_string)}
+
+    def _static_order_parts(self, symbol, side):
+        key = (symbol, side)
+        parts = self._order_parts.get(key)
+        if parts is None:
+            is_buy = side.lower() == 'buy'
+            parts = (f"positionSide={'LONG' if is_buy else 'SHORT'}&quantity=", f"&side={'BUY' if is_buy else 'SELL'}", f"&symbol={symbol.replace('/', '-')}")
+            self._order_parts[key] = parts
+        return parts
+
+    def order_payload(self, symbol, side, order_type, quantity, tp_price=None, sl_price=None, timestamp=None):
+        # Urutan field mengikuti urutan alfabet yang dipakai BingX untuk signature:
+        # positionSide, quantity, side, stopLoss, symbol, takeProfit, timestamp, type
+        prefix, side_part, symbol_part = self._static_order_parts(symbol, side)
+        if timestamp is None: timestamp = int(time.time() * 1000)
+        stop_loss = f"&stopLoss={self.SL_TEMPLATE % round(sl_price, 5)}" if sl_price and sl_price > 0 else ''
+        take_profit = f"&takeProfit={self.TP_TEMPLATE % round(tp_price, 5)}" if tp_price and tp_price > 0 else ''
+        payload = f"{prefix}{quantity}{side_part}{stop_loss}{symbol_part}{take_profit}&timestamp={timestamp}&type={order_type.upper()}"
+        return f"{payload}&signature={self.sign(payload)}"
+
+_bingx_signer_cache = {}
+
+def get_bingx_signer(api_key, secret_key):
+    signer = _bingx_signer_cache.get((api_key, secret_key))
+    if signer is None:
+        _bingx_signer_cache.clear()  # Hanya kredensial terakhir yang relevan
+        signer = _bingx_signer_cache[(api_key, secret_key)] = BingxSigner(api_key, secret_key)
+    return signer
+
+# Metadata instrumen: simbol -> dict field per exchange. Kosong bila request gagal.
+def get_bybit_instruments():
+    # Bybit hanya sumber harga; cukup daftar simbol yang aktif diperdagangkan
+    instruments, cursor = set(), ''
     try:
-        url = f"{BYBIT_API_URL}/v5/market/tickers?category=linear"
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        return {item['symbol'].replace("USDT", "/USDT") for item in data['result']['list'] if item['symbol'].endswith("USDT")}
+        while True:
+            response = BYBIT_CLIENT.get("/v5/market/instruments-info", endpoint='reference', params={'category': 'linear', 'limit': 1000, 'cursor': cursor})
+            response.raise_for_status()
+            result = response.json()['result']
+            for item in result['list']:
+                if not item['symbol'].endswith("USDT") or item.get('status', 'Trading') != 'Trading': continue
+                instruments.add(item['symbol'].replace("USDT", "/USDT"))
+            cursor = result.get('nextPageCursor')
+            if not cursor: return instruments
     except Exception as e:
         print(f"Gagal mengambil simbol Bybit: {e}")
         return set()
 
-def get_bingx_symbols():
+def get_bingx_contracts():
     try:
-        url = f"{BINGX_API_URL}/openApi/swap/v2/quote/contracts"
-        response = requests.get(url, timeout=5)
+        response = BINGX_CLIENT.get("/openApi/swap/v2/quote/contracts", endpoint='reference')
         response.raise_for_status()
         data = response.json()
-        return {item['symbol'].replace("-", "/") for item in data['data'] if item['symbol'].endswith("-USDT")}
+        return {item['symbol'].replace("-", "/"): {
+                    'tick_size': 10 ** -int(item['pricePrecision']), 'lot_size': 10 ** -int(item['quantityPrecision']),
+                    'min_qty': float(item.get('tradeMinQuantity') or 0)}
+                for item in data['data'] if item['symbol'].endswith("-USDT")}
     except Exception as e:
         print(f"Gagal mengambil simbol BingX: {e}")
-        return set()
+        return {}
 
 # Dipertahankan untuk memantau SL/TP dan sebagai harga leader
 def get_bybit_latest_price(symbol):
     bybit_symbol = symbol.replace('/', '')
     try:
         # Menggunakan endpoint ticker untuk harga lebih real-time
-        url = f"{BYBIT_API_URL}/v5/market/tickers?category=linear&symbol={bybit_symbol}"
-        response = requests.get(url, timeout=3)
+        response = BYBIT_CLIENT.get(f"/v5/market/tickers?category=linear&symbol={bybit_symbol}")
         response.raise_for_status()
         data = response.json()
         if data.get('retCode') == 0 and data['result']['list']:
@@ -69,8 +330,7 @@ def get_bybit_latest_price(symbol):
 def get_bingx_latest_price(symbol):
     bingx_symbol = symbol.replace("/", "-")
     try:
-        url = f"{BINGX_API_URL}/openApi/swap/v2/quote/price?symbol={bingx_symbol}"
-        response = requests.get(url, timeout=3)
+        response = BINGX_CLIENT.get(f"/openApi/swap/v2/quote/price?symbol={bingx_symbol}")
         response.raise_for_status()
         data = response.json()
         if data.get('code') == 0 and 'data' in data and 'price' in data['data']:
@@ -79,16 +339,411 @@ def get_bingx_latest_price(symbol):
     except Exception:
         return None
 
+# Endpoint massal untuk mode scanner: satu request per exchange untuk semua simbol
+def get_bybit_all_prices():
+    try:
+        response = BYBIT_CLIENT.get("/v5/market/tickers?category=linear")
+        response.raise_for_status()
+        data = response.json()
+        if data.get('retCode') != 0: return None
+        return {item['symbol'].replace("USDT", "/USDT"): float(item['lastPrice']) for item in data['result']['list'] if item['symbol'].endswith("USDT") and item.get('lastPrice')}
+    except Exception:
+        return None
+
+def get_bingx_all_prices():
+    try:
+        response = BINGX_CLIENT.get("/openApi/swap/v2/quote/price")
+        response.raise_for_status()
+        data = response.json()
+        if data.get('code') != 0 or not isinstance(data.get('data'), list): return None
+        return {item['symbol'].replace("-", "/"): float(item['price']) for item in data['data'] if item['symbol'].endswith("-USDT") and item.get('price')}
+    except Exception:
+        return None
+
+# Order book REST (fallback bila stream depth tidak tersedia): BookSnapshot atau None
+def get_bybit_book(symbol):
+    try:
+        response = BYBIT_CLIENT.get("/v5/market/orderbook", params={'category': 'linear', 'symbol': symbol.replace('/', ''), 'limit': DEPTH_LEVELS})
+        response.raise_for_status()
+        data = response.json()
+        if data.get('retCode') != 0: return None
+        return book_from_levels('bybit', symbol, data['result']['b'], data['result']['a'], time.time())
+    except Exception:
+        return None
+
+def get_bingx_book(symbol):
+    try:
+        response = BINGX_CLIENT.get("/openApi/swap/v2/quote/depth", params={'symbol': symbol.replace('/', '-'), 'limit': DEPTH_LEVELS})
+        response.raise_for_status()
+        data = response.json()
+        if data.get('code') != 0 or not data.get('data'): return None
+        return book_from_levels('bingx', symbol, data['data']['bids'], data['data']['asks'], time.time())
+    except Exception:
+        return None
+
+# Quote harga beserta waktu diterimanya (epoch detik), agar spread hanya dihitung dari harga yang sezaman
+# source: 'rest' (hasil polling) atau 'stream' (update WebSocket terakhir, berlaku sampai diganti)
+Quote = namedtuple('Quote', ['venue', 'symbol', 'price', 'received_at', 'source'], defaults=('rest',))
+
+# Perekam tick opsional; hanya menambah ke buffer, penulisan file dilakukan thread terpisah
+TICK_RECORDER = None
+
+def record_quote(quote):
+    if TICK_RECORDER is not None: TICK_RECORDER.record(quote.received_at, quote.venue, quote.symbol, quote.price)
+
+def get_bybit_quote(symbol):
+    price = get_bybit_latest_price(symbol)
+    if price is None: return None
+    quote = Quote('bybit', symbol, price, time.time())
+    record_quote(quote)
+    return quote
+
+def get_bingx_quote(symbol):
+    price = get_bingx_latest_price(symbol)
+    if price is None: return None
+    quote = Quote('bingx', symbol, price, time.time())
+    record_quote(quote)
+    return quote
+
+# Pool thread khusus agar request ke kedua exchange berjalan bersamaan
+price_fetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='price-fetch')
+
+# Hasil endpoint massal: dict simbol -> harga, dengan waktu terima yang sama untuk seluruh isi
+BulkQuote = namedtuple('BulkQuote', ['venue', 'prices', 'received_at'])
+
+def fetch_all_quotes():
+    def fetch(venue, fn):
+        prices = fn()
+        if not prices: return None
+        bulk = BulkQuote(venue, prices, time.time())
+        if TICK_RECORDER is not None: TICK_RECORDER.record_batch(bulk.received_at, venue, prices)
+        return bulk
+    bybit_future = price_fetch_executor.submit(fetch, 'bybit', get_bybit_all_prices)
+    bingx_future = price_fetch_executor.submit(fetch, 'bingx', get_bingx_all_prices)
+    return bybit_future.result(), bingx_future.result()
+
+def compute_spread_vector(symbols, bybit_prices, bingx_prices):
+    # Spread semua simbol dalam satu operasi NumPy; simbol tanpa harga bernilai NaN
+    bybit = np.fromiter((bybit_prices.get(s, np.nan) for s in symbols), dtype=np.float64, count=len(symbols))
+    bingx = np.fromiter((bingx_prices.get(s, np.nan) for s in symbols), dtype=np.float64, count=len(symbols))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spread_pct = strategy.spread_pct(bybit, bingx)
+    return bybit, bingx, spread_pct
+
+def quote_skew_ms(quote_a, quote_b):
+    return abs(quote_a.received_at - quote_b.received_at) * 1000
+
+def skew_exceeded(quote_a, quote_b):
+    # Hanya pasangan polling: quote stream tidak berubah selama harganya diam, kesegarannya dijaga feed (StreamFeed.current)
+    return quote_a.source == 'rest' and quote_b.source == 'rest' and quote_skew_ms(quote_a, quote_b) > MAX_QUOTE_SKEW_MS
+
+EMPTY_EXECUTABLE = {'bybit_bid': None, 'bybit_ask': None, 'bingx_bid': None, 'bingx_ask': None,
+                    'exec_long_pct': None, 'exec_short_pct': None, 'long_price': None, 'short_price': None}
+
+def evaluate_books(bybit_book, bingx_book, notional):
+    # Spread eksekusi tertimbang ukuran: qty senilai notional order (dari mid BingX) disapu di kedua buku.
+    # long_price/short_price = VWAP BingX yang menjadi harga entry; None bila kedalaman tidak cukup.
+    if bybit_book is None or bingx_book is None: return dict(EMPTY_EXECUTABLE)
+    result = dict(EMPTY_EXECUTABLE, bybit_bid=best_price(bybit_book.bid_prices), bybit_ask=best_price(bybit_book.ask_prices),
+                  bingx_bid=best_price(bingx_book.bid_prices), bingx_ask=best_price(bingx_book.ask_prices))
+    if not result['bingx_bid'] or not result['bingx_ask']: return result
+    quantity = notional / ((result['bingx_bid'] + result['bingx_ask']) / 2)
+    bybit_sell, bybit_buy = vwap(bybit_book.bid_prices, bybit_book.bid_sizes, quantity), vwap(bybit_book.ask_prices, bybit_book.ask_sizes, quantity)
+    bingx_sell, bingx_buy = vwap(bingx_book.bid_prices, bingx_book.bid_sizes, quantity), vwap(bingx_book.ask_prices, bingx_book.ask_sizes, quantity)
+    long_pct, short_pct = strategy.executable_spreads(bybit_sell or math.nan, bybit_buy or math.nan, bingx_sell or math.nan, bingx_buy or math.nan)
+    if not math.isnan(long_pct): result.update(exec_long_pct=long_pct, long_price=bingx_buy)
+    if not math.isnan(short_pct): result.update(exec_short_pct=short_pct, short_price=bingx_sell)
+    return result
+
+# --- FEED STREAMING (WEBSOCKET) ---
+# Quote & order book dari stream disimpan di QuoteStore; loop trading dibangunkan setiap ada update.
+# Getter REST (harga terakhir & depth) tetap dipakai sebagai fallback.
+
+class QuoteStore:
+    def __init__(self):
+        self._quotes = {}  # (venue, symbol) -> Quote
+        self._books = {}  # (venue, symbol) -> OrderBook, diperbarui di tempat
+        self._version = 0
+        self._cond = threading.Condition()
+
+    def update(self, quote):
+        with self._cond:
+            self._quotes[(quote.venue, quote.symbol)] = quote
+            self._version += 1
+            self._cond.notify_all()
+
+    def get(self, venue, symbol, max_age=None):
+        quote = self._quotes.get((venue, symbol))
+        if quote is None: return None
+        if max_age is not None and time.time() - quote.received_at > max_age: return None
+        return quote
+
+    def update_book(self, venue, symbol, bids, asks, snapshot, received_at):
+        with self._cond:
+            book = self._books.get((venue, symbol))
+            if book is None:
+                if not snapshot: return  # Delta tanpa snapshot awal tidak bisa dipakai
+                book = self._books[(venue, symbol)] = OrderBook(venue, symbol, DEPTH_LEVELS)
+            book.apply(bids, asks, snapshot, received_at)
+            self._version += 1
+            self._cond.notify_all()
+
+    def get_book(self, venue, symbol, max_age=None):
+        # Salinan (BookSnapshot) agar pembaca tidak melihat buku yang sedang diubah feed
+        with self._cond:
+            book = self._books.get((venue, symbol))
+            if book is None or (max_age is not None and time.time() - book.received_at > max_age): return None
+            return book.snapshot()
+
+    def wait_for_update(self, last_version, timeout):
+        # Kembalikan versi terbaru; blok sampai ada update baru atau timeout
+        with self._cond:
+            if self._version == last_version:
+                self._cond.wait(timeout)
+            return self._version
+
+class StreamFeed(threading.Thread):
+    venue = None
+    PING_INTERVAL = 20  # detik
+    RECV_TIMEOUT = 5
+    MAX_BACKOFF = 30
+
+    def __init__(self, url, store):
+        super().__init__(daemon=True, name=f"{self.venue}-feed")
+        self.url = url
+        self.store = store
+        self.connected = False
+        self.connected_at = self.last_message_at = 0.0
+        self.reconnects = 0
+        self._symbols = {}  # simbol venue -> simbol internal ('BTC/USDT')
+        self._lock = threading.Lock()
+        self._ws = None
+        self._stop_event = threading.Event()
+
+    def to_venue_symbol(self, symbol): raise NotImplementedError
+    def subscribe_messages(self, venue_symbols, subscribe=True): raise NotImplementedError
+    def handle_message(self, raw): raise NotImplementedError
+    def ping_message(self): return None
+    def connect_url(self): return self.url
+
+    def set_symbols(self, symbols):
+        wanted = {self.to_venue_symbol(s): s for s in symbols}
+        with self._lock:
+            added = [v for v in wanted if v not in self._symbols]
+            removed = [v for v in self._symbols if v not in wanted]
+            self._symbols = wanted
+            ws = self._ws if self.connected else None
+        if ws is None: return  # akan disubscribe saat (re)connect
+        try:
+            for msg in self.subscribe_messages(removed, subscribe=False): ws.send(msg)
+            for msg in self.subscribe_messages(added, subscribe=True): ws.send(msg)
+        except Exception as e:
+            print(f"[{self.venue} WS] Gagal mengubah subscription: {e}")
+
+    def current(self, received_at):
+        # Data dari koneksi yang sedang aktif tetap berlaku selama feed masih menerima pesan, walau harganya tidak berubah
+        return self.connected and received_at >= self.connected_at and time.time() - self.last_message_at <= STREAM_STALE_SECONDS
+
+    def stop(self):
+        self._stop_event.set()
+        self.reconnect()
+
+    def reconnect(self):
+        # Menutup koneksi aktif; run() membuka koneksi baru (kecuali sudah di-stop)
+        ws = self._ws
+        if ws is not None:
+            try: ws.close()
+            except Exception: pass
+
+    def publish(self, venue_symbol, price):
+        symbol = self._symbols.get(venue_symbol)
+        if symbol is None or price is None: return
+        quote = Quote(self.venue, symbol, float(price), time.time(), 'stream')
+        record_quote(quote)
+        self.store.update(quote)
+
+    def publish_book(self, venue_symbol, bids, asks, snapshot):
+        symbol = self._symbols.get(venue_symbol)
+        if symbol is None: return
+        self.store.update_book(self.venue, symbol, bids, asks, snapshot, time.time())
+
+    def run(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                ws = websocket.create_connection(self.connect_url(), timeout=10)
+                ws.settimeout(self.RECV_TIMEOUT)
+                with self._lock:
+                    self._ws = ws
+                    self.connected_at = self.last_message_at = time.time()
+                    self.connected = True
+                    venue_symbols = list(self._symbols)
+                print(f"[{self.venue} WS] Terhubung ke {self.url}")
+                for msg in self.subscribe_messages(venue_symbols, subscribe=True): ws.send(msg)
+                backoff = 1
+                last_ping = time.time()
+                while not self._stop_event.is_set():
+                    try:
+                        raw = ws.recv()
+                        self.last_message_at = time.time()
+                        if raw: self.handle_message(raw)
+                    except websocket.WebSocketTimeoutException:
+                        pass
+                    except ValueError as e:
+                        print(f"[{self.venue} WS] Pesan tidak valid diabaikan: {e}")
+                    ping = self.ping_message()
+                    if ping and time.time() - last_ping >= self.PING_INTERVAL:
+                        ws.send(ping); last_ping = time.time()
+            except Exception as e:
+                if not self._stop_event.is_set(): print(f"[{self.venue} WS] Koneksi terputus: {e}")
+            finally:
+                with self._lock:
+                    self.connected = False
+                    ws, self._ws = self._ws, None
+                if ws is not None:
+                    try: ws.close()
+                    except Exception: pass
+            if self._stop_event.wait(backoff): break
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+            self.reconnects += 1
+
+class BybitTickerFeed(StreamFeed):
+    venue = 'bybit'
+
+    def to_venue_symbol(self, symbol): return symbol.replace('/', '')
+
+    def subscribe_messages(self, venue_symbols, subscribe=True):
+        # Maksimal 10 topik per request subscribe
+        topics = [f"tickers.{s}" for s in venue_symbols]
+        if EXECUTABLE_SPREAD: topics += [f"orderbook.{DEPTH_LEVELS}.{s}" for s in venue_symbols]
+        op = 'subscribe' if subscribe else 'unsubscribe'
+        return [json.dumps({'op': op, 'args': topics[i:i + 10]}) for i in range(0, len(topics), 10)]
+
+    def ping_message(self): return json.dumps({'op': 'ping'})
+
+    def handle_message(self, raw):
+        msg = json.loads(raw)
+        topic = msg.get('topic', '')
+        data = msg.get('data') or {}
+        if topic.startswith('orderbook.'):
+            # Snapshot saat subscribe (atau u == 1 setelah restart server), selanjutnya delta level yang berubah
+            self.publish_book(data.get('s'), data.get('b', []), data.get('a', []), msg.get('type') == 'snapshot' or data.get('u') == 1)
+            return
+        if not topic.startswith('tickers.'): return
+        # Pesan delta hanya membawa field yang berubah
+        if data.get('lastPrice'): self.publish(data.get('symbol'), data['lastPrice'])
+
+class BingxTickerFeed(StreamFeed):
+    venue = 'bingx'
+
+    def to_venue_symbol(self, symbol): return symbol.replace('/', '-')
+
+    def subscribe_messages(self, venue_symbols, subscribe=True):
+        # BingX hanya menerima satu dataType per pesan
+        req_type = 'sub' if subscribe else 'unsub'
+        data_types = [f"{s}@lastPrice" for s in venue_symbols]
+        if EXECUTABLE_SPREAD: data_types += [f"{s}@depth{DEPTH_LEVELS}@{BINGX_DEPTH_INTERVAL}" for s in venue_symbols]
+        return [json.dumps({'id': f"{req_type}-{t}", 'reqType': req_type, 'dataType': t}) for t in data_types]
+
+    def handle_message(self, raw):
+        # BingX mengirim frame biner ter-gzip, termasuk heartbeat "Ping"
+        if isinstance(raw, bytes): raw = gzip.decompress(raw).decode('utf-8')
+        ws = self._ws
+        if raw == 'Ping':
+            if ws is not None: ws.send('Pong')
+            return
+        msg = json.loads(raw)
+        if 'ping' in msg:
+            if ws is not None: ws.send(json.dumps({'pong': msg['ping'], 'time': msg.get('time')}))
+            return
+        data = msg.get('data')
+        data_type = msg.get('dataType', '')
+        if not data: return
+        if '@depth' in data_type:
+            # Depth BingX selalu berupa snapshot N level teratas
+            self.publish_book(data_type.split('@')[0], data.get('bids', []), data.get('asks', []), True)
+        elif data_type.endswith('@lastPrice'):
+            self.publish(data.get('s'), data.get('c'))
+
+class BingxUserFeed(StreamFeed):
+    # Stream user-data: URL memuat listenKey, tanpa subscribe; hanya fill penutup posisi yang diteruskan
+    venue = 'bingx-user'
+
+    def __init__(self, url, reconciler, listen_key):
+        super().__init__(url, None)
+        self.reconciler = reconciler
+        self.listen_key = listen_key
+
+    def connect_url(self): return f"{self.url}?listenKey={self.listen_key}"
+    def to_venue_symbol(self, symbol): return symbol
+    def subscribe_messages(self, venue_symbols, subscribe=True): return []
+
+    def handle_message(self, raw):
+        if isinstance(raw, bytes): raw = gzip.decompress(raw).decode('utf-8')
+        if raw == 'Ping':
+            ws = self._ws
+            if ws is not None: ws.send('Pong')
+            return
+        msg = json.loads(raw)
+        event = msg.get('e')
+        if event == 'ORDER_TRADE_UPDATE':
+            order = msg.get('o') or {}
+            if order.get('X') != 'FILLED' or not is_closing_order(order.get('S'), order.get('ps')): return
+            self.reconciler.on_fill(order['s'].replace('-', '/'), order['ps'], {
+                'order_id': order.get('i'), 'type': order.get('o', ''), 'price': float(order.get('ap') or 0) or None,
+                'filled_at_ms': int(order.get('T') or msg.get('E') or time.time() * 1000), 'source': 'stream'})
+        elif event == 'ACCOUNT_UPDATE':
+            self.reconciler.wake()
+        elif event == 'listenKeyExpired':
+            self.reconciler.expire_listen_key()
+
+QUOTE_STORE = QuoteStore()
+MARKET_FEEDS = {}
+
+def start_market_streams(symbols):
+    if not STREAM_ENABLED: return
+    if websocket is None:
+        print("websocket-client tidak terpasang, feed streaming nonaktif. Memakai polling REST.")
+        return
+    for feed_cls, url in ((BybitTickerFeed, BYBIT_WS_URL), (BingxTickerFeed, BINGX_WS_URL)):
+        feed = feed_cls(url, QUOTE_STORE)
+        feed.set_symbols(symbols)
+        feed.start()
+        MARKET_FEEDS[feed.venue] = feed
+
+def stream_current(quote):
+    feed = MARKET_FEEDS.get(quote.venue)
+    return feed is not None and feed.current(quote.received_at)
+
+def executable_spread_enabled():
+    return bool(MARKET_FEEDS) if EXECUTABLE_SPREAD == 'auto' else bool(EXECUTABLE_SPREAD)
+
+def streams_active():
+    return bool(MARKET_FEEDS) and all(feed.connected for feed in MARKET_FEEDS.values())
+
+def get_market_pair(symbol):
+    # (quote Bybit, quote BingX, buku Bybit, buku BingX). Utamakan stream; yang belum siap atau basi
+    # diambil via REST untuk kedua exchange sekaligus, semua request berjalan bersamaan di pool.
+    quotes = books = None
+    if not executable_spread_enabled(): books = (None, None)
+    if MARKET_FEEDS:
+        stream_quotes = (QUOTE_STORE.get('bybit', symbol), QUOTE_STORE.get('bingx', symbol))
+        if all(stream_quotes) and all(stream_current(q) for q in stream_quotes): quotes = stream_quotes
+        if books is None:
+            stream_books = (QUOTE_STORE.get_book('bybit', symbol), QUOTE_STORE.get_book('bingx', symbol))
+            if all(stream_books) and all(stream_current(b) for b in stream_books): books = stream_books
+    fetchers = ([get_bybit_quote, get_bingx_quote] if quotes is None else []) + ([get_bybit_book, get_bingx_book] if books is None else [])
+    results = [f.result() for f in [price_fetch_executor.submit(fn, symbol) for fn in fetchers]]
+    if quotes is None: quotes, results = tuple(results[:2]), results[2:]
+    if books is None: books = tuple(results[:2])
+    return quotes + books
+
 def verify_bingx_api(api_key, secret_key):
     endpoint = "/openApi/swap/v2/user/balance"
-    params = {'timestamp': int(time.time() * 1000)}
-    query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-    signature = generate_bingx_signature(secret_key, query_string)
-    params['signature'] = signature
-    headers = {'X-BX-APIKEY': api_key}
-    url = f"{BINGX_API_URL}{endpoint}"
+    signer = get_bingx_signer(api_key, secret_key)
+    params = signer.signed_params({'timestamp': int(time.time() * 1000)})
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=5)
+        response = BINGX_CLIENT.get(endpoint, endpoint='account', headers=signer.headers, params=params)
         if response.status_code == 200 and response.json().get('code') == 0:
             return "Berhasil terhubung ke BingX API."
         else:
@@ -96,24 +751,35 @@ def verify_bingx_api(api_key, secret_key):
     except Exception as e:
         return f"Gagal terhubung: Terjadi exception - {e}"
 
+# Batas leverage akun untuk simbol: {'LONG': n, 'SHORT': n}, None bila gagal diambil
+def get_bingx_max_leverage(api_key, secret_key, symbol):
+    signer = get_bingx_signer(api_key, secret_key)
+    params = signer.signed_params({'symbol': symbol.replace("/", "-"), 'timestamp': int(time.time() * 1000)})
+    try:
+        response = BINGX_CLIENT.get("/openApi/swap/v2/trade/leverage", endpoint='account', headers=signer.headers, params=params)
+        response.raise_for_status()
+        data = response.json()
+        if data.get('code') != 0:
+            print(f"Gagal mengambil batas leverage {symbol}: {data.get('msg', 'Error tidak diketahui')}"); return None
+        return {'LONG': int(data['data']['maxLongLeverage']), 'SHORT': int(data['data']['maxShortLeverage'])}
+    except Exception as e:
+        print(f"ERROR saat mengambil batas leverage {symbol}: {e}")
+        return None
+
 def set_bingx_leverage(api_key, secret_key, symbol, leverage, side):
     endpoint = "/openApi/swap/v2/trade/leverage"
-    url = f"{BINGX_API_URL}{endpoint}"
-    params = {
+    signer = get_bingx_signer(api_key, secret_key)
+    params = signer.signed_params({
         'symbol': symbol.replace("/", "-"), 'leverage': leverage,
         'side': side.upper(), 'timestamp': int(time.time() * 1000)
-    }
-    query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-    signature = generate_bingx_signature(secret_key, query_string)
-    headers = {'X-BX-APIKEY': api_key}
+    })
     try:
-        response = requests.post(url, headers=headers, params=params, timeout=5)
+        response = BINGX_CLIENT.post(endpoint, endpoint='account', headers=signer.headers, params=params)
         response.raise_for_status()
         data = response.json()
         if data.get('code') == 0:
-            msg = f"Berhasil mengatur leverage {leverage}x untuk {symbol} ({side})."
-            print(msg)
-            add_log_to_history(msg)
+            # Ringkasan per batch dicatat ke log dashboard oleh LeverageReconciler
+            print(f"Berhasil mengatur leverage {leverage}x untuk {symbol} ({side}).")
             return True
         else:
             msg = f"Gagal mengatur leverage: {data.get('msg', 'Error tidak diketahui')}"
@@ -124,40 +790,184 @@ def set_bingx_leverage(api_key, secret_key, symbol, leverage, side):
         add_log_to_history(msg); print(msg)
         return False
 
+@METRICS.timed('order.create')
 def create_bingx_order(api_key, secret_key, symbol, side, order_type, quantity, tp_price=None, sl_price=None):
     endpoint = "/openApi/swap/v2/trade/order"
-    url = f"{BINGX_API_URL}{endpoint}"
-    params = {
-        'symbol': symbol.replace("/", "-"),
-        'side': 'BUY' if side.lower() == 'buy' else 'SELL',
-        'positionSide': 'LONG' if side.lower() == 'buy' else 'SHORT',
-        'type': order_type.upper(), 'quantity': str(quantity),
-        'timestamp': int(time.time() * 1000),
-    }
-    if tp_price and tp_price > 0:
-        params['takeProfit'] = json.dumps({"type": "TAKE_PROFIT_MARKET", "stopPrice": round(tp_price, 5), "workingType": "MARK_PRICE"})
-    if sl_price and sl_price > 0:
-        params['stopLoss'] = json.dumps({"type": "STOP_MARKET", "stopPrice": round(sl_price, 5), "workingType": "MARK_PRICE"})
-
-    query_string_to_sign = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-    signature = generate_bingx_signature(secret_key, query_string_to_sign)
-    final_payload_string = f"{query_string_to_sign}&signature={signature}"
-    headers = {'X-BX-APIKEY': api_key, 'Content-Type': 'application/x-www-form-urlencoded'}
+    signer = get_bingx_signer(api_key, secret_key)
+    # Span di pemanggil, bukan decorator di order_payload, agar bench_signing.py mengukur signer tanpa overhead metrik
+    with METRICS.span('order.sign'):
+        final_payload_string = signer.order_payload(symbol, side, order_type, quantity, tp_price=tp_price, sl_price=sl_price)
 
     try:
-        response = requests.post(url, headers=headers, data=final_payload_string, timeout=10)
+        response = BINGX_CLIENT.post(endpoint, endpoint='order', headers=signer.form_headers, data=final_payload_string)
         response.raise_for_status(); data = response.json()
         if data.get('code') == 0:
             print(f"SUKSES: Order REAL berhasil dibuat: {data}")
             return {'status': 'success', 'order_id': data['data']['order']['orderId'], 'data': data}
         else:
-            print(f"--- GAGAL ORDER ---\nURL: {url}\nPayload: {final_payload_string}\nResponse: {json.dumps(data)}\n---")
+            print(f"--- GAGAL ORDER ---\nURL: {BINGX_CLIENT.base_url}{endpoint}\nPayload: {final_payload_string}\nResponse: {json.dumps(data)}\n---")
             return {'status': 'error', 'message': json.dumps(data)}
     except requests.exceptions.RequestException as e:
         print(f"ERROR: Exception saat request API: {e}")
         if e.response: print(f"ERROR: Response Body: {e.response.text}")
         return {'status': 'error', 'message': str(e)}
 
+def get_bingx_positions(api_key, secret_key):
+    # Semua posisi terbuka dalam satu request: (simbol, positionSide) -> {'amount', 'avg_price'}; None bila gagal
+    endpoint = "/openApi/swap/v2/user/positions"
+    signer = get_bingx_signer(api_key, secret_key)
+    try:
+        response = BINGX_CLIENT.get(endpoint, endpoint='account', headers=signer.headers, params=signer.signed_params({'timestamp': int(time.time() * 1000)}))
+        data = response.json()
+        if response.status_code != 200 or data.get('code') != 0: raise Exception(data.get('msg', response.status_code))
+        return {(p['symbol'].replace('-', '/'), p['positionSide']): {'amount': float(p['positionAmt']), 'avg_price': float(p['avgPrice'])}
+                for p in data.get('data') or [] if float(p.get('positionAmt') or 0)}
+    except Exception as e:
+        print(f"Gagal mengambil posisi BingX: {e}")
+        return None
+
+def get_bingx_orders(api_key, secret_key, symbol, start_ms):
+    endpoint = "/openApi/swap/v2/trade/allOrders"
+    signer = get_bingx_signer(api_key, secret_key)
+    params = signer.signed_params({'symbol': symbol.replace('/', '-'), 'startTime': start_ms, 'limit': 100, 'timestamp': int(time.time() * 1000)})
+    try:
+        response = BINGX_CLIENT.get(endpoint, endpoint='account', headers=signer.headers, params=params)
+        data = response.json()
+        if response.status_code != 200 or data.get('code') != 0: raise Exception(data.get('msg', response.status_code))
+        return (data.get('data') or {}).get('orders') or []
+    except Exception as e:
+        print(f"Gagal mengambil riwayat order {symbol}: {e}")
+        return None
+
+def create_bingx_listen_key(api_key):
+    try:
+        response = BINGX_CLIENT.post("/openApi/user/auth/userDataStream", endpoint='account', headers={'X-BX-APIKEY': api_key})
+        return response.json().get('listenKey') if response.status_code == 200 else None
+    except Exception as e:
+        print(f"Gagal membuat listenKey BingX: {e}")
+        return None
+
+def extend_bingx_listen_key(api_key, listen_key):
+    try:
+        response = BINGX_CLIENT.put("/openApi/user/auth/userDataStream", endpoint='account', headers={'X-BX-APIKEY': api_key}, params={'listenKey': listen_key})
+        return response.status_code == 200
+    except Exception:
+        return False
+
+# --- BUKU TRADE AKTIF ---
+# Trade aktif diindeks per simbol; level TP/SL disimpan terurut (bisect) per sisi,
+# sehingga update harga hanya menyentuh trade yang levelnya benar-benar terlewati.
+
+class ActiveTrade:
+    __slots__ = ('id', 'symbol', 'side', 'entry_price', 'tp_price', 'sl_price', 'amount_usdt', 'leverage', 'mode', 'timestamp')
+
+    def __init__(self, id, symbol, side, entry_price, tp_price, sl_price, amount_usdt=None, leverage=None, mode=None, timestamp=None):
+        self.id = str(id)
+        self.symbol = symbol
+        self.side = side.lower()
+        self.entry_price = entry_price
+        self.tp_price = tp_price
+        self.sl_price = sl_price
+        self.amount_usdt = amount_usdt
+        self.leverage = leverage
+        self.mode = mode
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(*(record.get(field) for field in cls.__slots__))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def notional(self):
+        return (self.amount_usdt or 0) * (self.leverage or 1)
+
+class _SortedLevels:
+    __slots__ = ('levels', 'ids')
+
+    def __init__(self):
+        self.levels = []
+        self.ids = []
+
+    def add(self, level, trade_id):
+        i = bisect.bisect_right(self.levels, level)
+        self.levels.insert(i, level)
+        self.ids.insert(i, trade_id)
+
+    def remove(self, level, trade_id):
+        i = bisect.bisect_left(self.levels, level)
+        while i < len(self.levels) and self.levels[i] == level:
+            if self.ids[i] == trade_id:
+                del self.levels[i]; del self.ids[i]
+                return
+            i += 1
+
+    def ids_at_or_below(self, price): return self.ids[:bisect.bisect_right(self.levels, price)]
+    def ids_at_or_above(self, price): return self.ids[bisect.bisect_left(self.levels, price):]
+
+class ActiveTradeBook:
+    def __init__(self, on_change=None):
+        self._trades = {}  # id -> ActiveTrade
+        self._levels = {}  # simbol -> {(sisi, 'tp'|'sl'): _SortedLevels}
+        self._notional = 0.0  # Total amount_usdt * leverage trade aktif
+        self._lock = threading.Lock()
+        self.on_change = on_change  # Dipanggil (jumlah trade, notional) setelah trade ditambah/dihapus
+
+    def __len__(self): return len(self._trades)
+    def __contains__(self, trade_id): return str(trade_id) in self._trades
+
+    def get(self, trade_id): return self._trades.get(str(trade_id))
+    def values(self): return list(self._trades.values())
+    def symbols(self): return list(self._levels)
+    def has_symbol(self, symbol): return symbol in self._levels
+
+    def exposure(self):
+        with self._lock: return len(self._trades), self._notional
+
+    def _changed(self):
+        if self.on_change: self.on_change(*self.exposure())
+
+    def add(self, trade):
+        with self._lock:
+            if trade.id in self._trades: self._remove_locked(trade.id)
+            self._trades[trade.id] = trade
+            self._notional += trade.notional()
+            levels = self._levels.setdefault(trade.symbol, {})
+            levels.setdefault((trade.side, 'tp'), _SortedLevels()).add(trade.tp_price, trade.id)
+            levels.setdefault((trade.side, 'sl'), _SortedLevels()).add(trade.sl_price, trade.id)
+        self._changed()
+
+    def remove(self, trade_id):
+        with self._lock: trade = self._remove_locked(str(trade_id))
+        if trade is not None: self._changed()
+        return trade
+
+    def _remove_locked(self, trade_id):
+        trade = self._trades.pop(trade_id, None)
+        if trade is None: return None
+        self._notional = max(self._notional - trade.notional(), 0.0)
+        levels = self._levels[trade.symbol]
+        levels[(trade.side, 'tp')].remove(trade.tp_price, trade_id)
+        levels[(trade.side, 'sl')].remove(trade.sl_price, trade_id)
+        if not any(lv.ids for lv in levels.values()): del self._levels[trade.symbol]
+        return trade
+
+    def crossed(self, symbol, price):
+        # Kembalikan [(trade, 'TP'|'SL')] untuk trade di simbol ini yang level TP/SL-nya terlewati harga.
+        # Semantik sama dengan strategy.exit_outcome: TP diprioritaskan bila keduanya terlewati.
+        with self._lock:
+            levels = self._levels.get(symbol)
+            if not levels: return []
+            hits = {}
+            buy_tp, buy_sl = levels.get(('buy', 'tp')), levels.get(('buy', 'sl'))
+            sell_tp, sell_sl = levels.get(('sell', 'tp')), levels.get(('sell', 'sl'))
+            if buy_tp: hits.update((i, 'TP') for i in buy_tp.ids_at_or_below(price))
+            if sell_tp: hits.update((i, 'TP') for i in sell_tp.ids_at_or_above(price))
+            for sl_ids in (buy_sl.ids_at_or_above(price) if buy_sl else [], sell_sl.ids_at_or_below(price) if sell_sl else []):
+                for i in sl_ids: hits.setdefault(i, 'SL')
+            return [(self._trades[i], outcome) for i, outcome in hits.items()]
+
 # --- Inisialisasi Aplikasi Flask & Variabel Global ---
 app = Flask(__name__)
 app.config['TRADING_SETTINGS'] = {
@@ -165,45 +975,148 @@ app.config['TRADING_SETTINGS'] = {
     'order_amount_usdt': 2, 'leverage': 10, 'tp_percent': 0.15, 'sl_percent': 0.15,
     'api_connection_status': 'Belum terhubung'
 }
-app.config['ACTIVE_TRADES'] = {}
-app.config['TRADE_HISTORY_LOG'] = []
+app.config['ACTIVE_TRADES'] = ActiveTradeBook()
+RISK_VIEW = RiskView(1, None, MAX_CONCURRENT_POSITIONS, MAX_TOTAL_NOTIONAL_USDT)
+EVENT_LOG = EventLog(EVENT_LOG_CAPACITY, EVENT_LOG_FILE, EVENT_LOG_MAX_BYTES, EVENT_LOG_BACKUPS)
 app.config['LIVE_DATA'] = { # <<< DIPERBARUI UNTUK DATA BARU
     'symbol': DEFAULT_SYMBOL,
     'bybit_price': None,
     'bingx_price': None,
     'price_difference_pct': 0,
+    'quote_skew_ms': None,
+    'scanner': [],
+    'leverage_status': '-',
+    'spread_stats': None,
+    'risk': None,
+    'shards': None,  # Status per shard, hanya di supervisor mode shard
+    **EMPTY_EXECUTABLE,
 }
-trade_file_lock = threading.Lock()
+STREAM_QUOTE_FIELDS = ('symbol', 'bybit_price', 'bingx_price', 'price_difference_pct', 'quote_skew_ms', 'scanner',
+                       'bybit_bid', 'bybit_ask', 'bingx_bid', 'bingx_ask', 'exec_long_pct', 'exec_short_pct', 'leverage_status',
+                       'spread_stats', 'risk', 'shards')
+
+# Membangunkan koneksi /stream setiap kali data dashboard atau log berubah
+class DashboardNotifier:
+    def __init__(self):
+        self.version = 0
+        self._cond = threading.Condition()
+
+    def notify(self):
+        with self._cond:
+            self.version += 1
+            self._cond.notify_all()
 
+    def wait(self, last_version, timeout):
+        with self._cond:
+            if self.version == last_version: self._cond.wait(timeout)
+            return self.version
+
+dashboard_notifier = DashboardNotifier()
+
+@METRICS.timed('io.settings')
 def save_settings(settings_data):
     try:
         settings_to_save = {k: v for k, v in settings_data.items() if k != 'api_connection_status'}
-        with open(SETTINGS_FILE, 'w') as f: json.dump(settings_to_save, f, indent=4)
+        atomic_write(SETTINGS_FILE, json.dumps(settings_to_save, indent=4))
         print(f"Pengaturan disimpan ke {SETTINGS_FILE}")
     except Exception as e:
         print(f"ERROR: Gagal menyimpan pengaturan: {e}")
 
 def load_settings():
+    saved_settings = None
     if os.path.exists(SETTINGS_FILE):
         try:
             with open(SETTINGS_FILE, 'r') as f: saved_settings = json.load(f)
-            app.config['TRADING_SETTINGS'].update(saved_settings)
-            app.config['TRADING_SETTINGS'].update({'api_connection_status': 'Belum terhubung', 'real_trading_enabled': False})
             print(f"Pengaturan dimuat dari {SETTINGS_FILE}")
         except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Gagal memuat {SETTINGS_FILE} ({e}), menggunakan default.")
-    else:
-        print(f"{SETTINGS_FILE} tidak ditemukan, menggunakan default.")
+            print(f"Gagal memuat {SETTINGS_FILE} ({e}).")
+    if saved_settings is None:
+        # Cadangan: pengaturan yang ikut tersimpan di snapshot state terakhir
+        state, _ = STATE_SNAPSHOTS.load()
+        if state and state.get('settings'):
+            saved_settings = state['settings']
+            print(f"Pengaturan dipulihkan dari snapshot {STATE_SNAPSHOT_FILE}.")
+        else:
+            print(f"{SETTINGS_FILE} tidak tersedia, menggunakan default.")
+            return
+    app.config['TRADING_SETTINGS'].update(saved_settings)
+    app.config['TRADING_SETTINGS'].update({'api_connection_status': 'Belum terhubung', 'real_trading_enabled': False})
 
-try:
-    print("Memuat daftar market dari Bybit & BingX...")
-    bybit_symbols = get_bybit_symbols()
-    bingx_symbols = get_bingx_symbols()
-    AVAILABLE_SYMBOLS = sorted(list(bybit_symbols.intersection(bingx_symbols)))
-    if not AVAILABLE_SYMBOLS: raise Exception("Tidak ada simbol yang sama ditemukan.")
-    print(f"Berhasil memuat {len(AVAILABLE_SYMBOLS)} market yang sama.")
-except Exception as e:
-    print(f"Gagal memuat market: {e}"); AVAILABLE_SYMBOLS = [DEFAULT_SYMBOL]
+# --- UNIVERSE SIMBOL ---
+# Market yang ada di kedua exchange beserta metadatanya, di-cache ke disk agar startup tidak menunggu exchange.
+# Refresh berjalan di background per SYMBOL_CACHE_TTL; dict metadata & AVAILABLE_SYMBOLS diganti utuh (swap referensi),
+# sehingga pembaca selalu melihat versi lama atau baru secara lengkap, tidak pernah setengah jadi.
+# tick_size/lot_size/min_qty dari BingX (tempat order dieksekusi); batas leverage per akun diambil LeverageReconciler.
+
+class SymbolUniverse:
+    def __init__(self, path, ttl=SYMBOL_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.meta = {}  # simbol -> metadata
+        self.updated_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def load_cache(self):
+        if not os.path.exists(self.path): return False
+        try:
+            with open(self.path, 'r') as f: cache = json.load(f)
+            self._publish(cache['symbols'], cache['updated_at'])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Gagal memuat {self.path} ({e}), daftar market dimuat ulang dari exchange.")
+            return False
+        print(f"Memuat {len(self.meta)} market dari cache {self.path}.")
+        return True
+
+    def refresh(self):
+        with self._refresh_lock:
+            bybit, bingx = get_bybit_instruments(), get_bingx_contracts()
+            meta = {symbol: bingx[symbol] for symbol in bybit & bingx.keys()}
+            if not meta: raise Exception("Tidak ada simbol yang sama ditemukan.")
+            added, removed = meta.keys() - self.meta.keys(), self.meta.keys() - meta.keys()
+            updated_at = time.time()
+            atomic_write(self.path, json.dumps({'updated_at': updated_at, 'symbols': meta}))
+            self._publish(meta, updated_at)
+        print(f"Berhasil memuat {len(meta)} market yang sama (+{len(added)} / -{len(removed)}).")
+
+    def _publish(self, meta, updated_at):
+        global AVAILABLE_SYMBOLS
+        self.meta = meta
+        self.updated_at = updated_at
+        AVAILABLE_SYMBOLS = sorted(meta)
+
+    def get(self, symbol):
+        return self.meta.get(symbol)
+
+    def adopt(self, meta, updated_at):
+        # Mode shard: metadata diambil sekali oleh supervisor lalu dikirim ke setiap shard
+        if meta: self._publish(meta, updated_at)
+
+    def refresh_loop(self, on_refresh=None):
+        while True:
+            delay = self.updated_at + self.ttl - time.time()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+            try: self.refresh()
+            except Exception as e:
+                print(f"Gagal memuat market: {e}")
+                time.sleep(SYMBOL_REFRESH_RETRY)
+                continue
+            if on_refresh: on_refresh()
+
+def round_to_lot(quantity, lot_size):
+    # Dibulatkan ke bawah agar nilai order tidak melebihi nominal yang diatur
+    step = Decimal(str(lot_size))
+    return float((Decimal(str(quantity)) / step).to_integral_value(ROUND_DOWN) * step)
+
+def round_to_tick(price, tick_size):
+    # Harga TP/SL dibulatkan ke tick terdekat; BingX menolak harga dengan presisi berlebih
+    step = Decimal(str(tick_size))
+    return float((Decimal(str(price)) / step).to_integral_value(ROUND_HALF_UP) * step)
+
+AVAILABLE_SYMBOLS = [DEFAULT_SYMBOL]
+SYMBOL_UNIVERSE = SymbolUniverse(SYMBOL_CACHE_FILE)
+if not SYMBOL_UNIVERSE.load_cache(): print("Cache market belum ada, daftar market dimuat di background.")
 
 # <<< TEMPLATE HTML DIPERBARUI >>>
 HTML_TEMPLATE = """
@@ -254,6 +1167,11 @@ HTML_TEMPLATE = """
             </div>
             <div class="price-label" style="margin-top:15px;">PRICE SPREAD</div>
             <div id="price-diff" class="price-diff">0.000%</div>
+            <div class="price-label" style="margin-top:15px;">SPREAD EKSEKUSI (LONG / SHORT)</div>
+            <div id="exec-spread" class="price-value" style="font-size:1.2em;">-</div>
+            <div id="book-top" class="price-label" style="font-weight:normal; margin-top:5px;">-</div>
+            <div class="price-label" style="margin-top:15px;">STATISTIK SPREAD</div>
+            <div id="spread-stats" class="price-label" style="font-weight:normal; margin-top:5px;">-</div>
         </div>
         <div class="card">
             <h2>PENGATURAN & KONTROL</h2>
@@ -267,6 +1185,8 @@ HTML_TEMPLATE = """
                 <div class="full-width"> <button id="save-settings-btn" class="button">Simpan & Hubungkan Ulang</button> </div>
             </div>
             <div id="api-status-box" class="status-box">Menunggu pengaturan...</div>
+            <div id="leverage-status" class="price-label" style="font-weight:normal; margin-top:8px;">-</div>
+            <div id="risk-status" class="price-label" style="font-weight:normal; margin-top:5px;">-</div>
         </div>
         <div class="card">
             <h2>MODE & LOG</h2>
@@ -315,28 +1235,77 @@ HTML_TEMPLATE = """
             else if (settings.demo_mode_enabled) { tradingStatusText.textContent = "MODE DEMO AKTIF"; tradingStatusText.style.color = "var(--green-color)"; }
             else { tradingStatusText.textContent = "SEMUA MODE NONAKTIF"; tradingStatusText.style.color = "var(--yellow-color)"; }
         }
-        function updateLogBox(logHistory) {
+        const LOG_CLASSES = { TP: 'log-tp', SL: 'log-sl', NEW: 'log-new', ERROR: 'log-error' };
+        function createLogEntry(event) {
+            const p = document.createElement('p'); p.textContent = event.text; p.className = 'log-entry';
+            if (LOG_CLASSES[event.kind]) p.classList.add(LOG_CLASSES[event.kind]);
+            return p;
+        }
+        function updateLogBox(events) {
             logBox.innerHTML = '';
-            logHistory.forEach(logMsg => {
-                const p = document.createElement('p'); p.textContent = logMsg; p.className = 'log-entry';
-                if (logMsg.includes('[TP HIT]')) p.classList.add('log-tp'); else if (logMsg.includes('[SL HIT]')) p.classList.add('log-sl');
-                else if (logMsg.includes('[NEW]')) p.classList.add('log-new'); else if (logMsg.includes('ERROR') || logMsg.includes('Gagal')) p.classList.add('log-error');
-                logBox.appendChild(p);
-            });
+            events.forEach(event => logBox.appendChild(createLogEntry(event)));
         }
-        async function fetchData() {
-            try {
-                const response = await fetch(`/data`); const data = await response.json();
-                document.getElementById('bybit-price').textContent = data.bybit_price ? `$${data.bybit_price.toFixed(6)}` : '-';
-                document.getElementById('bingx-price').textContent = data.bingx_price ? `$${data.bingx_price.toFixed(6)}` : '-';
+        function prependLogs(newEvents) {
+            // newEvents terbaru dulu; hanya baris baru yang ditambahkan, baris lama dipangkas dari bawah
+            for (let i = newEvents.length - 1; i >= 0; i--) logBox.insertBefore(createLogEntry(newEvents[i]), logBox.firstChild);
+            while (logBox.children.length > {{ max_log }}) logBox.removeChild(logBox.lastChild);
+        }
+        // Update SSE hanya membawa field yang berubah; nilai terakhir disimpan untuk baris gabungan
+        const execSpread = {}, bookTop = {};
+        function applyQuote(data) {
+            if ('bybit_price' in data) document.getElementById('bybit-price').textContent = data.bybit_price ? `$${data.bybit_price.toFixed(6)}` : '-';
+            if ('bingx_price' in data) document.getElementById('bingx-price').textContent = data.bingx_price ? `$${data.bingx_price.toFixed(6)}` : '-';
+            if ('price_difference_pct' in data) {
                 const diffPct = data.price_difference_pct || 0;
                 const diffEl = document.getElementById('price-diff');
                 diffEl.textContent = `${diffPct.toFixed(3)}%`;
                 diffEl.style.color = diffPct > 0 ? 'var(--green-color)' : 'var(--red-color)';
-                if(data.trade_history) updateLogBox(data.trade_history);
-                if (symbolSelector.value !== data.symbol) { symbolSelector.value = data.symbol; }
+            }
+            if ('exec_long_pct' in data || 'exec_short_pct' in data) {
+                Object.assign(execSpread, data);
+                const fmt = (v) => v === null || v === undefined ? '-' : `${v.toFixed(3)}%`;
+                document.getElementById('exec-spread').textContent = `${fmt(execSpread.exec_long_pct)} / ${fmt(execSpread.exec_short_pct)}`;
+            }
+            if (['bybit_bid', 'bybit_ask', 'bingx_bid', 'bingx_ask'].some(k => k in data)) {
+                Object.assign(bookTop, data);
+                const px = (v) => v ? v.toFixed(6) : '-';
+                document.getElementById('book-top').textContent = `Bybit ${px(bookTop.bybit_bid)} / ${px(bookTop.bybit_ask)} | BingX ${px(bookTop.bingx_bid)} / ${px(bookTop.bingx_ask)}`;
+            }
+            if ('leverage_status' in data) document.getElementById('leverage-status').textContent = data.leverage_status || '-';
+            if ('spread_stats' in data) {
+                const st = data.spread_stats, band = (v) => v === null ? '-' : `${v >= 0 ? '+' : ''}${v.toFixed(3)}%`;
+                document.getElementById('spread-stats').textContent = !st ? '-' :
+                    `μ ${st.mean_pct.toFixed(3)}% σ ${st.std_pct.toFixed(3)}% z ${st.z.toFixed(2)} | bertahan ${st.persist_s.toFixed(1)}s | ${st.mode}: ${band(st.upper_pct)} / ${band(st.lower_pct)}`;
+            }
+            if ('risk' in data || 'shards' in data) {
+                Object.assign(riskState, data);
+                const r = riskState.risk, limit = (v) => v === null ? '∞' : v, shards = riskState.shards;
+                document.getElementById('risk-status').textContent = !r ? '-' :
+                    `Risiko: ${r.positions}/${limit(r.max_positions)} posisi | $${r.notional}/${limit(r.max_notional)} | ditolak ${r.rejected}` +
+                    (shards ? ` | shard hidup ${shards.filter(s => s.alive).length}/${shards.length}` : '');
+            }
+            if (data.symbol && symbolSelector.value !== data.symbol) { symbolSelector.value = data.symbol; }
+        }
+        const riskState = {risk: null, shards: null};
+        let logSeq = 0;
+        async function fetchData() {
+            try {
+                const response = await fetch(`/data?since=${logSeq}`); const data = await response.json();
+                applyQuote(data);
+                if (data.log_reset) updateLogBox(data.logs); else prependLogs(data.logs);
+                logSeq = data.log_seq;
             } catch (error) { console.error("Error fetching data:", error); }
         }
+        function startLiveUpdates() {
+            // Push via SSE; browser tanpa EventSource kembali ke polling /data
+            if (!window.EventSource) { fetchData(); setInterval(fetchData, {{ interval * 1000 }}); return; }
+            const source = new EventSource('/stream');
+            source.addEventListener('update', (e) => {
+                const update = JSON.parse(e.data);
+                applyQuote(update.quote);
+                if (update.reset) updateLogBox(update.logs); else prependLogs(update.logs);
+            });
+        }
         symbolSelector.addEventListener('change', () => { 
             const newSymbol = symbolSelector.value; loadTradingViewWidget(newSymbol); 
             fetch('/update_symbol', { method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({ symbol: newSymbol }) });
@@ -344,77 +1313,248 @@ HTML_TEMPLATE = """
         saveBtn.addEventListener('click', saveSettings);
         demoToggle.addEventListener('change', (e) => toggleMode('demo', e.target.checked));
         realToggle.addEventListener('change', (e) => toggleMode('real', e.target.checked));
-        document.addEventListener('DOMContentLoaded', () => { loadTradingViewWidget(symbolSelector.value); fetchSettings(); fetchData(); setInterval(fetchData, {{ interval * 1000 }}); });
+        document.addEventListener('DOMContentLoaded', () => { loadTradingViewWidget(symbolSelector.value); fetchSettings(); startLiveUpdates(); });
     </script>
 </body>
 </html>
 """
 
-def add_log_to_history(message):
-    history = app.config['TRADE_HISTORY_LOG']
-    now = datetime.now().strftime('%H:%M:%S')
-    history.insert(0, f"[{now}] {message}")
-    app.config['TRADE_HISTORY_LOG'] = history[:MAX_LOG_HISTORY]
+def add_log_to_history(message, kind=None, level=None):
+    # kind: NEW/TP/SL/CLOSED/ERROR/INFO; tanpa kind ditebak dari teks pesan
+    EVENT_LOG.append(message, kind, level)
+    dashboard_notifier.notify()
+
+def logs_since(seq, limit=MAX_LOG_HISTORY):
+    # (seq terbaru, event baru sejak seq [terbaru dulu, dict], reset?)
+    # reset=True bila klien tertinggal lebih dari `limit` event: kirim ulang event terakhir saja
+    latest, events, reset = EVENT_LOG.since(seq, limit)
+    return latest, [event_to_dict(e) for e in events], reset
 
 def read_json_file(filepath):
-    with trade_file_lock:
-        if not os.path.exists(filepath): return []
-        try:
-            with open(filepath, 'r') as f: return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError): return []
+    if not os.path.exists(filepath): return []
+    try:
+        with open(filepath, 'r') as f: return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError): return []
+
+# --- JOURNAL TRADE (APPEND-ONLY) ---
+# Setiap open/close menambahkan satu baris berisi 'id' + field yang berubah, tanpa menulis ulang riwayat.
+# Di memori hanya disimpan state trade yang masih ACTIVE; compaction berkala menulis ulang satu baris per trade.
+# checkpoint() + open(checkpoint) memungkinkan recovery hanya membaca ekor journal setelah snapshot terakhir.
+
+def journal_event(line):
+    # Hanya objek JSON ber-'id' yang dipakai; baris terpotong atau rekaman warisan lain dilewati, bukan menggagalkan replay/compaction
+    try: event = json.loads(line)
+    except ValueError: return None
+    return event if isinstance(event, dict) and 'id' in event else None
+
+class TradeJournal:
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._active = {}  # id trade (str) -> state terakhir, hanya trade berstatus ACTIVE
+        self._lines = 0
+        self._redundant = 0  # Baris update yang akan dilebur oleh compaction
+        self._offset = 0  # Posisi byte setelah baris lengkap terakhir
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self, checkpoint=None):
+        # Kembalikan jumlah baris yang dibaca saat membuka (seluruh journal, atau hanya ekor setelah checkpoint)
+        with self._lock:
+            if self._file is not None: return 0
+            if self.legacy_path and not os.path.exists(self.path) and os.path.exists(self.legacy_path):
+                self._migrate_legacy()
+            if not (checkpoint and self._restore(checkpoint)):
+                self._active, self._lines, self._redundant, self._offset = {}, 0, 0, 0
+            replayed = self._replay()
+            self._file = open(self.path, 'ab')
+            return replayed
+
+    def _migrate_legacy(self):
+        # Migrasi satu kali dari trades.json (list penuh) ke format journal
+        trades = read_json_file(self.legacy_path)
+        atomic_write(self.path, ''.join(json.dumps(trade) + '\n' for trade in trades))
+        os.replace(self.legacy_path, f"{self.legacy_path}.migrated")
+        print(f"Migrasi {len(trades)} trade dari {self.legacy_path} ke {self.path} selesai.")
+
+    def _restore(self, checkpoint):
+        # Checkpoint hanya berlaku untuk file journal yang sama (compaction mengganti file & offset)
+        try: st = os.stat(self.path)
+        except OSError: return False
+        if st.st_ino != checkpoint['inode'] or st.st_size < checkpoint['offset']: return False
+        self._active = {trade_id: dict(t) for trade_id, t in checkpoint['active'].items()}
+        self._lines, self._redundant, self._offset = checkpoint['lines'], checkpoint['redundant'], checkpoint['offset']
+        return True
+
+    def _replay(self):
+        if not os.path.exists(self.path): return 0
+        replayed = 0
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'): break  # Baris terakhir terpotong karena crash
+                event = journal_event(line)
+                if event is not None: self._apply(event)
+                self._offset += len(line)
+                replayed += 1
+        # Buang sisa baris terpotong agar append berikutnya tidak menyambung ke baris rusak
+        if os.path.getsize(self.path) > self._offset: os.truncate(self.path, self._offset)
+        return replayed
+
+    def _apply(self, event):
+        trade_id = str(event['id'])
+        state = self._active.get(trade_id)
+        if state is None:
+            state = dict(event)
+        else:
+            state.update(event)
+            self._redundant += 1
+        if state.get('status') == "ACTIVE": self._active[trade_id] = state
+        else: self._active.pop(trade_id, None)
+        self._lines += 1
+
+    @METRICS.timed('io.journal')
+    def _append(self, event):
+        line = (json.dumps(event) + '\n').encode('utf-8')
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._offset += len(line)
+            self._apply(event)
+
+    def record_open(self, trade_record):
+        self._append(dict(trade_record))
+
+    def record_update(self, trade_id, **fields):
+        self._append({'id': trade_id, **fields})
+
+    def get(self, trade_id):
+        # Hanya trade yang masih aktif; riwayat trade tertutup ada di file journal
+        with self._lock:
+            trade = self._active.get(str(trade_id))
+            return dict(trade) if trade else None
 
-def write_json_file(filepath, data):
-    with trade_file_lock:
-        with open(filepath, 'w') as f: json.dump(data, f, indent=4)
+    def active_trades(self):
+        with self._lock:
+            return {trade_id: dict(t) for trade_id, t in self._active.items()}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None: self._file.close()
+            self._file = None
+
+    def checkpoint(self):
+        with self._lock:
+            return {'inode': os.fstat(self._file.fileno()).st_ino, 'offset': self._offset, 'lines': self._lines,
+                    'redundant': self._redundant, 'active': {trade_id: dict(t) for trade_id, t in self._active.items()}}
+
+    @METRICS.timed('io.journal_compact')
+    def compact(self):
+        with self._lock:
+            redundant = self._redundant
+            if redundant < JOURNAL_COMPACT_MIN_REDUNDANT: return False
+            # Riwayat lengkap hanya dibangun sementara di sini, bukan disimpan di memori sepanjang waktu
+            trades = {}
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    event = journal_event(line)
+                    if event is None: continue
+                    trades.setdefault(str(event['id']), {}).update(event)
+            data = ''.join(json.dumps(trade) + '\n' for trade in trades.values()).encode('utf-8')
+            self._file.close()
+            atomic_write(self.path, data)
+            self._file = open(self.path, 'ab')
+            self._lines, self._redundant, self._offset = len(trades), 0, len(data)
+        print(f"Journal dipadatkan: {redundant} baris usang dihapus.")
+        return True
+
+    def compaction_loop(self, on_compact=None):
+        while True:
+            time.sleep(JOURNAL_COMPACT_INTERVAL)
+            try:
+                if self.compact() and on_compact: on_compact()
+            except Exception as e: print(f"ERROR: Gagal memadatkan journal: {e}")
+
+trade_journal = TradeJournal(TRADE_JOURNAL_FILE, legacy_path=TRADE_LOG_FILE)
+
+STATE_SNAPSHOTS = SnapshotStore(STATE_SNAPSHOT_FILE)
 
 def load_initial_state():
-    active_trades = {str(trade['id']): trade for trade in read_json_file(TRADE_LOG_FILE) if trade.get('status') == "ACTIVE"}
-    app.config['ACTIVE_TRADES'] = active_trades
-    log_history = [f"ACTIVE: {t['symbol']} {t['side']} @ {t.get('entry_price')}" for t in active_trades.values()]
-    app.config['TRADE_HISTORY_LOG'] = log_history[:MAX_LOG_HISTORY]
-    print(f"Startup: Ditemukan {len(active_trades)} trade aktif untuk dipantau.")
-
-def update_trade_in_json(trade_id, new_status, closing_price):
-    all_trades = read_json_file(TRADE_LOG_FILE)
-    for trade in all_trades:
-        if str(trade.get('id')) == str(trade_id):
-            trade.update({'status': new_status, 'closing_price': closing_price, 'closed_at': datetime.now(timezone.utc).isoformat()})
-            break
-    write_json_file(TRADE_LOG_FILE, all_trades)
+    # Snapshot terakhir + ekor journal setelahnya; tanpa snapshot valid, seluruh journal di-replay
+    started = time.perf_counter()
+    state, written_at = STATE_SNAPSHOTS.load()
+    replayed = trade_journal.open(state['journal'] if state else None)
+    book = ActiveTradeBook(on_change=publish_exposure)
+    for record in trade_journal.active_trades().values(): book.add(ActiveTrade.from_record(record))
+    app.config['ACTIVE_TRADES'] = book
+    RISK_VIEW.reset_shard(SHARD_INDEX, *book.exposure())
+    active_trades = book.values()
+    if state and state.get('events'):
+        EVENT_LOG.restore([event_from_dict(e) for e in state['events']])
+    else:
+        for t in active_trades[:MAX_LOG_HISTORY]: EVENT_LOG.append(f"ACTIVE: {t.symbol} {t.side} @ {t.entry_price}", 'INFO')
+    source = f"snapshot {datetime.fromtimestamp(written_at).strftime('%H:%M:%S')} + {replayed} baris journal" if state else f"{replayed} baris journal"
+    print(f"Startup: Ditemukan {len(active_trades)} trade aktif untuk dipantau ({source}, {(time.perf_counter() - started) * 1000:.0f}ms).")
+
+def publish_exposure(positions, notional):
+    RISK_VIEW.publish(SHARD_INDEX, positions, notional)
+
+def engine_state():
+    settings = {k: v for k, v in app.config['TRADING_SETTINGS'].items() if k != 'api_connection_status'}
+    events = [e._asdict() for e in reversed(EVENT_LOG.recent(MAX_LOG_HISTORY))]
+    return {'journal': trade_journal.checkpoint(), 'settings': settings, 'events': events}
+
+@METRICS.timed('io.snapshot')
+def write_state_snapshot():
+    return STATE_SNAPSHOTS.write(engine_state())
+
+def snapshot_loop():
+    while True:
+        time.sleep(STATE_SNAPSHOT_INTERVAL)
+        try: write_state_snapshot()
+        except Exception as e: print(f"ERROR: Gagal menulis snapshot state: {e}")
+
+def update_trade_in_journal(trade_id, new_status, closing_price):
+    trade_journal.record_update(trade_id, status=new_status, closing_price=closing_price, closed_at=datetime.now(timezone.utc).isoformat())
 
 def check_active_trades(symbol, current_bybit_price):
     if not current_bybit_price: return
-    closed_trades = []
-    for trade_id, trade in list(app.config['ACTIVE_TRADES'].items()):
-        if trade['symbol'] != symbol: continue
-        tp_hit, sl_hit = False, False
-        if trade['side'].lower() == 'buy':
-            if current_bybit_price >= trade['tp_price']: tp_hit = True
-            elif current_bybit_price <= trade['sl_price']: sl_hit = True
-        elif trade['side'].lower() == 'sell':
-            if current_bybit_price <= trade['tp_price']: tp_hit = True
-            elif current_bybit_price >= trade['sl_price']: sl_hit = True
-            
-        if tp_hit or sl_hit:
-            status = "CLOSED_TP" if tp_hit else "CLOSED_SL"
-            log_msg = f"[{'TP HIT' if tp_hit else 'SL HIT'}] {trade['symbol']} {trade['side']} closed at Bybit price ${current_bybit_price:.5f}"
-            print(log_msg); add_log_to_history(log_msg)
-            update_trade_in_json(trade_id, status, current_bybit_price)
-            closed_trades.append(trade_id)
-
-    for trade_id in closed_trades:
-        if str(trade_id) in app.config['ACTIVE_TRADES']: del app.config['ACTIVE_TRADES'][str(trade_id)]
+    book = app.config['ACTIVE_TRADES']
+    for trade, outcome in book.crossed(symbol, current_bybit_price):
+        # Trade REAL ditutup oleh PositionReconciler dari fill sebenarnya di BingX; selama rekonsiliasi tidak bisa
+        # berjalan (API belum/tidak lagi terhubung), harga Bybit tetap dipakai agar simbolnya tidak terblokir selamanya
+        if trade.mode == "REAL" and POSITION_RECONCILER.available(): continue
+        # remove() hanya berhasil sekali, mencegah trade yang sama ditutup dua kali
+        if book.remove(trade.id) is None: continue
+        tp_hit = outcome == 'TP'
+        status = "CLOSED_TP" if tp_hit else "CLOSED_SL"
+        log_msg = f"[{'TP HIT' if tp_hit else 'SL HIT'}] {trade.symbol} {trade.side} closed at Bybit price ${current_bybit_price:.5f}"
+        print(log_msg); add_log_to_history(log_msg, 'TP' if tp_hit else 'SL')
+        update_trade_in_journal(trade.id, status, current_bybit_price)
 
 # <<< FUNGSI TRIGGER DIPERBARUI >>>
 # Menggunakan harga BingX sebagai harga eksekusi
+@METRICS.timed('trade.process')
+@request_lane('order')  # Leverage & order untuk sinyal ini mendahului data market dan housekeeping
 def process_trade_trigger(symbol, side, execution_price):
     settings = app.config['TRADING_SETTINGS']
+    # Slot di batas risiko global (semua shard) dipesan sebelum order dikirim, dilepas setelah trade tercatat atau gagal
+    notional = order_notional(settings)
+    if not RISK_VIEW.reserve(SHARD_INDEX, notional):
+        print(f"Sinyal {side.upper()} {symbol} dilewati: batas risiko global tercapai {RISK_VIEW.summary()}")
+        return False
+    try: return open_trade(symbol, side, execution_price, settings)
+    finally: RISK_VIEW.settle(SHARD_INDEX, notional)
+
+def open_trade(symbol, side, execution_price, settings):
+    # True bila trade tercatat (order REAL terkirim / trade DEMO dibuat)
     mode = "REAL" if settings['real_trading_enabled'] else "DEMO"
     
-    tp_price = execution_price * (1 + settings['tp_percent'] / 100) if side == 'buy' else execution_price * (1 - settings['tp_percent'] / 100)
-    sl_price = execution_price * (1 - settings['sl_percent'] / 100) if side == 'buy' else execution_price * (1 + settings['sl_percent'] / 100)
+    tp_price, sl_price = strategy.tp_sl_prices(side, execution_price, settings['tp_percent'], settings['sl_percent'])
+    symbol_meta = SYMBOL_UNIVERSE.get(symbol)
+    if symbol_meta: tp_price, sl_price = round_to_tick(tp_price, symbol_meta['tick_size']), round_to_tick(sl_price, symbol_meta['tick_size'])
     
-    trade_id = f"{mode}-{int(time.time()*1000)}"
+    trade_id = f"{mode}-{int(time.time()*1000)}" + (f"-s{SHARD_INDEX}" if SHARD_COUNT > 1 else '')  # Unik lintas shard
     trade_record = {
         "id": trade_id, "timestamp": datetime.now(timezone.utc).isoformat(), "symbol": symbol, "side": side,
         "amount_usdt": settings['order_amount_usdt'], "entry_price": execution_price, "leverage": settings['leverage'],
@@ -423,85 +1563,687 @@ def process_trade_trigger(symbol, side, execution_price):
     
     if mode == "REAL":
         if "Berhasil" not in settings['api_connection_status']:
-            add_log_to_history("Gagal: REAL Mode, API tidak terhubung."); return
-        quantity = (settings['order_amount_usdt'] * settings['leverage']) / execution_price
+            add_log_to_history("Gagal: REAL Mode, API tidak terhubung."); return False
+        # Tanpa lot/tick size order pasti ditolak BingX karena presisi; universe dimuat di background (tanpa cache: saat startup)
+        if symbol_meta is None:
+            add_log_to_history(f"Gagal: Metadata {symbol} (lot/tick size) belum dimuat, order REAL dilewati."); return False
+        # Biasanya sudah diterapkan lebih dulu oleh rekonsiliasi; bila belum (simbol baru), diterapkan sekarang
+        position_side = 'LONG' if side == 'buy' else 'SHORT'
+        leverage = LEVERAGE.ensure(settings['api_key'], settings['secret_key'], symbol, position_side, settings['leverage'])
+        if leverage is None:
+            add_log_to_history(f"Gagal: Leverage {settings['leverage']}x untuk {symbol} ({position_side}) belum bisa diterapkan."); return False
+        # Qty mengikuti leverage efektif, agar margin tidak melebihi nominal saat leverage dibatasi
+        trade_record['leverage'] = leverage
+        quantity = round_to_lot((settings['order_amount_usdt'] * leverage) / execution_price, symbol_meta['lot_size'])
+        if quantity <= 0 or quantity < symbol_meta['min_qty']:
+            add_log_to_history(f"Gagal: Qty {symbol} di bawah minimum ({symbol_meta['min_qty']})."); return False
         order_result = create_bingx_order(settings['api_key'], settings['secret_key'], symbol, side, 'market', quantity, tp_price=tp_price, sl_price=sl_price)
         if order_result['status'] == 'success':
             trade_record['id'] = order_result['order_id']
         else:
-            add_log_to_history(f"ERROR: Gagal eksekusi REAL order: {order_result.get('message', 'Unknown error')}"); return
+            add_log_to_history(f"ERROR: Gagal eksekusi REAL order: {order_result.get('message', 'Unknown error')}"); return False
 
-    all_trades = read_json_file(TRADE_LOG_FILE)
-    all_trades.append(trade_record)
-    write_json_file(TRADE_LOG_FILE, all_trades)
+    trade_journal.record_open(trade_record)
     
-    app.config['ACTIVE_TRADES'][str(trade_record['id'])] = trade_record
+    app.config['ACTIVE_TRADES'].add(ActiveTrade.from_record(trade_record))
     log_msg = f"[NEW] [{mode}] {side.upper()} {symbol} @ ${execution_price:.5f} | TP: {tp_price:.5f} SL: {sl_price:.5f}"
-    print(log_msg); add_log_to_history(log_msg)
+    print(log_msg); add_log_to_history(log_msg, 'NEW')
+    return True
+
+# --- EKSEKUSI ORDER ---
+# Sinyal dari loop masuk ke antrean terbatas dan dieksekusi oleh pool worker tetap.
+# Simbol direservasi sebelum masuk antrean, sehingga spread yang bertahan tidak memicu entry ganda.
+
+class OrderExecutor:
+    def __init__(self, handler, workers=ORDER_WORKERS, queue_size=ORDER_QUEUE_SIZE, is_open=None):
+        self.handler = handler
+        self.is_open = is_open  # simbol -> sudah punya trade aktif? (dicek di bawah lock yang sama dengan pelepasan reservasi)
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._started = False
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected_in_flight': 0, 'rejected_open': 0, 'rejected_queue_full': 0, 'not_executed': 0,
+                       'queue_wait_ms_total': 0.0, 'ack_ms_total': 0.0, 'ack_ms_max': 0.0}
+
+    def _ensure_started(self):
+        if self._started: return
+        self._started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"order-worker-{i}", daemon=True).start()
+
+    def is_in_flight(self, symbol):
+        return symbol in self._in_flight
+
+    def submit(self, symbol, side, execution_price, quote_received_at=None):
+        # Tidak pernah memblokir: ditolak bila simbol sedang diproses atau antrean penuh
+        with self._lock:
+            self._ensure_started()
+            if symbol in self._in_flight:
+                self._stats['rejected_in_flight'] += 1
+                return False
+            # Worker menambah trade ke buku lalu melepas reservasi di bawah lock ini, jadi salah satunya pasti terlihat
+            if self.is_open and self.is_open(symbol):
+                self._stats['rejected_open'] += 1
+                return False
+            self._in_flight.add(symbol)
+        try:
+            self._queue.put_nowait((symbol, side, execution_price, time.perf_counter(), quote_received_at))
+        except queue.Full:
+            with self._lock:
+                self._in_flight.discard(symbol)
+                self._stats['rejected_queue_full'] += 1
+            print(f"Antrean order penuh, sinyal {side.upper()} {symbol} dilewati.")
+            return False
+        with self._lock: self._stats['submitted'] += 1
+        return True
+
+    def _worker(self):
+        while True:
+            symbol, side, execution_price, submitted_at, quote_received_at = self._queue.get()
+            started_at = time.perf_counter()
+            failed, executed = False, False
+            try:
+                # Handler mengembalikan False bila order tidak jadi dibuat (ditolak exchange, batas risiko, qty minimum, ...)
+                executed = self.handler(symbol, side, execution_price) is not False
+            except Exception as e:
+                failed = True
+                print(f"ERROR: Eksekusi order {symbol} gagal: {e}")
+            finally:
+                ack_ms = (time.perf_counter() - submitted_at) * 1000
+                METRICS.observe('order.submit_to_ack', ack_ms / 1000)
+                # End-to-end: quote diterima -> order selesai diproses (tick-to-order)
+                if quote_received_at is not None and executed: METRICS.observe('tick_to_order', time.time() - quote_received_at)
+                with self._lock:
+                    # Trade sudah tercatat di ACTIVE_TRADES saat handler selesai, reservasi boleh dilepas
+                    self._in_flight.discard(symbol)
+                    self._stats['failed' if failed else 'completed'] += 1
+                    if not (failed or executed): self._stats['not_executed'] += 1
+                    self._stats['queue_wait_ms_total'] += (started_at - submitted_at) * 1000
+                    self._stats['ack_ms_total'] += ack_ms
+                    self._stats['ack_ms_max'] = max(self._stats['ack_ms_max'], ack_ms)
+                self._queue.task_done()
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            in_flight = sorted(self._in_flight)
+        done = s['completed'] + s['failed']
+        return {
+            'queue_depth': self._queue.qsize(), 'queue_capacity': self._queue.maxsize, 'workers': self.workers,
+            'in_flight': in_flight, 'submitted': s['submitted'], 'completed': s['completed'], 'failed': s['failed'], 'not_executed': s['not_executed'],
+            'rejected_in_flight': s['rejected_in_flight'], 'rejected_open': s['rejected_open'], 'rejected_queue_full': s['rejected_queue_full'],
+            'avg_queue_wait_ms': round(s['queue_wait_ms_total'] / done, 2) if done else 0,
+            'avg_submit_to_ack_ms': round(s['ack_ms_total'] / done, 2) if done else 0,
+            'max_submit_to_ack_ms': round(s['ack_ms_max'], 2),
+        }
+
+ORDER_EXECUTOR = OrderExecutor(process_trade_trigger, is_open=lambda symbol: app.config['ACTIVE_TRADES'].has_symbol(symbol))
+
+# --- REKONSILIASI LEVERAGE ---
+# Leverage yang diinginkan per (simbol, sisi) dicatat, lalu thread background menyamakannya dengan yang sudah
+# diterapkan di BingX. Kombinasi yang sudah sesuai dilewati; sisanya dikirim bersamaan lewat pool kecil.
+# Request web tidak pernah menunggu panggilan leverage; progres dilaporkan lewat LIVE_DATA['leverage_status'] (SSE).
+# Leverage yang melebihi batas akun BingX untuk simbol tsb diturunkan ke batasnya (bukan ditolak exchange).
+
+class LeverageReconciler:
+    SIDES = ('LONG', 'SHORT')
+
+    def __init__(self, workers=LEVERAGE_WORKERS):
+        self._desired = {}   # (simbol, sisi) -> leverage yang diinginkan
+        self._applied = {}   # (simbol, sisi) -> leverage yang diinginkan dan sudah dikonfirmasi BingX
+        self._effective = {} # (simbol, sisi) -> leverage yang benar-benar diterapkan (setelah dibatasi)
+        self._limits = {}    # (simbol, sisi) -> batas leverage akun di BingX
+        self._failed = set() # Tidak dicoba ulang otomatis, hanya saat diminta lagi
+        self._in_flight = set() # (simbol, sisi) yang sedang dikirim ke BingX, oleh ensure() maupun thread background
+        self._credentials = None
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='leverage')
+        self._started = False
+        self._busy = 0
+        self._stats = {'applied': 0, 'failed': 0, 'skipped': 0, 'batches': 0, 'clamped': 0}
+
+    def _ensure_started(self):
+        if self._started: return
+        self._started = True
+        threading.Thread(target=self._run, name='leverage-reconciler', daemon=True).start()
+
+    def _use_credentials(self, credentials):
+        # Akun lain: leverage yang tercatat tidak berlaku lagi
+        if self._credentials != credentials:
+            self._credentials = credentials
+            self._applied.clear(); self._effective.clear(); self._limits.clear(); self._failed.clear()
+
+    def request(self, api_key, secret_key, symbols, leverage):
+        with self._cond:
+            self._use_credentials((api_key, secret_key))
+            for symbol in symbols:
+                for side in self.SIDES:
+                    key = (symbol, side)
+                    self._desired[key] = leverage
+                    self._failed.discard(key)
+                    if self._applied.get(key) == leverage: self._stats['skipped'] += 1
+            self._ensure_started()
+            self._cond.notify_all()
+        self._publish_status()
+
+    def ensure(self, api_key, secret_key, symbol, side, leverage):
+        # Untuk jalur order: leverage efektif (mungkin dibatasi) atau None bila gagal diterapkan.
+        # Langsung kembali bila sudah diterapkan, selain itu diterapkan sinkron di thread pemanggil.
+        credentials, key = (api_key, secret_key), (symbol, side)
+        with self._cond:
+            self._use_credentials(credentials)
+            # Pengiriman yang sedang berjalan untuk kombinasi ini ditunggu, hasilnya dipakai bila sesuai
+            while key in self._in_flight: self._cond.wait()
+            if self._applied.get(key) == leverage: return self._effective[key]
+            self._desired[key] = leverage
+            self._in_flight.add(key)
+        effective = self._apply_owned(credentials, key, leverage)
+        self._publish_status()
+        return effective
+
+    def _apply_owned(self, credentials, key, leverage):
+        # key sudah ditandai in-flight oleh pemanggil; dilepas (dan penunggu dibangunkan) apa pun hasilnya
+        try: return self._apply(credentials, key, leverage)
+        finally:
+            with self._cond:
+                self._in_flight.discard(key)
+                self._cond.notify_all()
+
+    def _limit(self, credentials, key):
+        limit = self._limits.get(key)
+        if limit is None:
+            limits = get_bingx_max_leverage(credentials[0], credentials[1], key[0])
+            if not limits: return None  # Tidak diketahui: dikirim apa adanya, exchange yang memutuskan
+            with self._cond:
+                if self._credentials == credentials:
+                    for side, value in limits.items(): self._limits[(key[0], side)] = value
+            limit = limits[key[1]]
+        return limit
+
+    def _apply(self, credentials, key, leverage):
+        limit = self._limit(credentials, key)
+        effective = min(leverage, limit) if limit else leverage
+        if effective != leverage: print(f"Leverage {leverage}x melebihi batas {key[0]} ({key[1]}), diterapkan {effective}x.")
+        ok = set_bingx_leverage(credentials[0], credentials[1], key[0], effective, key[1])
+        with self._cond:
+            if self._credentials == credentials:
+                if ok:
+                    self._applied[key], self._effective[key] = leverage, effective
+                    self._failed.discard(key)
+                else:
+                    self._failed.add(key)
+            self._stats['applied' if ok else 'failed'] += 1
+            if ok and effective != leverage: self._stats['clamped'] += 1
+        return effective if ok else None
+
+    def _pending_locked(self):
+        return [(key, lev) for key, lev in self._desired.items() if self._applied.get(key) != lev and key not in self._failed and key not in self._in_flight]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                todo = self._pending_locked()
+                while not todo:
+                    self._cond.wait()
+                    todo = self._pending_locked()
+                credentials = self._credentials
+                self._in_flight.update(key for key, _ in todo)
+                self._busy = len(todo)
+                self._stats['batches'] += 1
+            self._publish_status()
+            futures = [self._pool.submit(self._apply_owned, credentials, key, lev) for key, lev in todo]
+            ok = sum(1 for f in futures if f.result() is not None)
+            with self._cond: self._busy = 0
+            symbols = sorted({key[0] for key, _ in todo})
+            target = ', '.join(symbols) if len(symbols) <= 3 else f"{len(symbols)} simbol"
+            msg = f"Leverage diterapkan ke {target}: {ok}/{len(todo)} berhasil."
+            print(msg); add_log_to_history(msg)
+            self._publish_status()
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending_locked())
+            return {'pending': pending, 'in_progress': self._busy, 'failed_pairs': sorted(f"{s} ({side})" for s, side in self._failed),
+                    'applied_pairs': len(self._applied), 'clamped_pairs': sorted(f"{s} ({side}) {lev}x" for (s, side), lev in self._effective.items() if lev != self._applied.get((s, side))),
+                    **self._stats}
+
+    def status_text(self):
+        with self._cond:
+            pending, failed, applied = len(self._pending_locked()), len(self._failed), len(self._applied)
+        if pending: return f"Leverage: menyinkronkan {pending} pengaturan..."
+        if failed: return f"Leverage: {failed} pengaturan gagal, simpan ulang untuk mencoba lagi."
+        return f"Leverage tersinkron ({applied} pengaturan)." if applied else '-'
+
+    def _publish_status(self):
+        app.config['LIVE_DATA']['leverage_status'] = self.status_text()
+        dashboard_notifier.notify()
+
+LEVERAGE = LeverageReconciler()
+
+def watched_symbols():
+    return list(shard_symbols()) if SCANNER_MODE else [app.config['LIVE_DATA']['symbol']]
+
+def request_watched_leverage():
+    settings = app.config['TRADING_SETTINGS']
+    if "Berhasil" not in settings['api_connection_status']: return
+    LEVERAGE.request(settings['api_key'], settings['secret_key'], watched_symbols(), settings['leverage'])
+
+def verify_saved_api():
+    # Saat startup dengan kredensial tersimpan: verifikasi API (mode shard: sekali di supervisor)
+    settings = app.config['TRADING_SETTINGS']
+    if not (settings['api_key'] and settings['secret_key']): return False
+    settings['api_connection_status'] = verify_bingx_api(settings['api_key'], settings['secret_key'])
+    if "Berhasil" not in settings['api_connection_status']:
+        add_log_to_history(f"API Status: {settings['api_connection_status']}"); return False
+    return True
+
+def prewarm_leverage():
+    # Lalu siapkan leverage seluruh simbol yang dipantau
+    if verify_saved_api(): request_watched_leverage()
+
+# --- REKONSILIASI POSISI ---
+# TP/SL trade REAL dieksekusi BingX di sisi server, jadi status lokal dicocokkan dengan posisi sebenarnya:
+# satu request posisi (semua simbol) per siklus; riwayat order hanya diambil untuk posisi yang hilang,
+# semuanya dibatasi anggaran request per menit. Stream user-data (bila aktif) membawa fill lebih cepat.
+
+def is_closing_order(side, position_side):
+    return (side == 'SELL') == (position_side == 'LONG')
+
+def close_status(order_type):
+    if 'TAKE_PROFIT' in order_type: return "CLOSED_TP"
+    if 'STOP' in order_type: return "CLOSED_SL"
+    return "CLOSED_EXTERNAL"  # Ditutup manual, likuidasi, dll.
+
+def trade_position_side(trade):
+    return 'LONG' if trade.side == 'buy' else 'SHORT'
+
+def trade_opened_ms(trade):
+    try: return int(datetime.fromisoformat(trade.timestamp).timestamp() * 1000)
+    except (TypeError, ValueError): return 0
+
+class PositionReconciler:
+    def __init__(self, budget_per_minute=POSITION_REQUEST_BUDGET, relayed=False):
+        self.budget = TokenBucket(budget_per_minute / 60.0, max(1, budget_per_minute // 4))  # Anggaran sendiri, di luar batas venue
+        # Mode shard: posisi akun & fill stream diterima dari supervisor (AccountRelay), bukan diambil sendiri
+        self.relayed = relayed
+        self._pushed = None  # Posisi terakhir dari supervisor, dipakai sekali
+        self.feed = None
+        self._fills = {}  # (simbol, positionSide) -> fill penutup terakhir dari stream
+        self._missing_since = {}  # id trade -> waktu pertama posisinya tidak ditemukan
+        self._entry_synced = set()  # id trade yang harga entry-nya sudah diperbarui dari posisi
+        self._listen_key = self._listen_api_key = None
+        self._listen_key_at = 0.0
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'polls': 0, 'history_requests': 0, 'closed': 0, 'stream_fills': 0, 'entry_updates': 0, 'budget_deferred': 0}
+
+    def wake(self): self._wake.set()
+
+    def available(self):
+        return POSITION_RECONCILE and "Berhasil" in app.config['TRADING_SETTINGS']['api_connection_status']
+
+    def on_fill(self, symbol, position_side, fill):
+        with self._lock:
+            self._fills[(symbol, position_side)] = fill
+            self._stats['stream_fills'] += 1
+        self.wake()
+
+    def expire_listen_key(self):
+        with self._lock: self._listen_key = None
+        self.wake()
+
+    def account_update(self, positions, fills):
+        # Dari AccountRelay supervisor: fill stream untuk simbol shard ini dan/atau posisi seluruh akun
+        for symbol, position_side, fill in fills: self.on_fill(symbol, position_side, fill)
+        if positions is not None:
+            with self._lock: self._pushed = positions
+            self.wake()
+
+    def _due(self, trades, now):
+        return [t for t in trades if now * 1000 - trade_opened_ms(t) >= POSITION_GRACE_SECONDS * 1000]
+
+    def demand(self):
+        # Untuk AccountRelay: apakah shard ini butuh stream user-data dan data posisi pada siklus berikutnya
+        settings = app.config['TRADING_SETTINGS']
+        trades = [t for t in app.config['ACTIVE_TRADES'].values() if t.mode == "REAL"]
+        return {'connected': "Berhasil" in settings['api_connection_status'], 'api_key': settings['api_key'], 'secret_key': settings['secret_key'],
+                'real_enabled': settings['real_trading_enabled'], 'real_trades': len(trades), 'due': len(self._due(trades, time.time()))}
+
+    def run(self):
+        while True:
+            self._wake.wait(POSITION_POLL_INTERVAL)
+            self._wake.clear()
+            try: self.reconcile()
+            except Exception as e: print(f"ERROR: Rekonsiliasi posisi gagal: {e}")
+
+    def reconcile(self):
+        settings = app.config['TRADING_SETTINGS']
+        if not self.available(): return
+        trades = [t for t in app.config['ACTIVE_TRADES'].values() if t.mode == "REAL"]
+        if (trades or settings['real_trading_enabled']) and not self.relayed: self._ensure_user_stream(settings['api_key'])
+        # Fill dari stream langsung menutup trade tanpa request tambahan
+        trades = [t for t in trades if not self._close_from_stream(t)]
+        now = time.time()
+        due = self._due(trades, now)
+        if not due: return
+        positions = self._positions(settings)
+        if positions is None: return
+        for trade in due:
+            position = positions.get((trade.symbol, trade_position_side(trade)))
+            if position is None: continue
+            self._missing_since.pop(trade.id, None)
+            if trade.id not in self._entry_synced and 'entry_fill_price' not in (trade_journal.get(trade.id) or {}):
+                # Harga entry sebenarnya (rata-rata fill market order) menggantikan harga BingX saat sinyal
+                self._entry_synced.add(trade.id)
+                # Slippage bertanda merugikan: positif = fill lebih buruk dari harga sinyal (lebih mahal untuk buy, lebih murah untuk sell)
+                slippage_pct = (position['avg_price'] - trade.entry_price) / trade.entry_price * 100 * (1 if trade.side == 'buy' else -1)
+                trade_journal.record_update(trade.id, entry_fill_price=position['avg_price'], slippage_pct=slippage_pct)
+                with self._lock: self._stats['entry_updates'] += 1
+        for trade in (t for t in due if (t.symbol, trade_position_side(t)) not in positions):
+            if not self._take_budget(): break
+            orders = get_bingx_orders(settings['api_key'], settings['secret_key'], trade.symbol, trade_opened_ms(trade))
+            with self._lock: self._stats['history_requests'] += 1
+            if orders is None: continue
+            fill = self._closing_fill(trade, orders)
+            if fill: self.close_trade(trade, fill); continue
+            first_missing = self._missing_since.setdefault(trade.id, now)
+            if now - first_missing >= POSITION_MISSING_CLOSE_SECONDS:
+                self.close_trade(trade, {'order_id': None, 'type': '', 'price': None, 'filled_at_ms': int(now * 1000), 'source': 'positions'})
+
+    def _positions(self, settings):
+        if self.relayed:
+            with self._lock: positions, self._pushed = self._pushed, None
+            return positions
+        if not self._take_budget(): return None
+        positions = get_bingx_positions(settings['api_key'], settings['secret_key'])
+        with self._lock: self._stats['polls'] += 1
+        return positions
+
+    def _take_budget(self):
+        if self.budget.take(): return True
+        with self._lock: self._stats['budget_deferred'] += 1
+        return False
+
+    def _close_from_stream(self, trade):
+        with self._lock:
+            fill = self._fills.get((trade.symbol, trade_position_side(trade)))
+            if fill is None or fill['filled_at_ms'] < trade_opened_ms(trade): return False
+            del self._fills[(trade.symbol, trade_position_side(trade))]
+        self.close_trade(trade, fill)
+        return True
+
+    def _closing_fill(self, trade, orders):
+        position_side = trade_position_side(trade)
+        fills = [o for o in orders if o.get('status') == 'FILLED' and o.get('positionSide') == position_side
+                 and is_closing_order(o.get('side'), position_side) and int(o.get('updateTime') or 0) >= trade_opened_ms(trade)]
+        if not fills: return None
+        order = min(fills, key=lambda o: int(o['updateTime']))
+        return {'order_id': order.get('orderId'), 'type': order.get('type', ''), 'price': float(order.get('avgPrice') or 0) or None,
+                'filled_at_ms': int(order['updateTime']), 'source': 'history'}
+
+    def close_trade(self, trade, fill):
+        if app.config['ACTIVE_TRADES'].remove(trade.id) is None: return
+        self._missing_since.pop(trade.id, None)
+        self._entry_synced.discard(trade.id)
+        status = close_status(fill['type'])
+        detect_ms = max(time.time() * 1000 - fill['filled_at_ms'], 0)
+        if fill['order_id'] is not None: METRICS.observe('position.fill_to_detect', detect_ms / 1000)
+        trade_journal.record_update(trade.id, status=status, closing_price=fill['price'], close_order_id=fill['order_id'],
+                                    closed_at=datetime.fromtimestamp(fill['filled_at_ms'] / 1000, timezone.utc).isoformat(),
+                                    fill_detect_ms=round(detect_ms, 1), close_source=fill['source'])
+        with self._lock: self._stats['closed'] += 1
+        kind, label = {'CLOSED_TP': ('TP', 'TP HIT'), 'CLOSED_SL': ('SL', 'SL HIT')}.get(status, ('CLOSED', 'CLOSED'))
+        if fill['order_id'] is None:
+            log_msg = f"[{label}] {trade.symbol} {trade.side}: posisi tidak ada lagi di BingX dan fill penutupnya tidak ditemukan."
+        else:
+            price_text = f"${fill['price']:.5f}" if fill['price'] else "harga tidak diketahui"
+            log_msg = f"[{label}] {trade.symbol} {trade.side} terisi di BingX @ {price_text} (terdeteksi {detect_ms:.0f}ms setelah fill, {fill['source']})"
+        print(log_msg); add_log_to_history(log_msg, kind)
+
+    def _ensure_user_stream(self, api_key):
+        if not BINGX_USER_STREAM or websocket is None: return
+        now = time.time()
+        with self._lock: listen_key = self._listen_key if self._listen_api_key == api_key else None
+        if listen_key:
+            if now - self._listen_key_at < LISTEN_KEY_KEEPALIVE: return
+            if extend_bingx_listen_key(api_key, listen_key):
+                self._listen_key_at = now
+                return
+        listen_key = create_bingx_listen_key(api_key)
+        if not listen_key: return
+        with self._lock: self._listen_key, self._listen_api_key, self._listen_key_at = listen_key, api_key, now
+        if self.feed is None:
+            self.feed = BingxUserFeed(BINGX_USER_WS_URL, self, listen_key)
+            self.feed.start()
+        else:
+            self.feed.listen_key = listen_key
+            self.feed.reconnect()
+
+    def stats(self):
+        with self._lock: s = dict(self._stats)
+        s['user_stream'] = bool(self.feed and self.feed.connected)
+        s['budget_tokens'] = round(self.budget.tokens, 2)
+        return s
+
+POSITION_RECONCILER = PositionReconciler()
+
+# --- STATISTIK SPREAD & TRIGGER ADAPTIF ---
+# Setiap spread valid memperbarui statistik bergulir simbolnya (spread_stats.py); mode trigger menentukan batas
+# atas/bawah per simbol yang dipakai dispatch_*_trigger. Statistik hanya ada di memori dan dibangun ulang setelah restart.
+
+SPREAD_STATS = SpreadStats(SPREAD_STATS_HALFLIFE, TRIGGER_PERSIST_ZSCORE, capacity=max(len(AVAILABLE_SYMBOLS), 256))
+
+def spread_trigger_bands(slots, now):
+    return trigger_bands(SPREAD_STATS, slots, now, TRIGGER_MODE, TRIGGER_PERCENTAGE_SPREAD, TRIGGER_ZSCORE,
+                         TRIGGER_PERSIST_SECONDS, TRIGGER_MIN_SPREAD_PCT, SPREAD_STATS_WARMUP)
+
+def symbol_trigger_bands(symbol, now):
+    upper, lower = spread_trigger_bands(np.array([SPREAD_STATS.slot(symbol)]), now)
+    return float(upper[0]), float(lower[0])
+
+def spread_stats_view(symbol, now):
+    # Untuk dashboard & API; batas tak hingga (warmup / belum bertahan) dikirim sebagai null
+    view = SPREAD_STATS.describe(symbol, now)
+    if view is None: return None
+    upper, lower = symbol_trigger_bands(symbol, now)
+    view.update({'mode': TRIGGER_MODE, 'upper_pct': upper if math.isfinite(upper) else None, 'lower_pct': lower if math.isfinite(lower) else None})
+    return {k: round(v, 6) if isinstance(v, float) else v for k, v in view.items()}
+
+def spread_stats_config():
+    return {'mode': TRIGGER_MODE, 'modes': list(TRIGGER_MODES), 'fixed_pct': TRIGGER_PERCENTAGE_SPREAD, 'zscore': TRIGGER_ZSCORE,
+            'persist_zscore': TRIGGER_PERSIST_ZSCORE, 'persist_seconds': TRIGGER_PERSIST_SECONDS, 'min_pct': TRIGGER_MIN_SPREAD_PCT,
+            'halflife_s': SPREAD_STATS_HALFLIFE, 'warmup_s': SPREAD_STATS_WARMUP}
+
+def executable_bands(bands, price_difference_pct):
+    # Mode fixed: spread eksekusi dibandingkan langsung dengan batas. Mode adaptif: statistik (dan batasnya) dibangun
+    # dari spread harga terakhir, jadi sinyal ditentukan oleh spread tersebut; spread eksekusi (VWAP) hanya harus
+    # melewati TRIGGER_MIN_SPREAD_PCT di sisi yang sama agar order tetap menguntungkan setelah kedalaman buku
+    if TRIGGER_MODE == 'fixed': return bands
+    side = strategy.signal_side(price_difference_pct, *bands)
+    if side == 'buy': return TRIGGER_MIN_SPREAD_PCT, -math.inf
+    if side == 'sell': return math.inf, -TRIGGER_MIN_SPREAD_PCT
+    return math.inf, -math.inf
+
+def format_bands(bands):
+    return '/'.join(f"{b:+.3f}%" if math.isfinite(b) else '-' for b in bands)
 
 # <<< LOGIKA TRADING INTI DIUBAH TOTAL >>>
+def trading_tick():
+    live_data = app.config['LIVE_DATA']
+    symbol = live_data['symbol']
+    settings = app.config['TRADING_SETTINGS']
+
+    # Ambil harga (dan order book) dari stream, atau REST untuk kedua exchange secara bersamaan
+    bybit_quote, bingx_quote, bybit_book, bingx_book = get_market_pair(symbol)
+    bybit_price = bybit_quote.price if bybit_quote else None
+    bingx_price = bingx_quote.price if bingx_quote else None
+    
+    # Update data untuk UI
+    live_data['bybit_price'] = bybit_price
+    live_data['bingx_price'] = bingx_price
+
+    if bybit_price is None or bingx_price is None:
+        live_data['price_difference_pct'] = 0
+        live_data['quote_skew_ms'] = None
+        live_data.update(EMPTY_EXECUTABLE)
+        return
+
+    # Logika SL/TP tetap berjalan berdasarkan harga Bybit (leader)
+    check_active_trades(symbol, bybit_price)
+
+    # Tolak pasangan quote polling yang waktu terimanya terpaut terlalu jauh.
+    # Quote stream berlaku selama feed-nya hidup (pesan/heartbeat dalam STREAM_STALE_SECONDS), lihat get_market_pair.
+    skew_ms = quote_skew_ms(bybit_quote, bingx_quote)
+    live_data['quote_skew_ms'] = skew_ms
+    if skew_exceeded(bybit_quote, bingx_quote):
+        live_data['price_difference_pct'] = 0
+        live_data.update(EMPTY_EXECUTABLE)
+        print(f"Quote {symbol} diabaikan: selisih waktu {skew_ms:.0f}ms > {MAX_QUOTE_SKEW_MS}ms")
+        return
+
+    # Hitung selisih harga
+    price_difference_pct = strategy.spread_pct(bybit_price, bingx_price)
+    live_data['price_difference_pct'] = price_difference_pct
+    # Statistik bergulir diperbarui setiap tick, juga saat trading nonaktif (agar warmup sudah selesai ketika diaktifkan)
+    now = max(bybit_quote.received_at, bingx_quote.received_at)
+    SPREAD_STATS.update(symbol, price_difference_pct, now)
+    bands = symbol_trigger_bands(symbol, now)
+    live_data['spread_stats'] = spread_stats_view(symbol, now)
+
+    # Cek jika ada trade aktif untuk simbol ini
+    # Reservasi dicek lebih dulu: worker menambah trade ke buku sebelum melepas reservasinya (submit mengecek ulang keduanya)
+    is_trade_active_for_symbol = ORDER_EXECUTOR.is_in_flight(symbol) or app.config['ACTIVE_TRADES'].has_symbol(symbol)
+    trading_enabled = settings['real_trading_enabled'] or settings['demo_mode_enabled']
+
+    if not executable_spread_enabled():
+        # Cek kondisi trigger jika tidak ada trade aktif
+        if not is_trade_active_for_symbol and trading_enabled:
+            dispatch_spread_trigger(symbol, bybit_price, bingx_price, price_difference_pct, bands, now)
+        return
+
+    # Trigger dari harga eksekusi; pasangan buku REST yang waktunya terpaut jauh tidak dipakai
+    if bybit_book is not None and bingx_book is not None and skew_exceeded(bybit_book, bingx_book):
+        bybit_book = bingx_book = None
+    executable = evaluate_books(bybit_book, bingx_book, order_notional(settings))
+    live_data.update(executable)
+    if not is_trade_active_for_symbol and trading_enabled and bybit_book is not None:
+        dispatch_executable_trigger(symbol, executable, executable_bands(bands, price_difference_pct), max(bybit_book.received_at, bingx_book.received_at))
+
+def order_notional(settings):
+    return settings['order_amount_usdt'] * settings['leverage']
+
+def dispatch_executable_trigger(symbol, executable, bands, quote_received_at=None):
+    # bands = (batas atas, batas bawah) dari mode trigger aktif (spread_trigger_bands)
+    side = strategy.executable_signal_side(executable['exec_long_pct'], executable['exec_short_pct'], *bands)
+    if side is None: return
+    execution_price = executable['long_price'] if side == 'buy' else executable['short_price']
+    if not ORDER_EXECUTOR.submit(symbol, side, execution_price, quote_received_at): return
+    if quote_received_at is not None: METRICS.observe('spread_to_trigger', time.time() - quote_received_at)
+    if side == 'buy':
+        print(f"Peluang LONG Terdeteksi: bid Bybit > ask BingX (VWAP {execution_price}) | Spread eksekusi: {executable['exec_long_pct']:.3f}% (batas {format_bands(bands)})")
+    else:
+        print(f"Peluang SHORT Terdeteksi: ask Bybit < bid BingX (VWAP {execution_price}) | Spread eksekusi: {executable['exec_short_pct']:.3f}% (batas {format_bands(bands)})")
+
+def dispatch_spread_trigger(symbol, bybit_price, bingx_price, price_difference_pct, bands, quote_received_at=None):
+    side = strategy.signal_side(price_difference_pct, *bands)
+    if side is None or not ORDER_EXECUTOR.submit(symbol, side, bingx_price, quote_received_at): return
+    # Jeda dari quote terbaru diterima sampai sinyal masuk antrean order
+    if quote_received_at is not None: METRICS.observe('spread_to_trigger', time.time() - quote_received_at)
+    if side == 'buy':
+        print(f"Peluang LONG Terdeteksi: Bybit({bybit_price}) > BingX({bingx_price}) | Spread: {price_difference_pct:.3f}% (batas {format_bands(bands)})")
+    else:
+        print(f"Peluang SHORT Terdeteksi: Bybit({bybit_price}) < BingX({bingx_price}) | Spread: {price_difference_pct:.3f}% (batas {format_bands(bands)})")
+
+# Mode scanner: seluruh universe simbol dievaluasi dari dua request massal per siklus
+def scanner_tick():
+    live_data = app.config['LIVE_DATA']
+    settings = app.config['TRADING_SETTINGS']
+    symbols = shard_symbols()
+
+    bybit_bulk, bingx_bulk = fetch_all_quotes()
+    if bybit_bulk is None or bingx_bulk is None:
+        live_data.update({'bybit_price': None, 'bingx_price': None, 'price_difference_pct': 0, 'quote_skew_ms': None})
+        return
+
+    # SL/TP untuk setiap simbol yang memiliki trade aktif, berdasarkan harga Bybit
+    for symbol in app.config['ACTIVE_TRADES'].symbols():
+        check_active_trades(symbol, bybit_bulk.prices.get(symbol))
+
+    skew_ms = quote_skew_ms(bybit_bulk, bingx_bulk)
+    live_data['quote_skew_ms'] = skew_ms
+    bybit, bingx, spread_pct = compute_spread_vector(symbols, bybit_bulk.prices, bingx_bulk.prices)
+    valid = np.isfinite(spread_pct)
+    # Statistik seluruh universe diperbarui dalam satu langkah vektor; scan yang waktunya terpaut jauh tidak dipakai
+    received_at = max(bybit_bulk.received_at, bingx_bulk.received_at)
+    slots = SPREAD_STATS.slots(symbols)
+    if skew_ms <= MAX_QUOTE_SKEW_MS: SPREAD_STATS.update_many(slots, spread_pct, received_at)
+
+    # Data UI untuk simbol yang sedang dipilih + daftar spread terbesar
+    selected = live_data['symbol']
+    live_data['bybit_price'] = bybit_bulk.prices.get(selected)
+    live_data['bingx_price'] = bingx_bulk.prices.get(selected)
+    if live_data['bybit_price'] and live_data['bingx_price']:
+        live_data['price_difference_pct'] = strategy.spread_pct(live_data['bybit_price'], live_data['bingx_price'])
+    else:
+        live_data['price_difference_pct'] = 0
+    abs_spread = np.where(valid, np.abs(spread_pct), -1.0)
+    top = np.argsort(-abs_spread)[:SCANNER_TOP_N]
+    live_data['scanner'] = [{'symbol': symbols[i], 'spread_pct': float(spread_pct[i]), 'z': round(float(SPREAD_STATS.last_z[slots[i]]), 3)}
+                            for i in top if valid[i]]
+    live_data['spread_stats'] = spread_stats_view(selected, received_at)
+
+    if skew_ms > MAX_QUOTE_SKEW_MS:
+        print(f"Scan diabaikan: selisih waktu {skew_ms:.0f}ms > {MAX_QUOTE_SKEW_MS}ms")
+        return
+    if not (settings['real_trading_enabled'] or settings['demo_mode_enabled']): return
+
+    book = app.config['ACTIVE_TRADES']
+    upper, lower = spread_trigger_bands(slots, received_at)
+    candidates = [i for i in np.flatnonzero(strategy.signal_vector(spread_pct, upper, lower))
+                  if not (ORDER_EXECUTOR.is_in_flight(symbols[i]) or book.has_symbol(symbols[i]))]
+    if not EXECUTABLE_SPREAD:
+        for i in candidates: dispatch_spread_trigger(symbols[i], float(bybit[i]), float(bingx[i]), float(spread_pct[i]), (float(upper[i]), float(lower[i])), received_at)
+        return
+    # Kandidat dari harga terakhir dikonfirmasi dengan order book (diambil bersamaan) sebelum dikirim ke eksekusi;
+    # hanya K dengan |spread| terbesar, agar satu siklus tidak menjadi 2 + 2N request saat banyak simbol bergerak bersama
+    candidates = sorted(candidates, key=lambda i: -abs(spread_pct[i]))[:SCANNER_CONFIRM_TOP_K]
+    notional = order_notional(settings)
+    futures = [(i, price_fetch_executor.submit(get_bybit_book, symbols[i]), price_fetch_executor.submit(get_bingx_book, symbols[i])) for i in candidates]
+    for i, bybit_future, bingx_future in futures:
+        bybit_book, bingx_book = bybit_future.result(), bingx_future.result()
+        if bybit_book is None or bingx_book is None or skew_exceeded(bybit_book, bingx_book): continue
+        dispatch_executable_trigger(symbols[i], evaluate_books(bybit_book, bingx_book, notional), executable_bands((float(upper[i]), float(lower[i])), float(spread_pct[i])),
+                                    max(bybit_book.received_at, bingx_book.received_at))
+
 def background_trading_loop():
     print("Background trading loop telah dimulai dengan logika arbitrase...")
+    quote_version = 0
     while True:
         try:
-            live_data = app.config['LIVE_DATA']
-            symbol = live_data['symbol']
-            settings = app.config['TRADING_SETTINGS']
-
-            # Ambil harga dari kedua exchange
-            bybit_price = get_bybit_latest_price(symbol)
-            bingx_price = get_bingx_latest_price(symbol)
-            
-            # Update data untuk UI
-            live_data['bybit_price'] = bybit_price
-            live_data['bingx_price'] = bingx_price
-
-            if bybit_price is None or bingx_price is None:
-                live_data['price_difference_pct'] = 0
-                time.sleep(FETCH_INTERVAL)
-                continue
-
-            # Logika SL/TP tetap berjalan berdasarkan harga Bybit (leader)
-            check_active_trades(symbol, bybit_price)
-
-            # Hitung selisih harga
-            # Rumus: ((Harga Leader - Harga Follower) / Harga Follower) * 100
-            price_difference = bybit_price - bingx_price
-            price_difference_pct = (price_difference / bingx_price) * 100
-            live_data['price_difference_pct'] = price_difference_pct
-
-            # Cek jika ada trade aktif untuk simbol ini
-            is_trade_active_for_symbol = any(t['symbol'] == symbol for t in app.config['ACTIVE_TRADES'].values())
-
-            # Cek kondisi trigger jika tidak ada trade aktif
-            if not is_trade_active_for_symbol and (settings['real_trading_enabled'] or settings['demo_mode_enabled']):
-                # Kondisi LONG: Bybit lebih mahal dari BingX
-                if price_difference_pct >= TRIGGER_PERCENTAGE_SPREAD:
-                    print(f"Peluang LONG Terdeteksi: Bybit({bybit_price}) > BingX({bingx_price}) | Spread: {price_difference_pct:.3f}%")
-                    threading.Thread(target=process_trade_trigger, args=(symbol, 'buy', bingx_price)).start()
-                
-                # Kondisi SHORT: Bybit lebih murah dari BingX
-                elif price_difference_pct <= -TRIGGER_PERCENTAGE_SPREAD:
-                    print(f"Peluang SHORT Terdeteksi: Bybit({bybit_price}) < BingX({bingx_price}) | Spread: {price_difference_pct:.3f}%")
-                    threading.Thread(target=process_trade_trigger, args=(symbol, 'sell', bingx_price)).start()
-            
+            with METRICS.span('tick.scanner' if SCANNER_MODE else 'tick'):
+                if SCANNER_MODE: scanner_tick()
+                else: trading_tick()
         except Exception as e:
             print(f"Error di dalam background_trading_loop: {e}")
-            
-        time.sleep(FETCH_INTERVAL)
+        app.config['LIVE_DATA']['risk'] = RISK_VIEW.summary()
+        dashboard_notifier.notify()
 
+        # Tick berikutnya dipicu update dari stream; tanpa stream kembali ke polling per FETCH_INTERVAL
+        if streams_active() and not SCANNER_MODE:
+            quote_version = QUOTE_STORE.wait_for_update(quote_version, FETCH_INTERVAL)
+        else:
+            time.sleep(FETCH_INTERVAL)
 
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE, interval=FETCH_INTERVAL, symbols=AVAILABLE_SYMBOLS, default_symbol=app.config['LIVE_DATA']['symbol'])
 
-@app.route('/get_settings')
-def get_settings():
-    return jsonify(app.config['TRADING_SETTINGS'])
+# --- ENGINE & KANAL PERINTAH ---
+# Engine trading (loop, feed, eksekusi order) berjalan di prosesnya sendiri. Web tier hanya membaca snapshot
+# dan mengirim perintah lewat kanal lokal (multiprocessing.connection + authkey); setiap perintah dibalas ack.
+# Dalam mode 'single' kedua sisi berada di satu proses dan perintah dipanggil langsung.
 
-@app.route('/update_settings', methods=['POST'])
-def update_settings():
-    data = request.get_json(); settings = app.config['TRADING_SETTINGS']
+def verify_and_save_settings(data):
+    # Parsing, verifikasi kredensial & penyimpanan: sekali per perubahan (mode shard: di supervisor, bukan di tiap shard)
+    settings = app.config['TRADING_SETTINGS']
     leverage_changed = 'leverage' in data and settings['leverage'] != int(data.get('leverage'))
     settings.update({
         'api_key': data.get('api_key', settings['api_key']).strip(),
@@ -517,32 +2259,46 @@ def update_settings():
     if "Gagal" in status_msg: 
         settings['real_trading_enabled'] = False
         add_log_to_history(f"API Status: {status_msg}")
-    elif leverage_changed:
-        current_symbol = app.config['LIVE_DATA']['symbol']
-        add_log_to_history(f"Mencoba mengatur leverage ke {settings['leverage']}x untuk {current_symbol}...")
-        set_bingx_leverage(settings['api_key'], settings['secret_key'], current_symbol, settings['leverage'], 'LONG')
-        set_bingx_leverage(settings['api_key'], settings['secret_key'], current_symbol, settings['leverage'], 'SHORT')
+    elif leverage_changed: add_log_to_history(f"Mencoba mengatur leverage ke {settings['leverage']}x...")
     
     save_settings(settings)
-    return jsonify({'status': 'success', 'api_status': settings['api_connection_status']})
+    return "Gagal" not in status_msg
 
-@app.route('/update_symbol', methods=['POST'])
-def update_symbol():
-    data = request.get_json()
-    if 'symbol' in data:
-        new_symbol = data.get('symbol')
-        app.config['LIVE_DATA']['symbol'] = new_symbol
-        settings = app.config['TRADING_SETTINGS']
-        if "Berhasil" in settings['api_connection_status']:
-             add_log_to_history(f"Simbol diubah ke {new_symbol}. Mengatur leverage ke {settings['leverage']}x...")
-             set_bingx_leverage(settings['api_key'], settings['secret_key'], new_symbol, settings['leverage'], 'LONG')
-             set_bingx_leverage(settings['api_key'], settings['secret_key'], new_symbol, settings['leverage'], 'SHORT')
-        return jsonify({'status': 'success', 'symbol': new_symbol})
-    return jsonify({'status': 'error', 'message': 'Symbol not provided'}), 400
+def engine_update_settings(data):
+    settings = app.config['TRADING_SETTINGS']
+    if verify_and_save_settings(data):
+        # Diterapkan di background; kombinasi yang sudah sesuai dilewati sehingga simpan ulang tanpa perubahan tidak memanggil API
+        LEVERAGE.request(settings['api_key'], settings['secret_key'], watched_symbols(), settings['leverage'])
+    return {'status': 'success', 'api_status': settings['api_connection_status']}
 
-@app.route('/toggle_mode', methods=['POST'])
-def toggle_mode():
-    settings = app.config['TRADING_SETTINGS']; data = request.get_json()
+def engine_apply_settings(values):
+    # Mode shard: pengaturan sudah diverifikasi & disimpan supervisor, shard hanya menerapkannya.
+    # Leverage yang sudah sesuai dilewati reconciler, jadi penerapan ulang tanpa perubahan tidak memanggil API
+    app.config['TRADING_SETTINGS'].update(values)
+    request_watched_leverage()
+    dashboard_notifier.notify()
+    return {'status': 'success'}
+
+def engine_update_universe(meta, updated_at):
+    SYMBOL_UNIVERSE.adopt(meta, updated_at)
+    # Simbol baru milik shard ini ikut disiapkan leverage-nya
+    request_watched_leverage()
+    return {'status': 'success', 'symbols': len(shard_symbols())}
+
+def engine_update_symbol(data):
+    if 'symbol' not in data: return {'status': 'error', 'message': 'Symbol not provided'}
+    new_symbol = data.get('symbol')
+    app.config['LIVE_DATA']['symbol'] = new_symbol
+    for feed in MARKET_FEEDS.values(): feed.set_symbols([new_symbol])
+    settings = app.config['TRADING_SETTINGS']
+    if "Berhasil" in settings['api_connection_status']:
+         add_log_to_history(f"Simbol diubah ke {new_symbol}. Mengatur leverage ke {settings['leverage']}x...")
+         LEVERAGE.request(settings['api_key'], settings['secret_key'], [new_symbol], settings['leverage'])
+    dashboard_notifier.notify()
+    return {'status': 'success', 'symbol': new_symbol}
+
+def engine_toggle_mode(data):
+    settings = app.config['TRADING_SETTINGS']
     mode, is_enabled = data.get('mode'), data.get('enabled')
     if mode == 'real':
         if is_enabled and "Berhasil" not in settings['api_connection_status']:
@@ -558,19 +2314,664 @@ def toggle_mode():
         add_log_to_history(f"Mode DEMO {'diaktifkan' if is_enabled else 'dinonaktifkan'}.")
             
     save_settings(settings)
-    return jsonify(settings)
+    return dict(settings)
 
-@app.route('/data')
-def data():
-    response_data = app.config['LIVE_DATA'].copy()
-    response_data['trade_history'] = app.config['TRADE_HISTORY_LOG']
-    return jsonify(response_data)
+def engine_snapshot():
+    return {'live_data': dict(app.config['LIVE_DATA']), 'settings': dict(app.config['TRADING_SETTINGS']), 'symbols': AVAILABLE_SYMBOLS}
 
-if __name__ == '__main__':
-    load_settings()
+def engine_events(since, limit):
+    # Riwayat terlama dulu; event yang sudah keluar dari ring dibaca dari file spill
+    return [event_to_dict(e) for e in EVENT_LOG.read(since, limit)]
+
+def engine_stream_update(version, log_seq, timeout):
+    # Long-poll untuk /stream: tunggu perubahan, lalu kirim quote + log baru dalam satu round-trip
+    version = dashboard_notifier.wait(version, timeout)
+    live_data = app.config['LIVE_DATA']
+    return version, {k: live_data.get(k) for k in STREAM_QUOTE_FIELDS}, logs_since(log_seq)
+
+def engine_spread_stats(symbol=None, limit=50):
+    # Satu simbol, atau simbol dengan |z| terbesar lebih dulu
+    now = time.time()
+    if symbol:
+        names = [symbol]
+    else:
+        entries = SPREAD_STATS.symbols()
+        z = np.abs(SPREAD_STATS.last_z[np.fromiter((slot for _, slot in entries), dtype=np.int64, count=len(entries))])
+        names = [entries[i][0] for i in np.argsort(-z, kind='stable')[:limit]]
+    views = (spread_stats_view(name, now) for name in names)
+    return {'config': spread_stats_config(), 'symbols': [v for v in views if v is not None]}
+
+def risk_status(view):
+    return {**view.summary(), 'by_shard': view.rows()}
+
+def engine_stats():
+    return {'risk': risk_status(RISK_VIEW), 'http': {'bybit': BYBIT_CLIENT.stats(), 'bingx': BINGX_CLIENT.stats()}, 'executor': ORDER_EXECUTOR.stats(), 'leverage': LEVERAGE.stats(),
+            'positions': POSITION_RECONCILER.stats(), 'rate_limits': {'bybit': BYBIT_CLIENT.rate_limit_stats(), 'bingx': BINGX_CLIENT.rate_limit_stats()}}
+
+ENGINE_OPS = {
+    'snapshot': engine_snapshot,
+    'stream_update': engine_stream_update,
+    'logs_since': logs_since,
+    'events': engine_events,
+    'spread_stats': engine_spread_stats,
+    'stats': engine_stats,
+    'metrics': METRICS.render_prometheus,
+    'metrics_summary': METRICS.summary,
+    'reconcile_demand': lambda: POSITION_RECONCILER.demand(),
+    'account_update': lambda positions, fills: POSITION_RECONCILER.account_update(positions, fills),
+    'update_settings': engine_update_settings,
+    'update_symbol': engine_update_symbol,
+    'toggle_mode': engine_toggle_mode,
+    'apply_settings': engine_apply_settings,
+    'update_universe': engine_update_universe,
+}
+
+class EngineUnavailable(Exception):
+    pass
+
+class LocalEngine:
+    def call(self, op, *args): return ENGINE_OPS[op](*args)
+
+class RemoteEngine:
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()  # Satu koneksi per thread web
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            try: conn = Client(self.address, authkey=self.authkey)
+            except (OSError, AuthenticationError) as e: raise EngineUnavailable(f"Engine tidak dapat dihubungi di {self.address}: {e}")
+            self._local.conn = conn
+        return conn
+
+    def call(self, op, *args):
+        for attempt in (0, 1):
+            conn = self._connection()
+            try:
+                conn.send((op, args))
+                status, result = conn.recv()
+                break
+            except (EOFError, OSError) as e:
+                # Koneksi lama putus (engine restart): buka ulang sekali
+                self._local.conn = None
+                if attempt: raise EngineUnavailable(f"Koneksi ke engine terputus: {e}")
+        if status == 'error': raise RuntimeError(result)
+        return result
+
+def _handle_engine_connection(conn):
+    with conn:
+        while True:
+            try: op, args = conn.recv()
+            except (EOFError, OSError): return
+            try: reply = ('ok', ENGINE_OPS[op](*args))
+            except Exception as e: reply = ('error', f"{type(e).__name__}: {e}")
+            try: conn.send(reply)
+            except OSError: return
+
+def serve_engine_channel(address, authkey):
+    listener = Listener(address, authkey=authkey)
+    print(f"Kanal engine mendengarkan di {address[0]}:{address[1]}")
+    while True:
+        try: conn = listener.accept()
+        except (OSError, AuthenticationError) as e:
+            print(f"Koneksi kanal engine ditolak: {e}")
+            continue
+        threading.Thread(target=_handle_engine_connection, args=(conn,), daemon=True).start()
+
+def load_engine_authkey(create=False):
+    # Kunci bersama engine & web: dari env ENGINE_AUTHKEY, atau file ENGINE_AUTHKEY_FILE (dibuat engine)
+    if os.environ.get('ENGINE_AUTHKEY'): return os.environ['ENGINE_AUTHKEY'].encode('utf-8')
+    if not os.path.exists(ENGINE_AUTHKEY_FILE):
+        if not create: raise EngineUnavailable(f"{ENGINE_AUTHKEY_FILE} tidak ditemukan, jalankan engine terlebih dahulu.")
+        fd = os.open(ENGINE_AUTHKEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f: f.write(secrets.token_hex(32))
+    with open(ENGINE_AUTHKEY_FILE, 'r') as f: return f.read().strip().encode('utf-8')
+
+ENGINE = LocalEngine()
+
+def start_engine():
+    global TICK_RECORDER
+    EVENT_LOG.start()
+    # Shard menerima pengaturan (sudah diverifikasi) & universe simbol dari supervisor, lihat configure_shard
+    if SHARD_COUNT == 1:
+        load_settings()
+        # Simbol baru di universe ikut disiapkan leverage-nya (mode scanner)
+        threading.Thread(target=SYMBOL_UNIVERSE.refresh_loop, args=(request_watched_leverage if SCANNER_MODE else None,), name='symbol-refresh', daemon=True).start()
+    # Shard dijalankan supervisor yang sudah membagi ulang trade; engine tunggal mengambil kembali trade dari journal shard
+    if SHARD_COUNT == 1: repartition_trades(1)
     load_initial_state()
+    if RECORD_TICKS: TICK_RECORDER = TickRecorder(TICK_RECORD_DIR).start()
+    # Snapshot baru langsung setelah compaction, karena checkpoint lama tidak berlaku untuk file journal baru
+    threading.Thread(target=trade_journal.compaction_loop, args=(write_state_snapshot,), daemon=True).start()
+    threading.Thread(target=snapshot_loop, name='state-snapshot', daemon=True).start()
+    if METRICS_ENABLED: threading.Thread(target=METRICS.summary_loop, args=(METRICS_SUMMARY_INTERVAL,), daemon=True).start()
+    if not SCANNER_MODE: start_market_streams([app.config['LIVE_DATA']['symbol']])
+    threading.Thread(target=prewarm_leverage if SHARD_COUNT == 1 else request_watched_leverage, name='leverage-prewarm', daemon=True).start()
+    if POSITION_RECONCILE: threading.Thread(target=POSITION_RECONCILER.run, name='position-reconciler', daemon=True).start()
     trade_loop_thread = threading.Thread(target=background_trading_loop, daemon=True)
     trade_loop_thread.start()
-    print(f"Server berjalan di http://127.0.0.1:5000")
     print("Logika arbitrase berjalan di background. Anda bisa menutup browser.")
-    app.run(host='0.0.0.0', port=5000, debug=False)
+
+def run_engine_process():
+    start_engine()
+    serve_engine_channel(ENGINE_ADDRESS, load_engine_authkey(create=True))
+
+# --- MODE SHARD ---
+# Universe simbol (mode scanner) dibagi ke beberapa proses engine. Pemilik sebuah simbol ditentukan crc32 namanya,
+# sehingga pembagian stabil lintas restart dan refresh universe. Setiap shard menjalankan feed, trigger, eksekusi
+# order dan buku trade aktifnya sendiri (journal, snapshot & log event per shard), dan berbagi batas risiko global
+# lewat memori bersama (risk_view.py). Supervisor di proses utama me-restart shard yang mati dan menggabungkan data
+# dashboard semua shard; web tier berbicara dengan supervisor persis seperti dengan engine tunggal.
+
+def shard_of(symbol, count):
+    return zlib.crc32(symbol.encode('utf-8')) % count
+
+_SHARD_SYMBOLS = (None, [])
+
+def shard_symbols():
+    # Simbol milik shard ini, di-cache per identitas AVAILABLE_SYMBOLS (list diganti utuh saat refresh)
+    global _SHARD_SYMBOLS
+    universe, owned = _SHARD_SYMBOLS
+    if universe is not AVAILABLE_SYMBOLS:
+        universe = AVAILABLE_SYMBOLS
+        owned = universe if SHARD_COUNT == 1 else [s for s in universe if shard_of(s, SHARD_COUNT) == SHARD_INDEX]
+        _SHARD_SYMBOLS = (universe, owned)
+    return owned
+
+def shard_file(path, index):
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{index}{ext}"
+
+def shard_address(index):
+    return (ENGINE_ADDRESS[0], ENGINE_ADDRESS[1] + 1 + index)
+
+def journal_for(symbol, count):
+    return TRADE_JOURNAL_FILE if count == 1 else shard_file(TRADE_JOURNAL_FILE, shard_of(symbol, count))
+
+def repartition_trades(count):
+    # Dijalankan sebelum engine/shard mulai. Bila jumlah shard berbeda dari yang tercatat di SHARD_LAYOUT_FILE
+    # (termasuk dari/ke mode tanpa shard), trade aktif dipindahkan ke journal pemilik simbolnya yang baru: dicatat
+    # lengkap di journal tujuan, lalu ditandai MOVED di journal asal sehingga tidak pernah aktif di dua tempat.
+    layout = read_json_file(SHARD_LAYOUT_FILE) or {}
+    sources = [p for p in [TRADE_JOURNAL_FILE] + sorted(glob.glob(shard_file(TRADE_JOURNAL_FILE, '*'))) if os.path.exists(p)]
+    if layout.get('count') == count or (count == 1 and not layout and sources in ([], [TRADE_JOURNAL_FILE])): return
+    targets, moved = {}, 0
+    for source in sources:
+        journal = TradeJournal(source, legacy_path=TRADE_LOG_FILE if source == TRADE_JOURNAL_FILE else None)
+        journal.open()
+        for trade in journal.active_trades().values():
+            target = journal_for(trade['symbol'], count)
+            if target == source: continue
+            if target not in targets:
+                targets[target] = TradeJournal(target)
+                targets[target].open()
+            # Tujuan lebih dulu: crash di antaranya hanya menyisakan salinan yang dipindahkan ulang pada start berikutnya
+            targets[target].record_open({**trade, 'moved_from': source})
+            journal.record_update(trade['id'], status="MOVED", moved_to=target)
+            moved += 1
+        journal.close()
+    for journal in targets.values(): journal.close()
+    atomic_write(SHARD_LAYOUT_FILE, json.dumps({'count': count, 'updated_at': time.time()}))
+    print(f"Layout shard {layout.get('count', 1)} -> {count}: {moved} trade aktif dipindahkan ke journal pemilik simbolnya.")
+
+def configure_shard(index, count, risk_array, settings, universe):
+    # Di awal proses shard, sebelum start_engine: modul dimuat ulang (spawn), jadi state per shard dibuat di sini
+    global SHARD_INDEX, SHARD_COUNT, SCANNER_MODE, TRADE_JOURNAL_FILE, STATE_SNAPSHOT_FILE, EVENT_LOG_FILE, TICK_RECORD_DIR
+    global trade_journal, STATE_SNAPSHOTS, EVENT_LOG, RISK_VIEW, POSITION_RECONCILER
+    SHARD_INDEX, SHARD_COUNT, SCANNER_MODE = index, count, True
+    TRADE_JOURNAL_FILE, STATE_SNAPSHOT_FILE = shard_file(TRADE_JOURNAL_FILE, index), shard_file(STATE_SNAPSHOT_FILE, index)
+    EVENT_LOG_FILE, TICK_RECORD_DIR = shard_file(EVENT_LOG_FILE, index), f"{TICK_RECORD_DIR}.shard{index}"
+    trade_journal = TradeJournal(TRADE_JOURNAL_FILE)
+    STATE_SNAPSHOTS = SnapshotStore(STATE_SNAPSHOT_FILE)
+    EVENT_LOG = EventLog(EVENT_LOG_CAPACITY, EVENT_LOG_FILE, EVENT_LOG_MAX_BYTES, EVENT_LOG_BACKUPS)
+    RISK_VIEW = RiskView(count, risk_array, MAX_CONCURRENT_POSITIONS, MAX_TOTAL_NOTIONAL_USDT)
+    # Semua shard memakai IP & akun yang sama: batas request exchange dibagi rata
+    BYBIT_CLIENT.scheduler = venue_scheduler('bybit', bybit_limit_headers, count)
+    BINGX_CLIENT.scheduler = venue_scheduler('bingx', bingx_limit_headers, count)
+    # Posisi akun & stream user-data diambil sekali oleh supervisor; shard hanya meminta riwayat order trade miliknya
+    POSITION_RECONCILER = PositionReconciler(POSITION_REQUEST_BUDGET / count, relayed=True)
+    app.config['TRADING_SETTINGS'].update(settings)
+    SYMBOL_UNIVERSE.adopt(*universe)
+
+def exit_with_parent(parent_pid):
+    # Shard tidak boleh hidup lebih lama dari supervisor (mis. di-kill -9): port & file-nya dipakai supervisor berikutnya
+    while os.getppid() == parent_pid: time.sleep(1)
+    os._exit(0)
+
+def run_shard_process(index, count, risk_array, settings, universe):
+    threading.Thread(target=exit_with_parent, args=(os.getppid(),), name='parent-watch', daemon=True).start()
+    configure_shard(index, count, risk_array, settings, universe)
+    start_engine()
+    serve_engine_channel(shard_address(index), load_engine_authkey())
+
+# Field LIVE_DATA tentang simbol terpilih, diambil dari shard pemilik simbol tersebut
+SHARD_SELECTED_FIELDS = tuple(k for k in STREAM_QUOTE_FIELDS if k not in ('symbol', 'scanner', 'leverage_status', 'risk', 'shards'))
+
+class ShardSupervisor:
+    def __init__(self, count, authkey):
+        self.count = count
+        self.ctx = multiprocessing.get_context('spawn')  # fork dari proses yang sudah punya thread (web, poller) tidak aman
+        self.risk = RiskView(count, RiskView.allocate(count, self.ctx), MAX_CONCURRENT_POSITIONS, MAX_TOTAL_NOTIONAL_USDT)
+        self.engines = [RemoteEngine(shard_address(i), authkey) for i in range(count)]
+        self.processes = [None] * count
+        self.started_at = [0.0] * count
+        self.restarts = [0] * count
+        self.backoff = [SHARD_RESTART_BACKOFF[0]] * count
+        self.restart_at = [None] * count  # Waktu restart terjadwal untuk shard yang mati
+        self.quotes = [None] * count  # Data dashboard terakhir per shard
+        self._symbol_counts = (None, [0] * count)  # (AVAILABLE_SYMBOLS, jumlah simbol per shard)
+        self.account = AccountRelay(self)
+        self._lock = threading.Lock()
+        self._settings_lock = threading.Lock()  # Verifikasi, penyimpanan & pengiriman pengaturan ke shard berurutan
+        # Versi pengaturan & universe milik supervisor, dan versi yang sudah diterima tiap shard (disusulkan poll_loop)
+        self._versions = {'settings': 0, 'universe': 0}
+        self.synced = [dict(self._versions) for _ in range(count)]
+
+    def start(self):
+        for i in range(self.count): self._spawn(i)
+        threading.Thread(target=self.monitor_loop, name='shard-monitor', daemon=True).start()
+        for i in range(self.count): threading.Thread(target=self.poll_loop, args=(i,), name=f'shard-poll-{i}', daemon=True).start()
+        if POSITION_RECONCILE: threading.Thread(target=self.account.run, name='account-relay', daemon=True).start()
+        threading.Thread(target=SYMBOL_UNIVERSE.refresh_loop, args=(self.push_universe,), name='symbol-refresh', daemon=True).start()
+        threading.Thread(target=self.verify_saved_api, name='api-verify', daemon=True).start()
+        return self
+
+    def _spawn(self, i):
+        # Shard (termasuk yang di-restart) mulai dengan pengaturan & universe terkini milik supervisor
+        self.synced[i] = dict(self._versions)
+        args = (i, self.count, self.risk.array, dict(app.config['TRADING_SETTINGS']), (SYMBOL_UNIVERSE.meta, SYMBOL_UNIVERSE.updated_at))
+        process = self.ctx.Process(target=run_shard_process, args=args, name=f'engine-shard-{i}', daemon=True)
+        process.start()
+        self.processes[i], self.started_at[i] = process, time.time()
+
+    def _log(self, message, kind='INFO'):
+        print(message); add_log_to_history(message, kind)
+
+    def monitor_loop(self):
+        while True:
+            time.sleep(0.5)
+            now = time.time()
+            for i, process in enumerate(self.processes):
+                if process.is_alive():
+                    if now - self.started_at[i] >= SHARD_STABLE_SECONDS: self.backoff[i] = SHARD_RESTART_BACKOFF[0]
+                elif self.restart_at[i] is None:
+                    # Crash beruntun memperpanjang jeda restart, agar shard yang rusak tidak berputar terus-menerus
+                    delay = self.backoff[i]
+                    self.backoff[i] = min(delay * 2, SHARD_RESTART_BACKOFF[1])
+                    self.restart_at[i] = now + delay
+                    self.quotes[i] = None
+                    self._log(f"ERROR: Shard {i} berhenti (exit code {process.exitcode}), restart dalam {delay:g} detik.", 'ERROR')
+                elif now >= self.restart_at[i]:
+                    self.restart_at[i] = None
+                    self.restarts[i] += 1
+                    self._spawn(i)
+                    self._log(f"Shard {i} dijalankan ulang (restart ke-{self.restarts[i]}).")
+
+    def poll_loop(self, i):
+        # Long-poll quote & log baru dari satu shard; log shard masuk ke log supervisor dengan awalan [S<i>]
+        engine, version, log_seq, last_ts = self.engines[i], -1, 0, 0.0
+        while True:
+            try:
+                version, quote, (latest, events, reset) = engine.call('stream_update', version, log_seq, SSE_HEARTBEAT_SECONDS)
+                # Tertinggal lebih dari satu halaman log (atau shard baru restart): ambil sebanyak yang masih ada di ring
+                if reset and log_seq: latest, events, reset = engine.call('logs_since', log_seq, EVENT_LOG_CAPACITY)
+                if quote['symbol'] != app.config['LIVE_DATA']['symbol']:
+                    # Shard yang baru restart kembali ke simbol default
+                    engine.call('update_symbol', {'symbol': app.config['LIVE_DATA']['symbol']})
+                for key in self._versions:
+                    if self.synced[i][key] != self._versions[key]: self._sync(i, key)
+            except (EngineUnavailable, RuntimeError):
+                version = -1
+                time.sleep(SHARD_POLL_INTERVAL)
+                continue
+            for event in reversed(events):
+                # Setelah reset, event yang sudah pernah diteruskan (mis. dipulihkan dari snapshot) dilewati
+                if reset and event['ts'] <= last_ts: continue
+                EVENT_LOG.append(f"[S{i}] {event['message']}", event['kind'], event['level'], event['ts'])
+                last_ts = max(last_ts, event['ts'])
+            log_seq = latest
+            self.quotes[i] = quote
+            self.aggregate()
+            time.sleep(SHARD_POLL_INTERVAL)
+
+    def aggregate(self):
+        with self._lock:
+            live_data = app.config['LIVE_DATA']
+            owner = self.quotes[shard_of(live_data['symbol'], self.count)]
+            if owner: live_data.update({k: owner.get(k) for k in SHARD_SELECTED_FIELDS})
+            quotes = [q for q in self.quotes if q]
+            rows = [row for q in quotes for row in q.get('scanner') or []]
+            live_data['scanner'] = sorted(rows, key=lambda row: -abs(row['spread_pct']))[:SCANNER_TOP_N]
+            live_data['leverage_status'] = ' | '.join(f"S{i}: {q.get('leverage_status')}" for i, q in enumerate(self.quotes) if q) or '-'
+            live_data['risk'] = self.risk.summary()
+            live_data['shards'] = self.status()
+        dashboard_notifier.notify()
+
+    def status(self):
+        universe, counts = self._symbol_counts
+        if universe is not AVAILABLE_SYMBOLS:
+            universe, counts = AVAILABLE_SYMBOLS, [0] * self.count
+            for symbol in universe: counts[shard_of(symbol, self.count)] += 1
+            self._symbol_counts = (universe, counts)
+        now = time.time()
+        return [{'shard': i, 'alive': p.is_alive(), 'pid': p.pid, 'restarts': self.restarts[i], 'symbols': counts[i],
+                 'uptime_s': round(now - self.started_at[i], 1) if p.is_alive() else 0.0}
+                for i, p in enumerate(self.processes)]
+
+    # --- Operasi engine untuk web tier: disebar ke semua shard atau digabungkan ---
+
+    def _each(self, op, *args):
+        results = {}
+        for i, engine in enumerate(self.engines):
+            try: results[i] = engine.call(op, *args)
+            except EngineUnavailable as e: print(f"Shard {i}: {op} gagal ({e})")
+        if not results: raise EngineUnavailable("Tidak ada shard engine yang berjalan.")
+        return results
+
+    def _call(self, i, op, *args):
+        # Balasan satu shard; shard yang membalas error dicatat sebagai ERROR, yang belum terjangkau (start/restart) sebagai info
+        try: result = self.engines[i].call(op, *args)
+        except EngineUnavailable as e:
+            self._log(f"Shard {i} belum terjangkau untuk {op}, disusulkan setelah terhubung ({e}).")
+            return False
+        except RuntimeError as e: result = {'status': 'error', 'message': str(e)}
+        if result.get('status') != 'success': self._log(f"ERROR: Shard {i}: {op} gagal ({result.get('message', 'tanpa pesan')}).", 'ERROR')
+        return result.get('status') == 'success'
+
+    def broadcast(self, op, *args):
+        # Ke semua shard; kembalikan daftar shard yang gagal
+        return [i for i in range(self.count) if not self._call(i, op, *args)]
+
+    def _broadcast_result(self, result, failed):
+        if failed: result.update({'status': 'error', 'message': f"Belum diterapkan di shard {', '.join(map(str, failed))}, dicoba lagi otomatis.", 'failed_shards': failed})
+        return result
+
+    def _sync(self, i, key):
+        version = self._versions[key]
+        if key == 'settings': ok = self._call(i, 'apply_settings', dict(app.config['TRADING_SETTINGS']))
+        else: ok = self._call(i, 'update_universe', SYMBOL_UNIVERSE.meta, SYMBOL_UNIVERSE.updated_at)
+        if ok: self.synced[i][key] = version
+        return ok
+
+    def publish(self, key):
+        # Versi baru dikirim ke semua shard; yang gagal menerima disusulkan poll_loop begitu terjangkau lagi
+        self._versions[key] += 1
+        return [i for i in range(self.count) if not self._sync(i, key)]
+
+    def push_universe(self):
+        self.publish('universe')
+
+    def verify_saved_api(self):
+        with self._settings_lock:
+            if verify_saved_api(): self.publish('settings')
+
+    def snapshot(self):
+        # Pengaturan & universe dimiliki supervisor; data dashboard digabung dari shard oleh poll_loop
+        return {'live_data': dict(app.config['LIVE_DATA']), 'settings': dict(app.config['TRADING_SETTINGS']), 'symbols': AVAILABLE_SYMBOLS}
+
+    def update_settings(self, data):
+        with self._settings_lock:
+            verify_and_save_settings(data)
+            failed = self.publish('settings')
+        return self._broadcast_result({'status': 'success', 'api_status': app.config['TRADING_SETTINGS']['api_connection_status']}, failed)
+
+    def toggle_mode(self, data):
+        with self._settings_lock:
+            settings = engine_toggle_mode(data)
+            failed = self.publish('settings')
+        return self._broadcast_result(settings, failed)
+
+    def update_symbol(self, data):
+        if 'symbol' not in data: return {'status': 'error', 'message': 'Symbol not provided'}
+        # Shard yang gagal menerima disamakan kemudian oleh poll_loop
+        app.config['LIVE_DATA']['symbol'] = data['symbol']
+        failed = self.broadcast('update_symbol', data)
+        self.aggregate()
+        return self._broadcast_result({'status': 'success', 'symbol': data['symbol']}, failed)
+
+    def spread_stats(self, symbol=None, limit=50):
+        if symbol: return self.engines[shard_of(symbol, self.count)].call('spread_stats', symbol, limit)
+        results = list(self._each('spread_stats', None, limit).values())
+        merged = sorted((v for r in results for v in r['symbols']), key=lambda v: -abs(v['z']))[:limit]
+        return {'config': results[0]['config'], 'symbols': merged}
+
+    def stats(self):
+        # Bentuk sama dengan engine tunggal, tetapi setiap bagian berisi satu entri per shard
+        per_shard = self._each('stats')
+        sections = {key for stats in per_shard.values() for key in stats if key != 'risk'}
+        merged = {key: {f'shard{i}': stats.get(key) for i, stats in per_shard.items()} for key in sections}
+        merged.setdefault('positions', {})['account'] = self.account.stats()
+        return {**merged, 'risk': risk_status(self.risk), 'shards': self.status()}
+
+    def metrics(self):
+        return merge_prometheus([(i, text) for i, text in self._each('metrics').items()], 'shard')
+
+    def metrics_summary(self):
+        return {f'shard{i}': summary for i, summary in self._each('metrics_summary').items()}
+
+    def ops(self):
+        # logs_since, events & stream_update tetap dilayani lokal dari log dan LIVE_DATA gabungan supervisor
+        return {
+            'snapshot': self.snapshot,
+            'spread_stats': self.spread_stats,
+            'stats': self.stats,
+            'metrics': self.metrics,
+            'metrics_summary': self.metrics_summary,
+            'update_settings': self.update_settings,
+            'update_symbol': self.update_symbol,
+            'toggle_mode': self.toggle_mode,
+        }
+
+class AccountRelay(PositionReconciler):
+    # Mode shard: satu-satunya pemegang stream user-data (listenKey) dan polling posisi akun BingX. Posisi dikirim ke
+    # shard yang memiliki trade REAL jatuh tempo, fill stream ke shard pemilik simbolnya; penutupan trade tetap di shard.
+    def __init__(self, supervisor):
+        super().__init__()
+        self.supervisor = supervisor
+
+    def on_fill(self, symbol, position_side, fill):
+        with self._lock: self._stats['stream_fills'] += 1
+        index = shard_of(symbol, self.supervisor.count)
+        # Fill yang gagal diteruskan (shard sedang restart) tetap ditemukan shard dari riwayat order
+        try: self.supervisor.engines[index].call('account_update', None, [(symbol, position_side, fill)])
+        except (EngineUnavailable, RuntimeError) as e: print(f"Fill {symbol} tidak bisa diteruskan ke shard {index}: {e}")
+
+    def reconcile(self):
+        try: demands = self.supervisor._each('reconcile_demand')
+        except EngineUnavailable: return
+        connected = [d for d in demands.values() if d['connected']]
+        if not connected: return
+        api = connected[0]
+        if any(d['real_trades'] or d['real_enabled'] for d in connected): self._ensure_user_stream(api['api_key'])
+        waiting = [i for i, d in demands.items() if d['connected'] and d['due']]
+        if not waiting or not self._take_budget(): return
+        positions = get_bingx_positions(api['api_key'], api['secret_key'])
+        with self._lock: self._stats['polls'] += 1
+        if positions is None: return
+        for i in waiting:
+            try: self.supervisor.engines[i].call('account_update', positions, [])
+            except (EngineUnavailable, RuntimeError): pass
+
+def start_supervisor(count):
+    # Supervisor berjalan di proses utama: proses daemon (engine pada --role all) tidak boleh memiliki proses anak
+    global SHARD_COUNT
+    SHARD_COUNT = count
+    repartition_trades(count)
+    authkey = load_engine_authkey(create=True)
+    EVENT_LOG.start()
+    load_settings()
+    supervisor = ShardSupervisor(count, authkey).start()
+    ENGINE_OPS.update(supervisor.ops())
+    print(f"Mode shard: {count} proses engine di port {shard_address(0)[1]}-{shard_address(count - 1)[1]}.")
+    return supervisor
+
+def create_web_app(address=ENGINE_ADDRESS):
+    # Web tier tanpa engine: semua data dibaca dari proses engine. Untuk server WSGI lain, mis.:
+    #   gunicorn -k gthread --threads 16 -b 0.0.0.0:5000 'main:create_web_app()'
+    global ENGINE
+    ENGINE = RemoteEngine(address, load_engine_authkey())
+    return app
+
+def wait_for_engine(timeout=30):
+    deadline = time.time() + timeout
+    while True:
+        try: return ENGINE.call('snapshot')
+        except EngineUnavailable:
+            if time.time() > deadline: raise
+            time.sleep(0.2)
+
+def serve_web(host=WEB_HOST, port=WEB_PORT):
+    print(f"Server berjalan di http://127.0.0.1:{port}")
+    try:
+        from waitress import serve
+    except ImportError:
+        print("waitress tidak terpasang, memakai server development Flask.")
+        app.run(host=host, port=port, debug=False, threaded=True)
+        return
+    # send_bytes=1 agar event /stream langsung dikirim, tidak ditahan di buffer keluaran
+    serve(app, host=host, port=port, threads=WEB_THREADS, send_bytes=1)
+
+# --- ROUTE WEB ---
+
+@app.errorhandler(EngineUnavailable)
+def engine_unavailable(e):
+    return jsonify({'status': 'error', 'message': str(e)}), 503
+
+@app.route('/')
+def index():
+    snapshot = ENGINE.call('snapshot')
+    return render_template_string(HTML_TEMPLATE, interval=FETCH_INTERVAL, max_log=MAX_LOG_HISTORY, symbols=snapshot['symbols'], default_symbol=snapshot['live_data']['symbol'])
+
+@app.route('/get_settings')
+def get_settings():
+    return jsonify(ENGINE.call('snapshot')['settings'])
+
+@app.route('/update_settings', methods=['POST'])
+def update_settings():
+    return jsonify(ENGINE.call('update_settings', request.get_json()))
+
+@app.route('/update_symbol', methods=['POST'])
+def update_symbol():
+    result = ENGINE.call('update_symbol', request.get_json())
+    return jsonify(result), 400 if result['status'] == 'error' else 200
+
+@app.route('/toggle_mode', methods=['POST'])
+def toggle_mode():
+    return jsonify(ENGINE.call('toggle_mode', request.get_json()))
+
+@app.route('/http_stats')
+def http_stats():
+    return jsonify(ENGINE.call('stats')['http'])
+
+@app.route('/executor_stats')
+def executor_stats():
+    return jsonify(ENGINE.call('stats')['executor'])
+
+@app.route('/leverage_status')
+def leverage_status():
+    return jsonify(ENGINE.call('stats')['leverage'])
+
+@app.route('/position_stats')
+def position_stats():
+    return jsonify(ENGINE.call('stats')['positions'])
+
+@app.route('/rate_limits')
+def rate_limits():
+    return jsonify(ENGINE.call('stats')['rate_limits'])
+
+@app.route('/risk')
+def risk():
+    # Batas risiko global + posisi, notional & sinyal ditolak per shard
+    return jsonify(ENGINE.call('stats')['risk'])
+
+@app.route('/shards')
+def shards():
+    return jsonify(ENGINE.call('stats').get('shards', []))
+
+@app.route('/spread_stats')
+def spread_stats():
+    # ?symbol=<simbol> untuk satu simbol, tanpa symbol: ?limit=<n> simbol dengan |z| terbesar
+    return jsonify(ENGINE.call('spread_stats', request.args.get('symbol'), request.args.get('limit', 50, type=int)))
+
+# Format teks Prometheus: histogram durasi per tahap hot path
+@app.route('/metrics')
+def metrics():
+    return Response(ENGINE.call('metrics'), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/summary')
+def metrics_summary():
+    return jsonify(ENGINE.call('metrics_summary'))
+
+# Server-Sent Events: hanya mengirim field quote yang berubah dan log baru sejak nomor urut terakhir klien
+@app.route('/stream')
+def stream():
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None: since = request.args.get('since', 0, type=int)
+
+    def generate():
+        # Pesan pertama selalu berisi quote lengkap; klien baru (since=0) juga menerima seluruh log
+        log_seq, sent_quote, version, first = since, {}, -1, True
+        while True:
+            version, live_quote, (latest, new_logs, reset) = ENGINE.call('stream_update', version, log_seq, SSE_HEARTBEAT_SECONDS)
+            quote = {k: v for k, v in live_quote.items() if v != sent_quote.get(k, object())}
+            reset = reset or (first and since <= 0)
+            if not first and not quote and not new_logs and not reset:
+                yield ": ping\n\n"
+                continue
+            sent_quote.update(quote)
+            first = False
+            payload = {'quote': quote, 'logs': new_logs, 'reset': reset, 'seq': latest}
+            log_seq = latest
+            yield f"id: {latest}\nevent: update\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/data')
+def data():
+    # Polling: klien mengirim seq log terakhir (?since=) dan hanya menerima event yang belum dimilikinya
+    response_data = ENGINE.call('snapshot')['live_data']
+    latest, events, reset = ENGINE.call('logs_since', request.args.get('since', 0, type=int))
+    response_data.update({'logs': events, 'log_seq': latest, 'log_reset': reset})
+    return jsonify(response_data)
+
+@app.route('/events')
+def events():
+    # Riwayat event terstruktur: ?since=<seq>&limit=<n>, terlama dulu; lanjutkan dengan since = seq terakhir
+    limit = min(request.args.get('limit', 100, type=int), EVENT_LOG_CAPACITY)
+    return jsonify(ENGINE.call('events', request.args.get('since', 0, type=int), limit))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bot arbitrase Bybit vs BingX")
+    parser.add_argument('--role', choices=['all', 'engine', 'web', 'single'], default='all',
+                        help="all: engine & web di proses terpisah (default), engine/web: jalankan salah satu saja, single: satu proses")
+    parser.add_argument('--host', default=WEB_HOST)
+    parser.add_argument('--port', type=int, default=WEB_PORT)
+    parser.add_argument('--shards', type=int, default=SHARD_COUNT,
+                        help="jumlah proses engine (mode scanner, universe dibagi per simbol); >1 menjalankan supervisor shard")
+    args = parser.parse_args()
+
+    if args.shards > 1 and args.role != 'web':
+        start_supervisor(args.shards)
+        if args.role == 'engine':
+            serve_engine_channel(ENGINE_ADDRESS, load_engine_authkey())
+        else:
+            wait_for_engine()
+            serve_web(args.host, args.port)
+    elif args.role == 'single':
+        start_engine()
+        serve_web(args.host, args.port)
+    elif args.role == 'engine':
+        run_engine_process()
+    elif args.role == 'web':
+        create_web_app()
+        serve_web(args.host, args.port)
+    else:
+        load_engine_authkey(create=True)
+        # spawn: modul ini sudah membuat pool thread, lock & file journal saat import, yang tidak aman diwarisi lewat fork
+        engine_process = multiprocessing.get_context('spawn').Process(target=run_engine_process, name='trading-engine', daemon=True)
+        engine_process.start()
+        create_web_app()
+        wait_for_engine()
+        serve_web(args.host, args.port)
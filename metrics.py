@@ -0,0 +1,176 @@
+# Instrumentasi latensi hot path: span berbasis jam monotonic (perf_counter) yang dicatat ke histogram
+# dengan bucket tetap, diekspor dalam format teks Prometheus dan diringkas berkala (p50/p99/max per tahap).
+# Saat dinonaktifkan, span() mengembalikan objek kosong bersama sehingga biayanya hampir nol.
+#
+#   METRICS = MetricsRegistry()
+#   with METRICS.span('tick'): ...
+#   @METRICS.timed('order.sign')
+#   def sign(...): ...
+import bisect
+import functools
+import threading
+import time
+
+# Batas atas bucket (detik); bucket terakhir (+Inf) menampung sisanya
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        # Jendela sejak ringkasan terakhir (untuk log berkala)
+        self._window_counts = [0] * (len(self.buckets) + 1)
+        self._window_max = 0.0
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self._window_counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+            if seconds > self.max: self.max = seconds
+            if seconds > self._window_max: self._window_max = seconds
+
+    def quantile(self, q, counts=None, max_value=None):
+        # Estimasi dari bucket: interpolasi linear di dalam bucket yang memuat kuantil
+        counts = self.counts if counts is None else counts
+        max_value = self.max if max_value is None else max_value
+        total = sum(counts)
+        if not total: return 0.0
+        rank, cumulative = q * total, 0
+        for i, c in enumerate(counts):
+            if cumulative + c >= rank and c:
+                if i == len(self.buckets): return max_value
+                lower = self.buckets[i - 1] if i else 0.0
+                value = lower + (self.buckets[i] - lower) * (rank - cumulative) / c
+                return min(value, max_value)
+            cumulative += c
+        return max_value
+
+    def take_window(self):
+        with self._lock:
+            counts, window_max = self._window_counts, self._window_max
+            self._window_counts, self._window_max = [0] * (len(self.buckets) + 1), 0.0
+        return counts, window_max
+
+class _Span:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULL_SPAN = _NullSpan()
+
+class MetricsRegistry:
+    def __init__(self, enabled=True, prefix='bot', buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.buckets = buckets
+        self._histograms = {}  # nama tahap -> Histogram
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        h = self._histograms.get(stage)
+        if h is None:
+            with self._lock: h = self._histograms.setdefault(stage, Histogram(self.buckets))
+        return h
+
+    def span(self, stage):
+        if not self.enabled: return _NULL_SPAN
+        return _Span(self.histogram(stage))
+
+    def observe(self, stage, seconds):
+        if self.enabled: self.histogram(stage).observe(seconds)
+
+    def timed(self, stage):
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled: return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try: return fn(*args, **kwargs)
+                finally: self.histogram(stage).observe(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        # Buang semua observasi, mis. setelah fase warmup benchmark
+        with self._lock: self._histograms = {}
+
+    def stages(self):
+        with self._lock: return sorted(self._histograms.items())
+
+    def render_prometheus(self):
+        name = f"{self.prefix}_stage_duration_seconds"
+        lines = [f"# HELP {name} Durasi tahap hot path (detik)", f"# TYPE {name} histogram"]
+        max_lines = [f"# HELP {name}_max Durasi terlama per tahap sejak start (detik)", f"# TYPE {name}_max gauge"]
+        for stage, h in self.stages():
+            with h._lock: counts, total_sum, count, max_value = list(h.counts), h.sum, h.count, h.max
+            cumulative = 0
+            for bound, c in zip(h.buckets, counts):
+                cumulative += c
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total_sum:.9f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+            max_lines.append(f'{name}_max{{stage="{stage}"}} {max_value:.9f}')
+        return '\n'.join(lines + max_lines) + '\n'
+
+    def summary(self, window=False):
+        # dict tahap -> {count, p50_ms, p99_ms, max_ms}; window=True hanya observasi sejak ringkasan jendela terakhir
+        result = {}
+        for stage, h in self.stages():
+            if window:
+                counts, max_value = h.take_window()
+            else:
+                with h._lock: counts, max_value = list(h.counts), h.max
+            count = sum(counts)
+            if not count: continue
+            result[stage] = {'count': count, 'p50_ms': round(h.quantile(0.5, counts, max_value) * 1000, 3),
+                             'p99_ms': round(h.quantile(0.99, counts, max_value) * 1000, 3), 'max_ms': round(max_value * 1000, 3)}
+        return result
+
+    def summary_loop(self, interval, log=print):
+        while True:
+            time.sleep(interval)
+            if not self.enabled: continue
+            stages = self.summary(window=True)
+            if not stages: continue
+            log(f"[metrics] {interval:g}s terakhir:")
+            for stage, s in stages.items():
+                log(f"  {stage:<24} n={s['count']:<6} p50={s['p50_ms']:.2f}ms p99={s['p99_ms']:.2f}ms max={s['max_ms']:.2f}ms")
+
+def merge_prometheus(texts, label):
+    # Menggabungkan keluaran render_prometheus beberapa proses [(nilai label, teks)]: setiap sampel diberi label
+    # tambahan, dan HELP/TYPE + seluruh sampel satu famili metrik tetap berurutan seperti syarat format teks Prometheus
+    families = {}
+    for value, text in texts:
+        family = None
+        for line in text.splitlines():
+            if line.startswith('# '):
+                family = families.setdefault(line.split(' ', 3)[2], {'meta': [], 'samples': []})
+                if line not in family['meta']: family['meta'].append(line)
+                continue
+            if not line or family is None: continue
+            sample, _, number = line.rpartition(' ')
+            sample = sample.replace('{', f'{{{label}="{value}",', 1) if '{' in sample else f'{sample}{{{label}="{value}"}}'
+            family['samples'].append(f"{sample} {number}")
+    return ''.join('\n'.join(f['meta'] + f['samples']) + '\n' for f in families.values())
@@ -0,0 +1,537 @@
+# Server tiruan (stand-in) lokal untuk Bybit & BingX agar bot bisa diuji tanpa koneksi ke exchange.
+# Stream WebSocket ticker dengan dialek masing-masing exchange:
+#   ws://127.0.0.1:<port>/v5/public/linear -> Bybit (JSON, op subscribe/ping)
+#   ws://127.0.0.1:<port>/swap-market      -> BingX (frame ter-gzip, reqType sub, heartbeat Ping/Pong)
+#   ws://127.0.0.1:<port>/swap-market?listenKey=... -> stream user-data BingX (ORDER_TRADE_UPDATE saat TP/SL terisi)
+# Server REST dengan endpoint yang dipakai bot, plus latensi, jitter, error & rate limit (429 + header kuota) yang bisa diatur:
+#   GET  /v5/market/tickers, /instruments-info, /orderbook -> Bybit
+#   GET  /openApi/swap/v2/quote/contracts, /quote/price, /quote/depth, /user/balance; GET/POST /trade/leverage; POST /trade/order -> BingX
+#   GET  /openApi/swap/v2/user/positions, /trade/allOrders; POST/PUT /openApi/user/auth/userDataStream -> akun BingX tiruan
+#
+# Contoh pemakaian dari Python:
+#   server = start_mock_stream_server()
+#   feed = main.BybitTickerFeed(server.url('bybit'), main.QUOTE_STORE)
+#   rest = start_mock_rest_server(latency_ms=20, jitter_ms=5, error_rate=0.01)
+#   BYBIT_API_URL=http://127.0.0.1:<port> BINGX_API_URL=http://127.0.0.1:<port> python main.py
+import argparse
+import base64
+import gzip
+import hashlib
+import http.server
+import itertools
+import json
+import math
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+import urllib.parse
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+# --- PROTOKOL WEBSOCKET MINIMAL (RFC 6455) ---
+
+def ws_handshake(rfile, wfile):
+    request_line = rfile.readline().decode('latin-1').strip()
+    headers = {}
+    while True:
+        line = rfile.readline().decode('latin-1').strip()
+        if not line: break
+        key, _, value = line.partition(':')
+        headers[key.strip().lower()] = value.strip()
+    accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + WS_GUID).encode()).digest()).decode()
+    wfile.write((
+        "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+    ).encode())
+    wfile.flush()
+    return request_line.split(' ')[1]
+
+def ws_read_frame(rfile):
+    header = rfile.read(2)
+    if len(header) < 2: return OP_CLOSE, b''
+    opcode, length = header[0] & 0x0F, header[1] & 0x7F
+    if length == 126: length = struct.unpack('!H', rfile.read(2))[0]
+    elif length == 127: length = struct.unpack('!Q', rfile.read(8))[0]
+    mask = rfile.read(4) if header[1] & 0x80 else None
+    payload = rfile.read(length)
+    if mask: payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+def ws_send_frame(wfile, payload, opcode=OP_TEXT):
+    if isinstance(payload, str): payload = payload.encode('utf-8')
+    length = len(payload)
+    if length < 126: header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536: header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else: header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    wfile.write(header + payload)
+    wfile.flush()
+
+# --- HARGA TIRUAN ---
+
+class MockPriceBook:
+    def __init__(self, base_price=1.0, volatility=0.0005, mean_reversion=0.0):
+        self.base_price = base_price
+        self.volatility = volatility
+        # Tarikan kembali ke base_price per langkah (0 = random walk murni), agar spread antar venue tetap terbatas
+        self.mean_reversion = mean_reversion
+        self._prices = {}  # (venue, symbol 'BTC/USDT') -> harga
+        self._lock = threading.Lock()
+
+    def set_price(self, venue, symbol, price):
+        with self._lock: self._prices[(venue, symbol)] = price
+
+    def next_price(self, venue, symbol):
+        # Random walk kecil per venue/simbol
+        with self._lock:
+            price = self._prices.get((venue, symbol), self.base_price)
+            price *= 1 + random.uniform(-self.volatility, self.volatility)
+            if self.mean_reversion: price += (self.base_price - price) * self.mean_reversion
+            self._prices[(venue, symbol)] = price
+            return price
+
+    def last_price(self, venue, symbol):
+        with self._lock: return self._prices.get((venue, symbol), self.base_price)
+
+    def depth(self, venue, symbol, levels=50):
+        # Buku di sekitar harga terakhir pada grid tick tetap; ukuran level tetap per harga,
+        # sehingga antar update hanya level di tepi yang berubah (seperti buku asli)
+        tick = self.base_price * 0.0001
+        best_bid = math.floor(self.next_price(venue, symbol) / tick)
+        size = lambda k: f"{100 + (k * 7919) % 400}"
+        bids = [[f"{(best_bid - i) * tick:.8f}", size(best_bid - i)] for i in range(levels)]
+        asks = [[f"{(best_bid + 1 + i) * tick:.8f}", size(best_bid + 1 + i)] for i in range(levels)]
+        return bids, asks
+
+# --- AKUN TIRUAN ---
+# Posisi dari order market beserta TP/SL yang dilampirkan; TP/SL dieksekusi di "server" saat harga BingX
+# melewatinya, lalu muncul di riwayat order dan dikirim sebagai ORDER_TRADE_UPDATE ke stream user-data.
+
+class MockAccount:
+    def __init__(self, prices):
+        self.prices = prices
+        self.positions = {}  # (simbol 'BTC/USDT', positionSide) -> posisi
+        self.history = []    # Order yang sudah terisi (terbaru di akhir)
+        self._listeners = set()
+        self._listen_keys = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_listen_key(self):
+        return f"mock-listen-key-{next(self._listen_keys)}"
+
+    def add_listener(self, handler):
+        with self._lock: self._listeners.add(handler)
+
+    def remove_listener(self, handler):
+        with self._lock: self._listeners.discard(handler)
+
+    def open(self, order_id, params):
+        symbol, position_side = params['symbol'].replace('-', '/'), params.get('positionSide', 'LONG')
+        stops = {kind: json.loads(params[kind])['stopPrice'] for kind in ('takeProfit', 'stopLoss') if params.get(kind)}
+        now = int(time.time() * 1000)
+        price = self.prices.last_price('bingx', symbol)
+        with self._lock:
+            self.positions[(symbol, position_side)] = {'symbol': symbol, 'positionSide': position_side, 'positionAmt': float(params.get('quantity', 0)),
+                                                       'avgPrice': price, 'tp': stops.get('takeProfit'), 'sl': stops.get('stopLoss'), 'time': now}
+            self.history.append(self._order(order_id, symbol, params.get('side'), position_side, 'MARKET', price, float(params.get('quantity', 0)), now))
+
+    def _order(self, order_id, symbol, side, position_side, order_type, price, quantity, now):
+        return {'symbol': symbol.replace('/', '-'), 'orderId': order_id, 'side': side, 'positionSide': position_side, 'type': order_type,
+                'status': 'FILLED', 'avgPrice': f"{price:.8f}", 'executedQty': f"{quantity:g}", 'time': now, 'updateTime': now}
+
+    def close(self, symbol, position_side, order_type='MARKET', price=None):
+        # Menutup posisi seperti fill di sisi exchange (TP/SL, likuidasi, atau ditutup manual)
+        with self._lock:
+            position = self.positions.pop((symbol, position_side), None)
+            if position is None: return None
+            if price is None: price = self.prices.last_price('bingx', symbol)
+            side = 'SELL' if position_side == 'LONG' else 'BUY'
+            order = self._order(random.randint(10**8, 10**9), symbol, side, position_side, order_type, price, position['positionAmt'], int(time.time() * 1000))
+            self.history.append(order)
+            listeners = list(self._listeners)
+        event = json.dumps({'e': 'ORDER_TRADE_UPDATE', 'E': order['updateTime'], 'o': {
+            's': order['symbol'], 'i': order['orderId'], 'S': side, 'o': order_type, 'X': 'FILLED', 'ap': order['avgPrice'],
+            'z': order['executedQty'], 'ps': position_side, 'T': order['updateTime']}})
+        for handler in listeners:
+            try: handler.send_message(event)
+            except OSError: pass
+        return order
+
+    def evaluate(self):
+        with self._lock: positions = list(self.positions.values())
+        for p in positions:
+            price = self.prices.last_price('bingx', p['symbol'])
+            is_long = p['positionSide'] == 'LONG'
+            if p['tp'] and (price >= p['tp'] if is_long else price <= p['tp']): self.close(p['symbol'], p['positionSide'], 'TAKE_PROFIT_MARKET', price)
+            elif p['sl'] and (price <= p['sl'] if is_long else price >= p['sl']): self.close(p['symbol'], p['positionSide'], 'STOP_MARKET', price)
+
+    def position_list(self):
+        self.evaluate()
+        with self._lock:
+            return [{'symbol': p['symbol'].replace('/', '-'), 'positionSide': p['positionSide'], 'positionAmt': f"{p['positionAmt']:g}",
+                     'avgPrice': f"{p['avgPrice']:.8f}", 'updateTime': p['time']} for p in self.positions.values()]
+
+    def orders(self, symbol, start_time=0, limit=500):
+        self.evaluate()
+        with self._lock: return [o for o in self.history if o['symbol'] == symbol and o['updateTime'] >= start_time][-limit:]
+
+# --- SERVER STREAM ---
+
+class MockStreamHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        path = ws_handshake(self.rfile, self.wfile)
+        self.venue = 'bingx' if path.startswith('/swap-market') else 'bybit'
+        self.user_stream = 'listenKey=' in path
+        if self.user_stream: server.account.add_listener(self)
+        self.subscriptions = set()
+        self.books_sent = {}  # topik orderbook Bybit -> (bids, asks) terakhir yang dikirim, untuk menghitung delta
+        self.book_seq = 0
+        self.send_lock = threading.Lock()
+        self.closed = threading.Event()
+        server.register(self)
+        pusher = threading.Thread(target=self.push_loop, daemon=True)
+        pusher.start()
+        try:
+            while not self.closed.is_set():
+                opcode, payload = ws_read_frame(self.rfile)
+                if opcode == OP_CLOSE: break
+                if opcode == OP_PING: self.send(payload, OP_PONG)
+                elif opcode in (OP_TEXT, OP_BINARY): self.on_message(payload.decode('utf-8'))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.closed.set()
+            server.unregister(self)
+            if self.user_stream: server.account.remove_listener(self)
+
+    def send(self, payload, opcode=OP_TEXT):
+        with self.send_lock: ws_send_frame(self.wfile, payload, opcode)
+
+    def send_message(self, text):
+        # BingX mengirim semua pesan sebagai frame biner ter-gzip
+        if self.venue == 'bingx': self.send(gzip.compress(text.encode('utf-8')), OP_BINARY)
+        else: self.send(text)
+
+    def on_message(self, text):
+        if self.venue == 'bingx':
+            if text == 'Pong': return
+            msg = json.loads(text)
+            topic = msg.get('dataType', '')
+            if msg.get('reqType') == 'sub': self.subscriptions.add(topic)
+            elif msg.get('reqType') == 'unsub': self.subscriptions.discard(topic)
+            self.send_message(json.dumps({'id': msg.get('id'), 'code': 0, 'msg': '', 'dataType': '', 'data': None}))
+            return
+        msg = json.loads(text)
+        if msg.get('op') == 'ping':
+            self.send_message(json.dumps({'success': True, 'ret_msg': 'pong', 'op': 'ping'}))
+            return
+        for topic in msg.get('args', []):
+            if msg.get('op') == 'subscribe': self.subscriptions.add(topic)
+            elif msg.get('op') == 'unsubscribe':
+                self.subscriptions.discard(topic)
+                self.books_sent.pop(topic, None)
+        self.send_message(json.dumps({'success': True, 'ret_msg': '', 'op': msg.get('op')}))
+
+    def depth_message(self, topic):
+        if self.venue == 'bingx':
+            # BingX: snapshot N level, ask diurutkan dari harga tertinggi
+            venue_symbol, levels = topic.split('@')[0], int(topic.split('@')[1][len('depth'):])
+            bids, asks = self.server.prices.depth('bingx', venue_symbol.replace('-', '/'), levels)
+            return json.dumps({'code': 0, 'dataType': topic, 'data': {'bids': bids, 'asks': asks[::-1]}})
+        # Bybit: snapshot pertama, selanjutnya delta (level berubah/baru, ukuran "0" = dihapus)
+        _, levels, venue_symbol = topic.split('.')
+        bids, asks = self.server.prices.depth('bybit', venue_symbol.replace('USDT', '/USDT'), int(levels))
+        previous = self.books_sent.get(topic)
+        self.books_sent[topic] = (bids, asks)
+        self.book_seq += 1
+        if previous is None:
+            msg_type, b, a = 'snapshot', bids, asks
+        else:
+            def diff(old, new):
+                old, new = dict(map(tuple, old)), dict(map(tuple, new))
+                return [[p, s] for p, s in new.items() if old.get(p) != s] + [[p, "0"] for p in old if p not in new]
+            msg_type, b, a = 'delta', diff(previous[0], bids), diff(previous[1], asks)
+        return json.dumps({'topic': topic, 'type': msg_type, 'ts': int(time.time() * 1000),
+                           'data': {'s': venue_symbol, 'b': b, 'a': a, 'u': self.book_seq, 'seq': self.book_seq}})
+
+    def ticker_message(self, topic):
+        if topic.startswith('orderbook.') or '@depth' in topic: return self.depth_message(topic)
+        if self.venue == 'bingx':
+            venue_symbol = topic.split('@')[0]
+            price = self.server.prices.next_price('bingx', venue_symbol.replace('-', '/'))
+            return json.dumps({'code': 0, 'dataType': topic, 'data': {'e': 'lastPriceUpdate', 'E': int(time.time() * 1000), 's': venue_symbol, 'c': f"{price:.8f}"}})
+        venue_symbol = topic.split('.', 1)[1]
+        price = self.server.prices.next_price('bybit', venue_symbol.replace('USDT', '/USDT'))
+        return json.dumps({'topic': topic, 'type': 'snapshot', 'ts': int(time.time() * 1000), 'data': {'symbol': venue_symbol, 'lastPrice': f"{price:.8f}"}})
+
+    def push_loop(self):
+        last_heartbeat = time.time()
+        try:
+            while not self.closed.wait(self.server.push_interval):
+                if self.user_stream: self.server.account.evaluate()
+                for topic in list(self.subscriptions): self.send_message(self.ticker_message(topic))
+                if self.venue == 'bingx' and time.time() - last_heartbeat >= 5:
+                    self.send_message('Ping'); last_heartbeat = time.time()
+        except OSError:
+            self.closed.set()
+
+class MockStreamServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, push_interval=0.1, prices=None, account=None):
+        super().__init__((host, port), MockStreamHandler)
+        self.push_interval = push_interval
+        self.prices = prices or MockPriceBook()
+        self.account = account or MockAccount(self.prices)
+        self._clients = set()
+        self._clients_lock = threading.Lock()
+
+    def register(self, handler):
+        with self._clients_lock: self._clients.add(handler)
+
+    def unregister(self, handler):
+        with self._clients_lock: self._clients.discard(handler)
+
+    def client_count(self):
+        with self._clients_lock: return len(self._clients)
+
+    def drop_all_connections(self):
+        # Memutus paksa semua klien untuk menguji reconnect & resubscribe
+        with self._clients_lock: clients = list(self._clients)
+        for handler in clients:
+            handler.closed.set()
+            try: handler.connection.shutdown(socket.SHUT_RDWR)
+            except OSError: pass
+
+    def url(self, venue):
+        host, port = self.server_address[:2]
+        path = '/swap-market' if venue == 'bingx' else '/v5/public/linear'
+        return f"ws://{host}:{port}{path}"
+
+def start_mock_stream_server(host='127.0.0.1', port=0, push_interval=0.1, prices=None, account=None):
+    server = MockStreamServer(host, port, push_interval, prices, account)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# --- SERVER REST ---
+
+DEFAULT_SYMBOLS = ('BRETT/USDT', 'BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'DOGE/USDT')
+
+def mock_symbols(count):
+    # Universe simbol untuk benchmark mode scanner: simbol default lalu simbol sintetis
+    return list(DEFAULT_SYMBOLS[:count]) + [f"MOCK{i:04d}/USDT" for i in range(max(count - len(DEFAULT_SYMBOLS), 0))]
+
+class MockRestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, seperti exchange asli
+    disable_nagle_algorithm = True  # Header & body ditulis terpisah; tanpa ini delayed ACK menambah ~40ms
+
+    def log_message(self, format, *args): pass
+
+    def do_GET(self): self.dispatch('GET')
+    def do_POST(self): self.dispatch('POST')
+    def do_PUT(self): self.dispatch('PUT')
+
+    def dispatch(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        if length: params.update(urllib.parse.parse_qsl(self.rfile.read(length).decode('utf-8')))
+        server = self.server
+        server.count_request(url.path)
+        server.inject_latency(url.path)
+        route = server.routes.get((method, url.path))
+        if route is None: return self.reply(404, {'code': 404, 'msg': 'not found'})
+        limited, headers = server.check_rate_limit()
+        if limited: return self.reply(429, {'code': 429, 'msg': 'too many requests'}, headers)
+        if server.error_rate and random.random() < server.error_rate: return self.reply(500, {'code': 500, 'msg': 'injected error'})
+        self.reply(200, route(params), headers)
+
+    def reply(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items(): self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class MockRestServer(http.server.ThreadingHTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    MAX_LEVERAGE = 50  # Batas leverage akun tiruan; di atasnya POST /trade/leverage ditolak
+
+    def __init__(self, host='127.0.0.1', port=0, prices=None, symbols=DEFAULT_SYMBOLS, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, path_latency_ms=None, account=None,
+                 rate_limit=None):
+        super().__init__((host, port), MockRestHandler)
+        self.prices = prices or MockPriceBook()
+        self.account = account or MockAccount(self.prices)
+        self.symbols = list(symbols)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.path_latency_ms = path_latency_ms or {}  # path -> latensi dasar khusus, mis. order lebih lambat
+        self.request_counts = {}
+        self.rate_limit = rate_limit  # Request per detik (jendela tetap 1 detik) sebelum dibalas 429; None = tanpa batas
+        self.rate_limited = 0
+        self._rate_window, self._rate_used = 0, 0
+        self._counts_lock = threading.Lock()
+        self._order_ids = itertools.count(1000000)
+        self.routes = {
+            ('GET', '/v5/market/tickers'): self.bybit_tickers,
+            ('GET', '/v5/market/instruments-info'): self.bybit_instruments,
+            ('GET', '/v5/market/orderbook'): self.bybit_orderbook,
+            ('GET', '/openApi/swap/v2/quote/depth'): self.bingx_depth,
+            ('GET', '/openApi/swap/v2/quote/contracts'): self.bingx_contracts,
+            ('GET', '/openApi/swap/v2/quote/price'): self.bingx_price,
+            ('GET', '/openApi/swap/v2/user/balance'): self.bingx_balance,
+            ('POST', '/openApi/swap/v2/trade/order'): self.bingx_order,
+            ('POST', '/openApi/swap/v2/trade/leverage'): self.bingx_leverage,
+            ('GET', '/openApi/swap/v2/trade/leverage'): self.bingx_leverage_info,
+            ('GET', '/openApi/swap/v2/user/positions'): self.bingx_positions,
+            ('GET', '/openApi/swap/v2/trade/allOrders'): self.bingx_all_orders,
+            ('POST', '/openApi/user/auth/userDataStream'): self.bingx_listen_key,
+            ('PUT', '/openApi/user/auth/userDataStream'): self.bingx_extend_listen_key,
+        }
+
+    def count_request(self, path):
+        with self._counts_lock: self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def check_rate_limit(self):
+        # (dibatasi?, header kuota). Header dikirim dalam dialek Bybit dan BingX sekaligus, karena satu server
+        # tiruan bisa melayani kedua exchange
+        if not self.rate_limit: return False, {}
+        now = time.time()
+        with self._counts_lock:
+            window = int(now)
+            if window != self._rate_window: self._rate_window, self._rate_used = window, 0
+            self._rate_used += 1
+            remaining = self.rate_limit - self._rate_used
+            if remaining < 0: self.rate_limited += 1
+        reset_ms = (window + 1) * 1000
+        headers = {'X-Bapi-Limit': self.rate_limit, 'X-Bapi-Limit-Status': max(remaining, 0), 'X-Bapi-Limit-Reset-Timestamp': reset_ms,
+                   'X-RateLimit-Requests-Remain': max(remaining, 0), 'X-RateLimit-Requests-Expire': reset_ms}
+        if remaining < 0: headers['Retry-After'] = f"{max(reset_ms / 1000 - now, 0.01):.3f}"
+        return remaining < 0, headers
+
+    def inject_latency(self, path):
+        delay_ms = self.path_latency_ms.get(path, self.latency_ms) + random.uniform(0, self.jitter_ms)
+        if delay_ms > 0: time.sleep(delay_ms / 1000)
+
+    def bybit_tickers(self, params):
+        symbols = [params['symbol'].replace('USDT', '/USDT')] if 'symbol' in params else self.symbols
+        items = [{'symbol': s.replace('/', ''), 'lastPrice': f"{self.prices.next_price('bybit', s):.8f}"} for s in symbols]
+        return {'retCode': 0, 'retMsg': 'OK', 'result': {'category': 'linear', 'list': items}, 'time': int(time.time() * 1000)}
+
+    def bybit_orderbook(self, params):
+        symbol = params['symbol']
+        bids, asks = self.prices.depth('bybit', symbol.replace('USDT', '/USDT'), int(params.get('limit', 25)))
+        return {'retCode': 0, 'retMsg': 'OK', 'result': {'s': symbol, 'b': bids, 'a': asks, 'ts': int(time.time() * 1000), 'u': 1}}
+
+    def bingx_depth(self, params):
+        bids, asks = self.prices.depth('bingx', params['symbol'].replace('-', '/'), int(params.get('limit', 20)))
+        return {'code': 0, 'msg': '', 'data': {'T': int(time.time() * 1000), 'bids': bids, 'asks': asks[::-1]}}
+
+    def bybit_instruments(self, params):
+        items = [{'symbol': s.replace('/', ''), 'status': 'Trading', 'quoteCoin': 'USDT', 'priceFilter': {'tickSize': '0.0001'},
+                  'lotSizeFilter': {'qtyStep': '1', 'minOrderQty': '1'}, 'leverageFilter': {'maxLeverage': '50.00'}} for s in self.symbols]
+        return {'retCode': 0, 'retMsg': 'OK', 'result': {'category': 'linear', 'list': items, 'nextPageCursor': ''}}
+
+    def bingx_contracts(self, params):
+        return {'code': 0, 'msg': '', 'data': [{'symbol': s.replace('/', '-'), 'status': 1, 'pricePrecision': 5, 'quantityPrecision': 0,
+                                                'tradeMinQuantity': 1, 'tradeMinUSDT': 2} for s in self.symbols]}
+
+    def bingx_price(self, params):
+        if 'symbol' in params:
+            symbol = params['symbol']
+            return {'code': 0, 'msg': '', 'data': {'symbol': symbol, 'price': f"{self.prices.next_price('bingx', symbol.replace('-', '/')):.8f}", 'time': int(time.time() * 1000)}}
+        return {'code': 0, 'msg': '', 'data': [{'symbol': s.replace('/', '-'), 'price': f"{self.prices.next_price('bingx', s):.8f}"} for s in self.symbols]}
+
+    def bingx_balance(self, params):
+        return {'code': 0, 'msg': '', 'data': {'balance': {'asset': 'USDT', 'balance': '1000.0', 'availableMargin': '1000.0'}}}
+
+    def bingx_order(self, params):
+        order_id = next(self._order_ids)
+        self.account.open(order_id, params)
+        return {'code': 0, 'msg': '', 'data': {'order': {'orderId': order_id, 'symbol': params.get('symbol'), 'side': params.get('side'),
+                                                          'positionSide': params.get('positionSide'), 'type': params.get('type')}}}
+
+    def bingx_positions(self, params):
+        positions = self.account.position_list()
+        if 'symbol' in params: positions = [p for p in positions if p['symbol'] == params['symbol']]
+        return {'code': 0, 'msg': '', 'data': positions}
+
+    def bingx_all_orders(self, params):
+        return {'code': 0, 'msg': '', 'data': {'orders': self.account.orders(params['symbol'], int(params.get('startTime', 0)), int(params.get('limit', 500)))}}
+
+    def bingx_listen_key(self, params):
+        return {'listenKey': self.account.new_listen_key()}
+
+    def bingx_extend_listen_key(self, params):
+        return {}
+
+    def bingx_leverage(self, params):
+        leverage = int(params.get('leverage', 1))
+        if leverage > self.MAX_LEVERAGE: return {'code': 109400, 'msg': f"leverage exceeds the maximum {self.MAX_LEVERAGE}", 'data': {}}
+        return {'code': 0, 'msg': '', 'data': {'leverage': leverage, 'symbol': params.get('symbol')}}
+
+    def bingx_leverage_info(self, params):
+        return {'code': 0, 'msg': '', 'data': {'longLeverage': 5, 'shortLeverage': 5, 'maxLongLeverage': self.MAX_LEVERAGE, 'maxShortLeverage': self.MAX_LEVERAGE}}
+
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_mock_rest_server(host='127.0.0.1', port=0, **kwargs):
+    server = MockRestServer(host, port, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_mock_exchange(ready_queue=None, host='127.0.0.1', symbols=DEFAULT_SYMBOLS, volatility=0.0005, mean_reversion=0.0,
+                      venue_latency_ms=None, jitter_ms=0.0, error_rate=0.0, order_latency_ms=None, push_interval=0.1, rate_limit=None):
+    # Semua stand-in (REST Bybit, REST BingX, stream) dengan satu buku harga bersama; dipakai juga sebagai
+    # target proses terpisah oleh bench_latency.py agar CPU server tiruan tidak terhitung sebagai CPU bot
+    prices = MockPriceBook(volatility=volatility, mean_reversion=mean_reversion)
+    account = MockAccount(prices)
+    venue_latency_ms = venue_latency_ms or {}
+    path_latency = {'/openApi/swap/v2/trade/order': order_latency_ms} if order_latency_ms is not None else None
+    rest = {venue: start_mock_rest_server(host, 0, prices=prices, symbols=symbols, latency_ms=venue_latency_ms.get(venue, 0.0),
+                                          jitter_ms=jitter_ms, error_rate=error_rate, path_latency_ms=path_latency if venue == 'bingx' else None, account=account,
+                                          rate_limit=rate_limit)
+            for venue in ('bybit', 'bingx')}
+    stream = start_mock_stream_server(host, 0, push_interval, prices, account)
+    urls = {'bybit_rest': rest['bybit'].url(), 'bingx_rest': rest['bingx'].url(), 'bybit_ws': stream.url('bybit'), 'bingx_ws': stream.url('bingx')}
+    if ready_queue is None: return urls, rest, stream
+    ready_queue.put(urls)
+    while True: time.sleep(3600)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Server tiruan Bybit & BingX (stream + REST)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help="Port server stream")
+    parser.add_argument('--rest-port', type=int, default=8766, help="Port server REST (melayani endpoint kedua exchange)")
+    parser.add_argument('--push-interval', type=float, default=0.1)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=None, help="Request per detik sebelum dibalas 429")
+    parser.add_argument('--symbols', type=int, default=len(DEFAULT_SYMBOLS), help="Jumlah simbol di universe tiruan")
+    args = parser.parse_args()
+    prices = MockPriceBook()
+    account = MockAccount(prices)
+    server = start_mock_stream_server(args.host, args.port, args.push_interval, prices, account)
+    rest = start_mock_rest_server(args.host, args.rest_port, prices=prices, symbols=mock_symbols(args.symbols),
+                                  latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, account=account,
+                                  rate_limit=args.rate_limit)
+    print(f"Mock Bybit stream: {server.url('bybit')}")
+    print(f"Mock BingX stream: {server.url('bingx')}")
+    print(f"Mock REST (Bybit & BingX): {rest.url()}")
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        rest.shutdown()
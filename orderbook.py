@@ -0,0 +1,102 @@
+# Order book per venue/simbol dengan level tersimpan di array NumPy yang dialokasikan sekali.
+# Snapshot mengganti isi array; delta (harga, ukuran) disisipkan/diganti/dihapus di tempat via searchsorted,
+# sehingga biaya per update sebanding jumlah level yang disimpan, tanpa objek per level.
+from collections import namedtuple
+
+import numpy as np
+
+# Salinan read-only satu sisi buku per saat tertentu: harga terbaik di indeks 0 (bid turun, ask naik)
+BookSnapshot = namedtuple('BookSnapshot', ['venue', 'symbol', 'bid_prices', 'bid_sizes', 'ask_prices', 'ask_sizes', 'received_at', 'source'],
+                          defaults=('rest',))
+
+class BookSide:
+    def __init__(self, is_bid, capacity):
+        self.is_bid = is_bid
+        self.capacity = capacity
+        # Kunci selalu terurut naik: harga (ask) atau -harga (bid), sehingga level terbaik di indeks 0
+        self.keys = np.empty(capacity, dtype=np.float64)
+        self.sizes = np.empty(capacity, dtype=np.float64)
+        self.count = 0
+
+    def load(self, levels):
+        # Snapshot: levels berupa [[harga, ukuran], ...] (angka atau string), urutan bebas
+        arr = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+        arr = arr[arr[:, 1] > 0]
+        keys = -arr[:, 0] if self.is_bid else arr[:, 0]
+        order = np.argsort(keys, kind='stable')[:self.capacity]
+        n = len(order)
+        self.keys[:n] = keys[order]
+        self.sizes[:n] = arr[order, 1]
+        self.count = n
+
+    def update(self, price, size):
+        # Delta: ukuran 0 menghapus level; level baru di luar kapasitas diabaikan
+        key = -price if self.is_bid else price
+        n = self.count
+        i = int(np.searchsorted(self.keys[:n], key))
+        exists = i < n and self.keys[i] == key
+        if size <= 0:
+            if exists:
+                self.keys[i:n - 1] = self.keys[i + 1:n]
+                self.sizes[i:n - 1] = self.sizes[i + 1:n]
+                self.count = n - 1
+            return
+        if exists:
+            self.sizes[i] = size
+            return
+        if i >= self.capacity: return
+        end = min(n, self.capacity - 1)
+        self.keys[i + 1:end + 1] = self.keys[i:end]
+        self.sizes[i + 1:end + 1] = self.sizes[i:end]
+        self.keys[i] = key
+        self.sizes[i] = size
+        self.count = end + 1
+
+    def prices(self):
+        keys = self.keys[:self.count]
+        return -keys if self.is_bid else keys.copy()
+
+class OrderBook:
+    def __init__(self, venue, symbol, depth):
+        self.venue = venue
+        self.symbol = symbol
+        self.bids = BookSide(True, depth)
+        self.asks = BookSide(False, depth)
+        self.received_at = 0.0
+
+    def apply(self, bids, asks, snapshot, received_at):
+        if snapshot:
+            self.bids.load(bids)
+            self.asks.load(asks)
+        else:
+            # Hapus dulu baru sisipkan: di buku yang penuh, level baru di tepi hanya muat setelah level lama keluar
+            for side, levels in ((self.bids, bids), (self.asks, asks)):
+                levels = [(float(price), float(size)) for price, size in levels]
+                for price, size in levels:
+                    if size <= 0: side.update(price, size)
+                for price, size in levels:
+                    if size > 0: side.update(price, size)
+        self.received_at = received_at
+
+    def snapshot(self, source='stream'):
+        return BookSnapshot(self.venue, self.symbol, self.bids.prices(), self.bids.sizes[:self.bids.count].copy(),
+                            self.asks.prices(), self.asks.sizes[:self.asks.count].copy(), self.received_at, source)
+
+def book_from_levels(venue, symbol, bids, asks, received_at, source='rest'):
+    # Untuk respons REST: satu snapshot langsung menjadi BookSnapshot
+    book = OrderBook(venue, symbol, max(len(bids), len(asks), 1))
+    book.apply(bids, asks, True, received_at)
+    return book.snapshot(source)
+
+def best_price(prices):
+    return float(prices[0]) if len(prices) else None
+
+def vwap(prices, sizes, quantity):
+    # Harga rata-rata untuk mengisi quantity dengan menyapu level terbaik lebih dulu; None bila kedalaman tidak cukup
+    if quantity <= 0 or not len(prices): return None
+    cumulative = np.cumsum(sizes)
+    if cumulative[-1] < quantity: return None
+    k = int(np.searchsorted(cumulative, quantity))
+    filled_before = float(cumulative[k - 1]) if k else 0.0
+    cost = float(np.dot(prices[:k], sizes[:k])) + float(prices[k]) * (quantity - filled_before)
+    return cost / quantity
@@ -0,0 +1,176 @@
+# Penjadwal request per exchange: token bucket untuk batas seluruh venue (IP) dan per kelas endpoint, dengan lajur
+# prioritas. Lajur lebih rendah tidak boleh memakai cadangan token lajur di atasnya (fraksi kapasitas + satu token
+# per request berprioritas lebih tinggi yang sedang menunggu), sehingga saat batas hampir habis order tetap keluar
+# lebih dulu daripada data market, dan data market lebih dulu daripada housekeeping.
+#
+# Bucket disesuaikan dari header rate-limit respons (sisa kuota hanya bisa menurunkan token, tidak menaikkan)
+# dan diblokir sampai Retry-After / waktu reset saat exchange membalas 429.
+#
+# Lajur request ditentukan per kelas endpoint, atau untuk seluruh pemanggilan helper di sebuah thread lewat
+# request_lane (bisa sebagai context manager maupun decorator):
+#   @request_lane('order')
+#   def process_trade_trigger(...): ...   # leverage + order di dalamnya memakai lajur order
+import contextlib
+import threading
+import time
+
+LANES = ('order', 'market', 'housekeeping')  # Prioritas menurun
+
+_context = threading.local()
+
+@contextlib.contextmanager
+def request_lane(lane):
+    if lane not in LANES: raise ValueError(f"Lajur request tidak dikenal: {lane}")
+    previous = getattr(_context, 'lane', None)
+    _context.lane = lane
+    try: yield
+    finally: _context.lane = previous
+
+def current_lane():
+    return getattr(_context, 'lane', None)
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate  # Token per detik
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0  # time.monotonic(); diisi dari 429 / kuota habis
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def take(self):
+        # Tanpa menunggu: False bila token habis (dipakai sebagai anggaran sederhana, mis. rekonsiliasi posisi)
+        with self._lock:
+            self.refill(time.monotonic())
+            if self.tokens < 1: return False
+            self.tokens -= 1
+            return True
+
+    def wait_time(self, cost, reserve, now):
+        # Detik sampai `cost` token tersedia tanpa menyentuh `reserve`; pemanggil memegang lock penjadwal
+        self.refill(now)
+        if now < self.blocked_until: return self.blocked_until - now
+        short = cost + min(reserve, self.capacity - cost) - self.tokens
+        return short / self.rate if short > 0 else 0.0
+
+    def sync(self, remaining, reset_in, now):
+        # Sisa kuota dari exchange lebih akurat dari perkiraan lokal (proses lain bisa berbagi IP/akun yang sama)
+        self.refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+        if remaining <= 0 and reset_in: self.blocked_until = max(self.blocked_until, now + reset_in)
+
+    def block(self, seconds, now):
+        self.tokens = min(self.tokens, 0.0)
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+class VenueScheduler:
+    def __init__(self, venue, limits, reserves, max_waits, header_parser=None, on_wait=None):
+        self.venue = venue
+        # 'venue' = batas bersama semua endpoint; kunci lain = kelas endpoint ('market', 'order', ...)
+        self.buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items()}
+        self.reserves = reserves  # lajur -> fraksi kapasitas bucket yang tidak boleh dipakai lajur tersebut
+        self.max_waits = max_waits  # lajur -> detik tunggu maksimum sebelum request dibatalkan
+        self.header_parser = header_parser
+        self.on_wait = on_wait  # Dipanggil (venue, lajur, detik) untuk setiap request yang harus menunggu
+        self._cond = threading.Condition()
+        self._waiting = dict.fromkeys(LANES, 0)
+        self._stats = {lane: {'requests': 0, 'throttled': 0, 'timeouts': 0, 'wait_s': 0.0, 'max_wait_s': 0.0} for lane in LANES}
+        self._responses = {'header_syncs': 0, 'rate_limited': 0}
+
+    def _reserve(self, bucket, rank, cost):
+        higher_waiting = sum(self._waiting[lane] for lane in LANES[:rank])
+        return self.reserves.get(LANES[rank], 0.0) * bucket.capacity + higher_waiting * cost
+
+    def acquire(self, endpoint, lane, cost=1):
+        # Detik menunggu (0 bila langsung dapat), atau None bila token tidak tersedia dalam max_waits[lajur]
+        rank = LANES.index(lane)
+        buckets = [b for b in (self.buckets.get('venue'), self.buckets.get(endpoint)) if b is not None]
+        start = time.monotonic()
+        deadline = start + self.max_waits[lane]
+        waited = 0.0
+        with self._cond:
+            stats = self._stats[lane]
+            stats['requests'] += 1
+            self._waiting[lane] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = max((b.wait_time(cost, self._reserve(b, rank, cost), now) for b in buckets), default=0.0)
+                    if wait <= 0:
+                        for b in buckets: b.tokens -= cost
+                        break
+                    # Tidak menunggu sia-sia: data market yang terlambat sudah basi ketika tiba
+                    if now + wait > deadline:
+                        stats['timeouts'] += 1
+                        return None
+                    self._cond.wait(wait)
+                    waited = time.monotonic() - start
+            finally:
+                self._waiting[lane] -= 1
+                # Request berprioritas lebih rendah mungkin bisa jalan sekarang (cadangannya mengecil)
+                self._cond.notify_all()
+            if waited:
+                stats['throttled'] += 1
+                stats['wait_s'] += waited
+                stats['max_wait_s'] = max(stats['max_wait_s'], waited)
+        if waited and self.on_wait: self.on_wait(self.venue, lane, waited)
+        return waited
+
+    def record_response(self, endpoint, status, headers):
+        limited = status in (418, 429)
+        parsed = self.header_parser(headers) if self.header_parser else (None, None)
+        remaining, reset_in = parsed
+        if not limited and remaining is None: return
+        bucket = self.buckets.get(endpoint) or self.buckets.get('venue')
+        if bucket is None: return
+        with self._cond:
+            now = time.monotonic()
+            if limited:
+                self._responses['rate_limited'] += 1
+                # Seluruh venue ditahan: batas IP biasanya yang terlampaui
+                target = self.buckets.get('venue') or bucket
+                target.block(retry_after(headers) or reset_in or 1.0, now)
+            else:
+                self._responses['header_syncs'] += 1
+                bucket.sync(remaining, reset_in, now)
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            buckets = {}
+            for name, b in self.buckets.items():
+                b.refill(now)
+                buckets[name] = {'tokens': round(b.tokens, 2), 'capacity': b.capacity, 'rate_per_s': b.rate,
+                                 'blocked_s': round(max(b.blocked_until - now, 0.0), 3)}
+            lanes = {lane: {**s, 'wait_s': round(s['wait_s'], 4), 'max_wait_s': round(s['max_wait_s'], 4), 'waiting': self._waiting[lane]}
+                     for lane, s in self._stats.items()}
+            return {'venue': self.venue, 'buckets': buckets, 'lanes': lanes, **self._responses}
+
+# --- HEADER RATE-LIMIT PER EXCHANGE ---
+# Keduanya mengembalikan (sisa request, detik sampai reset) atau (None, None) bila header tidak ada.
+
+def _number(value):
+    try: return float(value)
+    except (TypeError, ValueError): return None
+
+def retry_after(headers):
+    return _number(headers.get('Retry-After'))
+
+def bybit_limit_headers(headers):
+    # X-Bapi-Limit-Status = sisa kuota endpoint, X-Bapi-Limit-Reset-Timestamp = epoch ms saat kuota terisi lagi
+    remaining = _number(headers.get('X-Bapi-Limit-Status'))
+    if remaining is None: return None, None
+    reset_ms = _number(headers.get('X-Bapi-Limit-Reset-Timestamp'))
+    return remaining, max(reset_ms / 1000 - time.time(), 0.0) if reset_ms else None
+
+def bingx_limit_headers(headers):
+    # X-RateLimit-Requests-Remain = sisa kuota, X-RateLimit-Requests-Expire = akhir jendela (epoch ms, atau ms tersisa)
+    remaining = _number(headers.get('X-RateLimit-Requests-Remain'))
+    if remaining is None: return None, None
+    expire = _number(headers.get('X-RateLimit-Requests-Expire'))
+    if not expire: return remaining, None
+    return remaining, max(expire / 1000 - time.time(), 0.0) if expire > 1e12 else expire / 1000
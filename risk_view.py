@@ -0,0 +1,67 @@
+# Pandangan risiko global lintas proses engine (mode shard): satu baris per shard di memori bersama
+# (multiprocessing.Array) berisi posisi & notional terbuka, slot yang sedang dipesan untuk order yang sedang dikirim,
+# dan jumlah sinyal yang ditolak. Shard memesan slot sebelum order keluar (reserve), melepasnya setelah trade tercatat
+# atau gagal (settle), dan memublikasikan isi buku trade aktifnya setiap kali berubah (publish). Batas diperiksa
+# terhadap total semua shard di bawah satu lock, sehingga dua shard tidak bisa melewati batas bersamaan.
+import multiprocessing
+
+FIELDS = ('positions', 'notional', 'pending_positions', 'pending_notional', 'rejected')
+_POSITIONS, _NOTIONAL, _PENDING_POSITIONS, _PENDING_NOTIONAL, _REJECTED = range(len(FIELDS))
+
+class RiskView:
+    @staticmethod
+    def allocate(shards, ctx=multiprocessing):
+        # Dibuat oleh supervisor dan diteruskan ke setiap proses shard sebagai argumen Process
+        return ctx.Array('d', shards * len(FIELDS))
+
+    def __init__(self, shards=1, array=None, max_positions=None, max_notional=None):
+        self.shards = shards
+        self.array = array if array is not None else self.allocate(shards)
+        self.max_positions = max_positions  # None = tanpa batas
+        self.max_notional = max_notional
+
+    def _base(self, shard): return shard * len(FIELDS)
+
+    def _totals(self, values):
+        return [sum(values[self._base(s) + f] for s in range(self.shards)) for f in range(len(FIELDS))]
+
+    def reserve(self, shard, notional):
+        with self.array.get_lock():
+            values = self.array.get_obj()
+            totals = self._totals(values)
+            base = self._base(shard)
+            positions = totals[_POSITIONS] + totals[_PENDING_POSITIONS] + 1
+            exposure = totals[_NOTIONAL] + totals[_PENDING_NOTIONAL] + notional
+            if (self.max_positions is not None and positions > self.max_positions) or (self.max_notional is not None and exposure > self.max_notional):
+                values[base + _REJECTED] += 1
+                return False
+            values[base + _PENDING_POSITIONS] += 1
+            values[base + _PENDING_NOTIONAL] += notional
+            return True
+
+    def settle(self, shard, notional):
+        with self.array.get_lock():
+            values, base = self.array.get_obj(), self._base(shard)
+            values[base + _PENDING_POSITIONS] = max(values[base + _PENDING_POSITIONS] - 1, 0.0)
+            values[base + _PENDING_NOTIONAL] = max(values[base + _PENDING_NOTIONAL] - notional, 0.0)
+
+    def publish(self, shard, positions, notional):
+        with self.array.get_lock():
+            values, base = self.array.get_obj(), self._base(shard)
+            values[base + _POSITIONS], values[base + _NOTIONAL] = positions, notional
+
+    def reset_shard(self, shard, positions, notional):
+        # Saat shard (re)start: pesanan milik proses lama yang mati tidak akan pernah di-settle
+        with self.array.get_lock():
+            values, base = self.array.get_obj(), self._base(shard)
+            values[base + _POSITIONS], values[base + _NOTIONAL] = positions, notional
+            values[base + _PENDING_POSITIONS] = values[base + _PENDING_NOTIONAL] = 0.0
+
+    def rows(self):
+        with self.array.get_lock(): values = list(self.array.get_obj())
+        return [dict(zip(FIELDS, values[self._base(s):self._base(s + 1)])) for s in range(self.shards)]
+
+    def summary(self):
+        with self.array.get_lock(): totals = self._totals(self.array.get_obj())
+        return {'positions': int(totals[_POSITIONS]), 'notional': round(totals[_NOTIONAL], 2), 'pending': int(totals[_PENDING_POSITIONS]),
+                'rejected': int(totals[_REJECTED]), 'max_positions': self.max_positions, 'max_notional': self.max_notional}
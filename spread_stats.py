@@ -0,0 +1,131 @@
+# Statistik spread bergulir per simbol untuk trigger adaptif. Setiap simbol menempati satu slot di array NumPy
+# yang dialokasikan sekali untuk seluruh universe, dan setiap tick memperbarui slotnya dalam O(1):
+# rata-rata & varians EWMA dengan half-life dalam detik (tick yang datang tidak teratur tetap berbobot benar),
+# diawali bobot sama rata ala Welford selama sampel masih sedikit (alpha = max(alpha_waktu, 1/n)).
+# Persistensi = lama spread bertahan di sisi yang sama di luar persist_z deviasi standar.
+#
+# Mode trigger diterjemahkan menjadi batas atas/bawah per simbol (lihat trigger_bands), sehingga aturan sinyal di
+# strategy.py tetap satu: spread >= batas atas -> buy, spread <= batas bawah -> sell, batas tak hingga = tidak aktif.
+import math
+import threading
+
+import numpy as np
+
+TRIGGER_MODES = ('fixed', 'zscore', 'persistence')
+
+class SpreadStats:
+    def __init__(self, halflife=300.0, persist_z=2.0, capacity=256):
+        self.halflife = halflife
+        self.persist_z = persist_z
+        self.index = {}  # simbol -> slot
+        self._lock = threading.Lock()  # Alokasi slot baru & salinan indeks
+        self._slot_cache = (None, None)  # (list simbol, slot) terakhir; AVAILABLE_SYMBOLS diganti utuh saat refresh
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = getattr(self, 'count', None)
+        fields = {'count': (np.int64, 0), 'mean': (np.float64, 0.0), 'var': (np.float64, 0.0), 'last': (np.float64, np.nan),
+                  'last_z': (np.float64, 0.0), 'updated_at': (np.float64, 0.0), 'started_at': (np.float64, 0.0),
+                  'persist_side': (np.int8, 0), 'persist_since': (np.float64, 0.0)}
+        for name, (dtype, fill) in fields.items():
+            array = np.full(capacity, fill, dtype=dtype)
+            if old is not None: array[:len(old)] = getattr(self, name)
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def slot(self, symbol):
+        slot = self.index.get(symbol)
+        if slot is not None: return slot
+        with self._lock:
+            slot = self.index.get(symbol)
+            if slot is None:
+                slot = len(self.index)
+                # Array diperbesar (dua kali lipat) sebelum slot dipublikasikan, agar pembaca tidak melihat indeks di luar array
+                if slot >= self.capacity: self._allocate(self.capacity * 2)
+                self.index[symbol] = slot
+        return slot
+
+    def slots(self, symbols):
+        cached_symbols, cached_slots = self._slot_cache
+        if cached_symbols is not symbols:
+            cached_slots = np.fromiter((self.slot(s) for s in symbols), dtype=np.int64, count=len(symbols))
+            self._slot_cache = (symbols, cached_slots)
+        return cached_slots
+
+    def update(self, symbol, value, now):
+        slot = self.slot(symbol)
+        self.update_many(np.array([slot]), np.array([value], dtype=np.float64), now)
+        return slot
+
+    def update_many(self, slots, values, now):
+        # Satu langkah untuk banyak slot sekaligus (mode scanner); nilai NaN (tanpa harga) dilewati
+        valid = np.isfinite(values)
+        if not valid.all(): slots, values = slots[valid], values[valid]
+        if not len(slots): return
+        count, mean, var = self.count[slots] + 1, self.mean[slots], self.var[slots]
+        dt = np.maximum(now - self.updated_at[slots], 0.0)
+        alpha = np.maximum(-np.expm1(-dt * math.log(2) / self.halflife), 1.0 / count)
+        # z-score terhadap statistik sebelum tick ini, agar lonjakan tidak ikut meredam dirinya sendiri
+        std = np.sqrt(var)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where((count > 2) & (std > 0), (values - mean) / std, 0.0)
+        diff = values - mean
+        increment = alpha * diff
+        self.mean[slots] = mean + increment
+        self.var[slots] = (1 - alpha) * (var + diff * increment)
+        side = np.where(z >= self.persist_z, 1, np.where(z <= -self.persist_z, -1, 0)).astype(np.int8)
+        changed = side != self.persist_side[slots]
+        self.persist_since[slots[changed]] = now
+        self.persist_side[slots] = side
+        self.started_at[slots[count == 1]] = now
+        self.count[slots] = count
+        self.last[slots] = values
+        self.last_z[slots] = z
+        self.updated_at[slots] = now
+
+    def symbols(self):
+        with self._lock: return list(self.index.items())
+
+    def persistence(self, slots, now):
+        # Detik bertanda: positif = bertahan di atas rata-rata, negatif = di bawah, 0 = tidak ada penyimpangan
+        return np.where(self.persist_side[slots] != 0, (now - self.persist_since[slots]) * self.persist_side[slots], 0.0)
+
+    def describe(self, symbol, now):
+        slot = self.index.get(symbol)
+        if slot is None or not self.count[slot]: return None
+        return {'symbol': symbol, 'samples': int(self.count[slot]), 'last_pct': float(self.last[slot]),
+                'mean_pct': float(self.mean[slot]), 'std_pct': float(math.sqrt(self.var[slot])), 'z': float(self.last_z[slot]),
+                'persist_s': float(self.persistence(np.array([slot]), now)[0]), 'age_s': float(now - self.started_at[slot])}
+
+def trigger_bands(stats, slots, now, mode, fixed_pct, zscore, persist_seconds, min_pct, warmup):
+    # Batas (atas, bawah) per slot untuk mode trigger:
+    #   fixed       : +-fixed_pct, seperti TRIGGER_PERCENTAGE_SPREAD lama
+    #   zscore      : rata-rata +- zscore * deviasi standar
+    #   persistence : rata-rata +- persist_z * deviasi standar, hanya di sisi yang sudah bertahan >= persist_seconds
+    # Mode adaptif tidak pernah di bawah min_pct (spread kecil tetapi stabil tidak menutup biaya) dan belum aktif
+    # selama warmup detik pertama sebuah simbol diamati.
+    if mode not in TRIGGER_MODES: raise ValueError(f"Mode trigger tidak dikenal: {mode}")
+    if mode == 'fixed':
+        return np.full(len(slots), fixed_pct), np.full(len(slots), -fixed_pct)
+    mean, std = stats.mean[slots], np.sqrt(stats.var[slots])
+    width = zscore if mode == 'zscore' else stats.persist_z
+    upper, lower = np.maximum(mean + width * std, min_pct), np.minimum(mean - width * std, -min_pct)
+    if mode == 'persistence':
+        held = stats.persistence(slots, now)
+        upper = np.where(held >= persist_seconds, upper, np.inf)
+        lower = np.where(held <= -persist_seconds, lower, -np.inf)
+    warming = (stats.count[slots] == 0) | (now - stats.started_at[slots] < warmup)
+    return np.where(warming, np.inf, upper), np.where(warming, -np.inf, lower)
+
+def replay_bands(timestamps, values, mode, fixed_pct, zscore, persist_seconds, min_pct, warmup, halflife=300.0, persist_z=2.0):
+    # Batas per tick untuk backtest: setiap tick memperbarui statistik lalu dibaca batasnya, urutan yang sama dengan
+    # trading_tick live. Memakai SpreadStats & trigger_bands yang sama, jadi berjalan per tick (lebih lambat dari mode fixed).
+    n = len(values)
+    if mode == 'fixed': return np.full(n, fixed_pct), np.full(n, -fixed_pct)
+    stats, slots = SpreadStats(halflife, persist_z, capacity=1), np.zeros(1, dtype=np.int64)
+    upper, lower = np.empty(n), np.empty(n)
+    for i in range(n):
+        stats.update_many(slots, values[i:i + 1], timestamps[i])
+        band_upper, band_lower = trigger_bands(stats, slots, timestamps[i], mode, fixed_pct, zscore, persist_seconds, min_pct, warmup)
+        upper[i], lower[i] = band_upper[0], band_lower[0]
+    return upper, lower
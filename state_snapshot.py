@@ -0,0 +1,78 @@
+# Penulisan file yang tahan crash: file sementara + fsync + rename, sehingga pembaca selalu melihat
+# versi lama atau baru secara utuh. Snapshot state engine diberi checksum agar file rusak terdeteksi
+# (bukan diam-diam dianggap kosong); generasi sebelumnya disimpan sebagai cadangan (.prev).
+#
+# Layout snapshot: baris header "EXSNAP1 <sha256 body> <panjang body> <written_at>\n" diikuti body JSON.
+import hashlib
+import json
+import os
+import time
+
+SNAPSHOT_MAGIC = b'EXSNAP1'
+
+def fsync_dir(path):
+    # Rename baru tahan crash setelah entri direktorinya ikut di-fsync (tidak didukung di semua platform)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try: os.fsync(fd)
+    except OSError: pass
+    finally: os.close(fd)
+
+def write_synced(path, data, mode=0o644):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+        f.flush(); os.fsync(f.fileno())
+
+def atomic_write(path, data, mode=0o644):
+    if isinstance(data, str): data = data.encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # Unik per proses: beberapa shard bisa menulis file bersama (settings, cache simbol)
+    write_synced(tmp_path, data, mode)
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+class SnapshotStore:
+    def __init__(self, path, mode=0o600):
+        self.path = path
+        self.mode = mode  # Snapshot memuat pengaturan termasuk API key
+        self.written = 0
+        self.skipped = 0
+        self._last_body = None
+
+    def write(self, state):
+        # Tidak menulis ulang bila state sama persis dengan snapshot terakhir
+        body = json.dumps(state, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        if body == self._last_body:
+            self.skipped += 1
+            return False
+        header = b'%s %s %d %.3f\n' % (SNAPSHOT_MAGIC, hashlib.sha256(body).hexdigest().encode('ascii'), len(body), time.time())
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        write_synced(tmp_path, header + body, self.mode)
+        if os.path.exists(self.path): os.replace(self.path, f"{self.path}.prev")
+        os.replace(tmp_path, self.path)
+        fsync_dir(self.path)
+        self._last_body = body
+        self.written += 1
+        return True
+
+    def load(self):
+        # Kembalikan (state, written_at) dari snapshot valid terbaru, atau (None, None)
+        for path in (self.path, f"{self.path}.prev"):
+            if not os.path.exists(path): continue
+            try:
+                state, written_at = self._read(path)
+            except (OSError, ValueError) as e:
+                print(f"Snapshot {path} tidak valid ({e}), mencoba cadangan.")
+                continue
+            return state, written_at
+        return None, None
+
+    def _read(self, path):
+        with open(path, 'rb') as f: header, body = f.readline(), f.read()
+        parts = header.split()
+        if len(parts) != 4 or parts[0] != SNAPSHOT_MAGIC: raise ValueError("header tidak dikenali")
+        if len(body) != int(parts[2]): raise ValueError(f"panjang {len(body)} != {int(parts[2])}, file terpotong")
+        if hashlib.sha256(body).hexdigest().encode('ascii') != parts[1]: raise ValueError("checksum tidak cocok")
+        return json.loads(body), float(parts[3])
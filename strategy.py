@@ -0,0 +1,71 @@
+# Logika strategi spread tanpa I/O, dipakai bersama oleh loop live (main.py) dan replay (backtest.py)
+# agar hasil backtest memakai aturan trigger & TP/SL yang sama persis dengan bot.
+import numpy as np
+
+def spread_pct(bybit_price, bingx_price):
+    # Rumus: ((Harga Leader - Harga Follower) / Harga Follower) * 100
+    # Berlaku untuk skalar maupun array NumPy
+    return (bybit_price - bingx_price) / bingx_price * 100
+
+# trigger_pct = batas atas; lower_pct = batas bawah (default -trigger_pct). Batas bisa berupa array per simbol
+# dari trigger adaptif (spread_stats.py), dan batas tak hingga berarti sisi tersebut tidak aktif.
+
+def signal_side(price_difference_pct, trigger_pct, lower_pct=None):
+    # LONG: Bybit lebih mahal dari BingX, SHORT: Bybit lebih murah dari BingX
+    if lower_pct is None: lower_pct = -trigger_pct
+    if price_difference_pct >= trigger_pct: return 'buy'
+    if price_difference_pct <= lower_pct: return 'sell'
+    return None
+
+def signal_vector(spread, trigger_pct, lower_pct=None):
+    # Versi vektor signal_side: +1 = buy, -1 = sell, 0 = tidak ada sinyal (termasuk NaN)
+    if lower_pct is None: lower_pct = -trigger_pct
+    signals = np.zeros(len(spread), dtype=np.int8)
+    with np.errstate(invalid='ignore'):
+        signals[spread >= trigger_pct] = 1
+        signals[spread <= lower_pct] = -1
+    return signals
+
+def executable_spreads(bybit_bid, bybit_ask, bingx_bid, bingx_ask):
+    # Spread dari harga yang benar-benar bisa dieksekusi (bisa berupa VWAP untuk ukuran order):
+    # LONG = beli di ask BingX vs bid Bybit, SHORT = jual di bid BingX vs ask Bybit
+    return spread_pct(bybit_bid, bingx_ask), spread_pct(bybit_ask, bingx_bid)
+
+def executable_signal_side(long_pct, short_pct, trigger_pct, lower_pct=None):
+    # None = sisi tersebut tidak bisa dieksekusi (kedalaman tidak cukup)
+    if lower_pct is None: lower_pct = -trigger_pct
+    if long_pct is not None and long_pct >= trigger_pct: return 'buy'
+    if short_pct is not None and short_pct <= lower_pct: return 'sell'
+    return None
+
+def tp_sl_prices(side, execution_price, tp_percent, sl_percent):
+    if side == 'buy':
+        return execution_price * (1 + tp_percent / 100), execution_price * (1 - sl_percent / 100)
+    return execution_price * (1 - tp_percent / 100), execution_price * (1 + sl_percent / 100)
+
+def exit_outcome(side, price, tp_price, sl_price):
+    # TP diprioritaskan bila TP dan SL sama-sama terlewati
+    if side == 'buy':
+        if price >= tp_price: return 'TP'
+        if price <= sl_price: return 'SL'
+    else:
+        if price <= tp_price: return 'TP'
+        if price >= sl_price: return 'SL'
+    return None
+
+def exit_masks(side, prices, tp_price, sl_price):
+    # Versi vektor exit_outcome atas deret harga: (mask TP, mask SL)
+    if side == 'buy':
+        tp_mask = prices >= tp_price
+        sl_mask = (prices <= sl_price) & ~tp_mask
+    else:
+        tp_mask = prices <= tp_price
+        sl_mask = (prices >= sl_price) & ~tp_mask
+    return tp_mask, sl_mask
+
+def trade_pnl_usdt(side, entry_price, exit_price, amount_usdt, leverage, fee_pct=0.0):
+    # PnL posisi senilai amount_usdt * leverage, dikurangi fee pembukaan + penutupan
+    notional = amount_usdt * leverage
+    change = (exit_price - entry_price) / entry_price
+    if side == 'sell': change = -change
+    return notional * change - notional * fee_pct / 100 * 2
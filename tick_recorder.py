@@ -0,0 +1,143 @@
+# Perekam tick: setiap observasi (timestamp, venue, simbol, harga) ditulis ke segmen biner
+# berukuran record tetap yang kompatibel dengan NumPy, sehingga bisa dibaca ulang via memmap tanpa parsing.
+#
+# Layout file segmen: header 16 byte (magic + ukuran record) diikuti record RECORD_DTYPE berurutan.
+# Nama file: ticks-YYYYMMDD-HHMMSS-NNNN.bin (UTC); segmen berganti saat penuh atau saat tanggal UTC berganti.
+import glob
+import os
+import struct
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([('ts', '<f8'), ('price', '<f8'), ('venue', 'u1'), ('symbol', 'S23')])
+HEADER_MAGIC = b'EXTICK1\x00'
+HEADER_SIZE = 16
+VENUE_CODES = {'bybit': 1, 'bingx': 2}
+VENUE_NAMES = {code: name for name, code in VENUE_CODES.items()}
+
+class TickRecorder:
+    def __init__(self, directory, segment_max_records=1_000_000, flush_interval=1.0, max_buffer=500_000):
+        self.directory = directory
+        self.segment_max_records = segment_max_records
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.recorded = 0
+        self.dropped = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._file = None
+        self._file_day = None
+        self._file_records = 0
+        self._segment_seq = 0
+
+    def record(self, ts, venue, symbol, price):
+        # Dipanggil dari hot path: hanya menambah tuple ke buffer, I/O dilakukan thread writer
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append((ts, price, VENUE_CODES.get(venue, 0), symbol.encode('ascii', 'replace')[:23]))
+
+    def record_batch(self, ts, venue, prices):
+        # Satu timestamp untuk banyak simbol (hasil endpoint massal), dengan satu kali lock
+        venue_code = VENUE_CODES.get(venue, 0)
+        with self._lock:
+            room = self.max_buffer - len(self._buffer)
+            items = list(prices.items())
+            if len(items) > room:
+                self.dropped += len(items) - max(room, 0)
+                items = items[:max(room, 0)]
+            self._buffer.extend((ts, price, venue_code, symbol.encode('ascii', 'replace')[:23]) for symbol, price in items)
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer_loop, name='tick-recorder', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None: self._thread.join()
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _writer_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try: self.flush()
+            except Exception as e: print(f"ERROR: Tick recorder gagal menulis: {e}")
+
+    def flush(self):
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+        if not pending: return
+        records = np.array(pending, dtype=RECORD_DTYPE)
+        # Pecah batch per tanggal UTC agar satu hari selalu berada di segmen-segmen miliknya sendiri
+        days = (records['ts'] // 86400).astype(np.int64)
+        for day in np.unique(days): self._write_day(records[days == day], int(day))
+        self.recorded += len(records)
+
+    def _write_day(self, records, day):
+        offset = 0
+        while offset < len(records):
+            if self._file is None or self._file_day != day or self._file_records >= self.segment_max_records:
+                self._open_segment(day, records[offset]['ts'])
+            take = min(len(records) - offset, self.segment_max_records - self._file_records)
+            self._file.write(records[offset:offset + take].tobytes())
+            self._file.flush()
+            self._file_records += take
+            offset += take
+
+    def _open_segment(self, day, first_ts):
+        if self._file is not None: self._file.close()
+        stamp = datetime.fromtimestamp(first_ts, tz=timezone.utc).strftime('%Y%m%d-%H%M%S')
+        self._segment_seq += 1
+        path = os.path.join(self.directory, f"ticks-{stamp}-{self._segment_seq:04d}.bin")
+        self._file = open(path, 'wb')
+        self._file.write(HEADER_MAGIC + struct.pack('<I', RECORD_DTYPE.itemsize) + b'\x00' * 4)
+        self._file_day = day
+        self._file_records = 0
+
+# --- PEMBACA ---
+
+def open_segment(path):
+    # Memetakan segmen ke memori tanpa parsing; record yang terpotong di akhir (crash) diabaikan
+    with open(path, 'rb') as f: header = f.read(HEADER_SIZE)
+    if header[:8] != HEADER_MAGIC or struct.unpack('<I', header[8:12])[0] != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Bukan segmen tick yang valid: {path}")
+    count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count <= 0: return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+def day_segments(directory, day=None):
+    # day: 'YYYY-MM-DD' atau 'YYYYMMDD'; None = semua segmen di direktori
+    prefix = day.replace('-', '') if day else '*'
+    return sorted(glob.glob(os.path.join(directory, f"ticks-{prefix}-*.bin")))
+
+def load_day(directory, day=None):
+    segments = [open_segment(path) for path in day_segments(directory, day)]
+    if not segments: return np.empty(0, dtype=RECORD_DTYPE)
+    if len(segments) == 1: return segments[0]
+    return np.concatenate(segments)
+
+def ticks_to_quotes(ticks):
+    # Gabungkan tick per venue menjadi kolom quote berpasangan (format backtest.py):
+    # pada setiap observasi, harga venue lain adalah harga terakhir yang diketahui (forward fill)
+    order = np.lexsort((ticks['ts'], ticks['symbol']))
+    ticks = ticks[order]
+    symbols = ticks['symbol']
+    positions = np.arange(len(ticks))
+    group_start = np.concatenate(([0], np.flatnonzero(symbols[1:] != symbols[:-1]) + 1)) if len(ticks) else np.empty(0, dtype=np.int64)
+    # Indeks awal grup simbol untuk setiap baris, agar forward fill tidak melintasi simbol
+    row_group_start = np.repeat(group_start, np.diff(np.concatenate((group_start, [len(ticks)]))))
+    columns = {'timestamp': np.asarray(ticks['ts'], dtype=np.float64), 'symbol': symbols.astype(str)}
+    for venue in ('bybit', 'bingx'):
+        last = np.maximum.accumulate(np.where(ticks['venue'] == VENUE_CODES[venue], positions, -1)) if len(ticks) else positions
+        valid = last >= row_group_start
+        columns[f"{venue}_price"] = np.where(valid, ticks['price'][np.maximum(last, 0)], np.nan)
+    return columns